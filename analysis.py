@@ -1,9 +1,35 @@
+import argparse
+import os
 import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import networkx as nx
-from typing import Optional
+import db
+import sales
+
+# фигуры создаются через matplotlib.figure.Figure без pyplot: pyplot хранит глобальное состояние
+# и не потокобезопасен, а графики строятся в фоновых потоках/процессах GUI.
+# Каждый график разделён на функцию данных (DataFrame или граф — для отчётов и повторного использования)
+# и функцию отрисовки; функции *_figure объединяют их. GUI строит данные в фоне (REPORTS[...].data)
+# и перерисовывает их в одну фигуру своего холста (параметр fig функций отрисовки).
+# Пакетный режим — run_reports и запуск модуля
+
+
+def _figure(fig: Optional[Figure], figsize: Tuple[float, float]) -> Figure:
+    """
+    новая фигура размера figsize или переданная fig, очищенная для перерисовки (размер не меняется)
+    """
+    if fig is None:
+        return Figure(figsize=figsize)
+    fig.clear()
+    return fig
 
 
 def get_connection(db_path: str):
@@ -12,52 +38,73 @@ def get_connection(db_path: str):
     return con
 
 #YES
-def top5_customers_figure(db_path: str):
+def top_customers_data(db_path: str, n: int = 5) -> pd.DataFrame:
     """
-    функция получения графика топ-5 клиентов по числу заказов и их суммарной стоимости.
-    для отображения используется matplotlib, для интеграции данных sql + pandas
+    ТОП-n клиентов по числу заказов и их суммарной стоимости
     :param db_path: путь к базе данных
-    :return: график
+    :param n: количество клиентов
+    :return: DataFrame id, name, order_count, total_sum
     """
-    con = get_connection(db_path)
-    df = pd.read_sql_query(
-        """
-        SELECT c.id, c.name, COUNT(o.id) AS order_count, COALESCE(SUM(o.total), 0) AS total_sum
-        FROM customers c
-        LEFT JOIN orders o ON o.customer_id = c.id
-        GROUP BY c.id, c.name
-        ORDER BY order_count DESC, total_sum DESC
-        LIMIT 5
-        """,
-        con,
-    )
-    con.close()
-    fig, ax = plt.subplots(figsize=(6, 4))
-    sns.barplot(data=df, x="order_count", y="name", ax=ax, hue=None, palette="Blues_d")
-    ax.set_title("Топ-5 клиентов по числу заказов")
+    return pd.DataFrame(db.top_customers(db_path, n), columns=["id", "name", "order_count", "total_sum"])
+
+#YES
+def render_top_customers(df: pd.DataFrame, fig: Optional[Figure] = None) -> Figure:
+    """
+    столбчатая диаграмма по данным top_customers_data
+    """
+    fig = _figure(fig, (6, 4))
+    ax = fig.subplots()
+    sns.barplot(data=df, x="order_count", y="name", ax=ax, hue="name", palette="Blues_d", legend=False)
+    ax.set_title(f"Топ-{len(df)} клиентов по числу заказов")
     ax.set_xlabel("Кол-во заказов")
     ax.set_ylabel("Клиент")
     fig.tight_layout()
     return fig
 
 #YES
-def orders_timeseries_figure(db_path: str, freq: str = "D"):
+def top5_customers_figure(db_path: str):
     """
-    функция получения графика кол-ва заказов от времени с указанной частотой
+    функция получения графика топ-5 клиентов по числу заказов и их суммарной стоимости.
     для отображения используется matplotlib, для интеграции данных sql + pandas
     :param db_path: путь к базе данных
-    :param freq: default "D" — дневной интервал (ежедневно)
     :return: график
     """
-    con = get_connection(db_path)
-    df = pd.read_sql_query("SELECT date, total FROM orders", con, parse_dates=["date"])
-    con.close()
-    if df.empty:
-        df = pd.DataFrame({"date": [], "count": []})
-    else:
-        ts = df.groupby(pd.Grouper(key="date", freq=freq)).size().reset_index(name="count")
-        df = ts
-    fig, ax = plt.subplots(figsize=(6, 4))
+    return render_top_customers(top_customers_data(db_path, 5))
+
+# частоты графика динамики: объекты смещений вместо строк "M"/"Q"/"Y", которые переименованы в новых pandas
+RESAMPLE_FREQS = {
+    "D": pd.offsets.Day(),
+    "W": pd.offsets.Week(weekday=6),
+    "M": pd.offsets.MonthEnd(),
+    "Q": pd.offsets.QuarterEnd(startingMonth=12),
+    "Y": pd.offsets.YearEnd(),
+}
+
+#YES
+def orders_timeseries_data(db_path: str, freq: str = "D") -> pd.DataFrame:
+    """
+    кол-во заказов и выручка по периодам с указанной частотой.
+    данные берутся из дневных агрегатов orders_daily, недели/месяцы/кварталы/годы получаются
+    перегруппировкой дневных значений, поэтому время построения не растёт с историей заказов
+    :param db_path: путь к базе данных
+    :param freq: default "D" — дневной интервал (ежедневно), также "W", "M", "Q", "Y"
+    :return: DataFrame date, count, revenue
+    """
+    daily = pd.DataFrame(db.get_orders_daily(db_path), columns=["day", "order_count", "revenue"])
+    if daily.empty:
+        return pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "count": pd.Series(dtype="int64"),
+                             "revenue": pd.Series(dtype="float64")})
+    daily["day"] = pd.to_datetime(daily["day"])
+    ts = daily.set_index("day")[["order_count", "revenue"]].resample(RESAMPLE_FREQS.get(freq, freq)).sum()
+    return ts.rename(columns={"order_count": "count"}).rename_axis("date").reset_index()
+
+#YES
+def render_orders_timeseries(df: pd.DataFrame, freq: str = "D", fig: Optional[Figure] = None) -> Figure:
+    """
+    линейный график кол-ва заказов по данным orders_timeseries_data
+    """
+    fig = _figure(fig, (6, 4))
+    ax = fig.subplots()
     sns.lineplot(data=df, x="date", y="count", marker="o", ax=ax)
     ax.set_title(f"Динамика количества заказов ({freq})")
     ax.set_xlabel("Дата")
@@ -67,34 +114,445 @@ def orders_timeseries_figure(db_path: str, freq: str = "D"):
     return fig
 
 #YES
-def customers_network_figure(db_path: str, by: str = "city"):
+def orders_timeseries_figure(db_path: str, freq: str = "D"):
     """
-    функция построения простого граф: ребро между клиентами из одного города
-    :param db_path:  путь к базе данных
-    :param by: параметр групировки по умолчанию город
-    :return: граф
+    функция получения графика кол-ва заказов от времени с указанной частотой
+    :param db_path: путь к базе данных
+    :param freq: default "D" — дневной интервал (ежедневно), также "W", "M", "Q", "Y"
+    :return: график
     """
+    return render_orders_timeseries(orders_timeseries_data(db_path, freq), freq)
+
+# Отношения для графа связей: SQL возвращает пары (клиент, группа);
+# группы — города из карточек клиентов или купленные товары из позиций заказов
+NETWORK_RELATIONS = {
+    "city": (
+        "Город",
+        """
+        SELECT c.id AS customer_id, c.name AS customer_name, c.city AS group_key, c.city AS group_label
+        FROM customers c
+        WHERE c.city IS NOT NULL AND c.city != ''
+        """,
+    ),
+    "product": (
+        "Товар",
+        """
+        SELECT DISTINCT o.customer_id, c.name AS customer_name, oi.product_id AS group_key, p.name AS group_label
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        JOIN customers c ON c.id = o.customer_id
+        JOIN products p ON p.id = oi.product_id
+        """,
+    ),
+}
+
+
+AGGREGATE_TOP = 30  # групп на агрегированном графе — больше не читается
+
+
+def _network_pairs(db_path: str, by: str) -> pd.DataFrame:
+    if by not in NETWORK_RELATIONS:
+        raise ValueError(f"Неизвестное отношение для графа: {by}, доступны: {', '.join(NETWORK_RELATIONS)}")
     con = get_connection(db_path)
-    df = pd.read_sql_query("SELECT id, name, city FROM customers", con)
-    con.close()
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        G.add_node(row["id"], label=row["name"], city=row["city"])
-    if by == "city": #группируем по городу
-        groups = df.groupby("city")
-        for city, g in groups:
-            ids = list(g["id"])
-            for i in range(len(ids)):
-                for j in range(i + 1, len(ids)):
-                    G.add_edge(ids[i], ids[j], label=f"{city}")
+    try:
+        return pd.read_sql_query(NETWORK_RELATIONS[by][1], con)
+    finally:
+        con.close()
+
+#YES
+def customers_network_data(db_path: str, by: str = "city", mode: str = "bipartite", max_nodes: int = 300) -> nx.Graph:
+    """
+    граф связей клиентов через общую группу (город, товар).
+    Вместо рёбер между каждой парой клиентов группы (квадратичный рост) строится двудольный граф
+    клиент — группа, узлы и рёбра добавляются пакетно
+    :param db_path:  путь к базе данных
+    :param by: отношение: "city" — общий город, "product" — купленный товар (по позициям заказов)
+    :param mode: "bipartite" — клиенты и группы, "aggregate" — только крупнейшие группы с размером по числу клиентов
+    :param max_nodes: ограничение числа клиентов на рисунке, при превышении берётся случайная выборка
+    :return: граф; у узлов атрибуты label, kind ("customer"/"group"), size (для aggregate — число клиентов)
+        и pos (координаты на рисунке), у графа — by и mode
+    """
+    pairs = _network_pairs(db_path, by)
+    G = nx.Graph(by=by, mode=mode)
+    if mode == "aggregate":
+        sizes = pairs.groupby(["group_key", "group_label"])["customer_id"].nunique().nlargest(min(max_nodes, AGGREGATE_TOP))
+        G.add_nodes_from(
+            ((key, {"label": f"{label} ({n})", "kind": "group", "size": int(n)}) for (key, label), n in sizes.items())
+        )
+    elif mode == "bipartite":
+        customers = pairs[["customer_id", "customer_name"]].drop_duplicates("customer_id")
+        if len(customers) > max_nodes:
+            customers = customers.sample(n=max_nodes, random_state=42)
+            pairs = pairs[pairs["customer_id"].isin(customers["customer_id"])]
+        groups = pairs[["group_key", "group_label"]].drop_duplicates("group_key")
+        cust_nodes = list(zip("c" + customers["customer_id"].astype(str), customers["customer_name"]))
+        group_nodes = list(zip("g" + groups["group_key"].astype(str), groups["group_label"]))
+        G.add_nodes_from((n, {"label": label, "kind": "customer", "size": 1}) for n, label in cust_nodes)
+        G.add_nodes_from((n, {"label": label, "kind": "group", "size": 1}) for n, label in group_nodes)
+        G.add_edges_from(zip("c" + pairs["customer_id"].astype(str), "g" + pairs["group_key"].astype(str)))
+    else:
+        raise ValueError(f"Неизвестный режим графа: {mode}")
+    # раскладка — самая долгая часть рисунка, поэтому считается вместе с данными (в фоне), а не при отрисовке
+    pos = nx.circular_layout(G) if mode == "aggregate" else nx.spring_layout(G, seed=42, k=0.7)
+    nx.set_node_attributes(G, {n: tuple(p) for n, p in pos.items()}, "pos")
+    return G
+
+#YES
+def network_frame(G: nx.Graph) -> pd.DataFrame:
+    """
+    узлы графа customers_network_data таблицей: node, label, kind, size, degree (для выгрузки в CSV)
+    """
+    return pd.DataFrame(
+        [(n, a["label"], a["kind"], a["size"], G.degree(n)) for n, a in G.nodes(data=True)],
+        columns=["node", "label", "kind", "size", "degree"],
+    )
+
+#YES
+def render_customers_network(G: nx.Graph, fig: Optional[Figure] = None) -> Figure:
+    """
+    рисунок графа customers_network_data
+    """
+    by, mode = G.graph.get("by", "city"), G.graph.get("mode", "bipartite")
+    title, _ = NETWORK_RELATIONS.get(by, (by, None))
+    if mode == "aggregate":
+        largest = max((G.nodes[n]["size"] for n in G.nodes), default=1)
+        node_size = [100 + 900 * G.nodes[n]["size"] / max(1, largest) for n in G.nodes]
+        node_color = "lightgreen"
+        labels = {n: G.nodes[n]["label"] for n in G.nodes}
+    else:
+        is_group = [G.nodes[n]["kind"] == "group" for n in G.nodes]
+        node_size = [400 if g else 80 for g in is_group]
+        node_color = ["orange" if g else "lightblue" for g in is_group]
+        # подписи клиентов только на небольших графах, иначе они перекрывают друг друга
+        small = is_group.count(False) <= 50
+        labels = {n: G.nodes[n]["label"] for n, g in zip(G.nodes, is_group) if g or small}
     # Визуализация
-    fig = plt.figure(figsize=(6, 5))
-    pos = nx.spring_layout(G, seed=42, k=0.7)
-    node_labels = {n: G.nodes[n]["label"] for n in G.nodes}
-    nx.draw_networkx_nodes(G, pos, node_size=500, node_color="lightblue")
-    nx.draw_networkx_edges(G, pos, alpha=0.4)
-    nx.draw_networkx_labels(G, pos, labels=node_labels, font_size=8)
-    plt.title("Граф связей клиентов (общий город)")
-    plt.axis("off")
+    fig = _figure(fig, (6, 5))
+    ax = fig.subplots()
+    pos = nx.get_node_attributes(G, "pos")
+    if len(pos) != len(G):
+        pos = nx.circular_layout(G) if mode == "aggregate" else nx.spring_layout(G, seed=42, k=0.7)
+    nx.draw_networkx_nodes(G, pos, node_size=node_size, node_color=node_color, ax=ax)
+    nx.draw_networkx_edges(G, pos, alpha=0.4, ax=ax)
+    nx.draw_networkx_labels(G, pos, labels=labels, font_size=8, ax=ax)
+    ax.set_title(f"Граф связей клиентов ({title.lower()})" if mode == "bipartite" else f"Клиенты по группам ({title.lower()})")
+    ax.set_axis_off()
+    fig.tight_layout()
+    return fig
+
+#YES
+def customers_network_figure(db_path: str, by: str = "city", mode: str = "bipartite", max_nodes: int = 300):
+    """
+    функция построения графа связей клиентов через общую группу (город, товар), см. customers_network_data
+    :param db_path:  путь к базе данных
+    :param by: отношение: "city" — общий город, "product" — купленный товар (по позициям заказов)
+    :param mode: "bipartite" — клиенты и группы, "aggregate" — только крупнейшие группы с размером по числу клиентов
+    :param max_nodes: ограничение числа клиентов на рисунке, при превышении берётся случайная выборка
+    :return: граф
+    """
+    return render_customers_network(customers_network_data(db_path, by, mode, max_nodes))
+
+
+#YES
+def top_products_data(db_path: str, n: int = 10, by: str = "revenue") -> pd.DataFrame:
+    """
+    ТОП-n товаров по выручке или количеству (sales.product_sales, без отменённых заказов)
+    :param db_path: путь к базе данных
+    :param n: количество товаров
+    :param by: "revenue" — по выручке, "quantity" — по количеству
+    :return: DataFrame product_id, name, sku, lines, quantity, revenue
+    """
+    return sales.top_products(sales.product_sales(db_path), n, by)
+
+#YES
+def render_top_products(df: pd.DataFrame, by: str = "revenue", fig: Optional[Figure] = None) -> Figure:
+    """
+    столбчатая диаграмма по данным top_products_data
+    """
+    fig = _figure(fig, (6, 4))
+    ax = fig.subplots()
+    sns.barplot(data=df, x=by, y="name", ax=ax, hue="name", palette="Greens_d", legend=False)
+    ax.set_title(f"Топ-{len(df)} товаров по {'выручке' if by == 'revenue' else 'количеству'}")
+    ax.set_xlabel("Выручка" if by == "revenue" else "Продано, шт.")
+    ax.set_ylabel("Товар")
+    fig.tight_layout()
+    return fig
+
+#YES
+def top_products_figure(db_path: str, by: str = "revenue", n: int = 10):
+    """
+    функция получения графика ТОП товаров по выручке или количеству
+    :param db_path: путь к базе данных
+    :param by: "revenue" или "quantity"
+    :param n: количество товаров
+    :return: график
+    """
+    return render_top_products(top_products_data(db_path, n, by), by)
+
+#YES
+def abc_data(db_path: str) -> pd.DataFrame:
+    """
+    ABC-классификация товаров по выручке (sales.abc_classes)
+    :return: DataFrame товаров по убыванию выручки с share, cum_share, abc
+    """
+    return sales.abc_classes(sales.product_sales(db_path))
+
+#YES
+def render_abc(df: pd.DataFrame, fig: Optional[Figure] = None) -> Figure:
+    """
+    диаграмма Парето по данным abc_data: выручка товаров по убыванию (цвет — класс) и накопленная доля.
+    Выручка рисуется заливкой по классам, а не отдельными столбцами — время не зависит от числа товаров
+    """
+    fig = _figure(fig, (6, 4))
+    ax = fig.subplots()
+    x = pd.RangeIndex(1, len(df) + 1)
+    for cls, color in (("A", "tab:green"), ("B", "tab:orange"), ("C", "tab:red")):
+        mask = (df["abc"] == cls).to_numpy()
+        if mask.any():
+            ax.fill_between(x, df["revenue"].where(mask, 0), step="mid", color=color, alpha=0.6,
+                            label=f"{cls}: {int(mask.sum())} тов., {df['share'][mask].sum():.0%} выручки")
+    ax.set_xlabel("Товары по убыванию выручки")
+    ax.set_ylabel("Выручка")
+    ax.legend(loc="center right", fontsize=8)
+    share = ax.twinx()
+    share.plot(x, df["cum_share"], color="black", linewidth=1)
+    for bound in sales.ABC_THRESHOLDS:
+        share.axhline(bound, color="grey", linestyle="--", linewidth=0.8)
+    share.set_ylim(0, 1.05)
+    share.set_ylabel("Накопленная доля")
+    ax.set_title("ABC-анализ товаров (Парето)")
+    fig.tight_layout()
+    return fig
+
+#YES
+def abc_figure(db_path: str):
+    """
+    функция получения диаграммы Парето с ABC-классами товаров
+    :param db_path: путь к базе данных
+    :return: график
+    """
+    return render_abc(abc_data(db_path))
+
+#YES
+def rfm_data(db_path: str) -> pd.DataFrame:
+    """
+    RFM-сегменты покупателей (sales.rfm_segments по заказам без отменённых)
+    :return: DataFrame клиентов с recency_days, frequency, monetary, r, f, m, segment
+    """
+    return sales.rfm_segments(sales.customer_orders(db_path))
+
+#YES
+def render_rfm(df: pd.DataFrame, fig: Optional[Figure] = None) -> Figure:
+    """
+    число клиентов и доля выручки по RFM-сегментам по данным rfm_data
+    """
+    total = df["monetary"].sum()
+    seg = (df.groupby("segment")
+           .agg(customers=("customer_id", "size"), monetary=("monetary", "sum"))
+           .sort_values("customers", ascending=False)
+           .reset_index())
+    fig = _figure(fig, (6, 4))
+    ax = fig.subplots()
+    sns.barplot(data=seg, x="customers", y="segment", ax=ax, hue="segment", palette="Purples_d", legend=False)
+    if total:
+        for i, (n, m) in enumerate(zip(seg["customers"], seg["monetary"])):
+            ax.annotate(f"{m / total:.0%} выручки", (n, i), xytext=(4, 0), textcoords="offset points",
+                        va="center", fontsize=8)
+    ax.margins(x=0.2)
+    ax.set_title(f"RFM-сегменты покупателей ({len(df)})")
+    ax.set_xlabel("Клиентов")
+    ax.set_ylabel("Сегмент")
     fig.tight_layout()
-    return fig
\ No newline at end of file
+    return fig
+
+#YES
+def rfm_figure(db_path: str):
+    """
+    функция получения графика RFM-сегментов покупателей
+    :param db_path: путь к базе данных
+    :return: график
+    """
+    return render_rfm(rfm_data(db_path))
+
+# подписи и формат показателей sales.sales_summary
+SUMMARY_FORMATS = {"orders": "{:,.0f}", "customers": "{:,.0f}", "repeat_rate": "{:.1%}"}  # остальные — "{:,.2f}"
+SUMMARY_LABELS = {
+    "orders": "Заказов",
+    "revenue": "Выручка",
+    "avg_order_value": "Средний чек",
+    "avg_lines": "Позиций в заказе",
+    "avg_quantity": "Единиц товара в заказе",
+    "customers": "Покупателей",
+    "repeat_rate": "Доля повторных покупателей",
+}
+
+#YES
+def sales_summary_data(db_path: str) -> pd.DataFrame:
+    """
+    средняя корзина и доля повторных покупок (sales.sales_summary)
+    :return: DataFrame metric, label, value
+    """
+    with sales.snapshot(db_path):
+        summary = sales.sales_summary(sales.product_sales(db_path), sales.customer_orders(db_path))
+    return pd.DataFrame([(k, SUMMARY_LABELS[k], v) for k, v in summary.items()], columns=["metric", "label", "value"])
+
+#YES
+def render_sales_summary(df: pd.DataFrame, fig: Optional[Figure] = None) -> Figure:
+    """
+    таблица показателей по данным sales_summary_data
+    """
+    fig = _figure(fig, (6, 3))
+    ax = fig.subplots()
+    ax.set_axis_off()
+    cells = [[label, SUMMARY_FORMATS.get(metric, "{:,.2f}").format(value).replace(",", " ")]
+             for metric, label, value in df.itertuples(index=False)]
+    table = ax.table(cellText=cells, colLabels=["Показатель", "Значение"], loc="center", cellLoc="left")
+    table.scale(1, 1.4)
+    ax.set_title("Сводка продаж (без отменённых заказов)")
+    fig.tight_layout()
+    return fig
+
+#YES
+def sales_summary_figure(db_path: str):
+    """
+    функция получения таблицы показателей продаж: средняя корзина, средний чек, повторные покупки
+    :param db_path: путь к базе данных
+    :return: график
+    """
+    return render_sales_summary(sales_summary_data(db_path))
+
+
+@dataclass(frozen=True)
+class Report:
+    """
+    Отчёт пакетного режима и вкладки аналитики: data(db_path, **params) -> данные,
+    render(данные, **render_params, fig=None) -> Figure (в fig, если передана), frame(данные) -> DataFrame для CSV;
+    render_params — параметры из params, которые нужны и отрисовке
+    """
+    data: Callable[..., Any]
+    render: Callable[..., Figure]
+    frame: Callable[[Any], pd.DataFrame] = lambda data: data
+    render_params: Tuple[str, ...] = ()
+
+
+REPORTS: Dict[str, Report] = {
+    "top_customers": Report(top_customers_data, render_top_customers),
+    "orders_timeseries": Report(orders_timeseries_data, render_orders_timeseries, render_params=("freq",)),
+    "customers_network": Report(customers_network_data, render_customers_network, network_frame),
+    "top_products": Report(top_products_data, render_top_products, render_params=("by",)),
+    "abc": Report(abc_data, render_abc),
+    "rfm": Report(rfm_data, render_rfm),
+    "sales_summary": Report(sales_summary_data, render_sales_summary),
+}
+
+# набор отчётов по умолчанию для пакетного режима: (отчёт, параметры)
+BATCH_REPORTS: List[Tuple[str, Dict[str, Any]]] = [
+    ("top_customers", {"n": 10}),
+    ("orders_timeseries", {"freq": "D"}),
+    ("orders_timeseries", {"freq": "M"}),
+    ("customers_network", {"by": "city", "mode": "aggregate"}),
+    ("customers_network", {"by": "product", "mode": "aggregate"}),
+    ("top_products", {"by": "revenue"}),
+    ("top_products", {"by": "quantity"}),
+    ("abc", {}),
+    ("rfm", {}),
+    ("sales_summary", {}),
+]
+
+REPORT_FORMATS = ("png", "svg", "csv")
+
+
+def _report_file(name: str, params: Dict[str, Any]) -> str:
+    return "_".join([name] + [str(params[k]) for k in sorted(params)])
+
+#YES
+def run_report(db_path: str, out_dir: str, name: str, params: Optional[Dict[str, Any]] = None,
+               formats: Sequence[str] = REPORT_FORMATS) -> Dict[str, Any]:
+    """
+    Построение одного отчёта в файлы out_dir/<отчёт>_<параметры>.<формат> без GUI (холст Agg).
+    Выполняется в процессах run_reports, поэтому принимает и возвращает только сериализуемые значения
+    :return: словарь report, file, rows, data_s, render_s, write_s, error
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    params = dict(params or {})
+    report = REPORTS[name]
+    base = os.path.join(out_dir, _report_file(name, params))
+    result: Dict[str, Any] = {"report": name, "file": os.path.basename(base), "rows": 0,
+                              "data_s": 0.0, "render_s": 0.0, "write_s": 0.0, "error": ""}
+    try:
+        t0 = time.perf_counter()
+        data = report.data(db_path, **params)
+        frame = report.frame(data)
+        result["rows"] = len(frame)
+        t1 = time.perf_counter()
+        result["data_s"] = t1 - t0
+        fig = None
+        if "png" in formats or "svg" in formats:
+            fig = report.render(data, **{k: params[k] for k in report.render_params if k in params})
+            FigureCanvasAgg(fig)
+        t2 = time.perf_counter()
+        result["render_s"] = t2 - t1
+        for fmt in formats:
+            if fmt == "csv":
+                frame.to_csv(f"{base}.csv", index=False, encoding="utf-8")
+            elif fig is not None:
+                fig.savefig(f"{base}.{fmt}", format=fmt)
+        if fig is not None:
+            fig.clear()
+        result["write_s"] = time.perf_counter() - t2
+    except Exception as e:  # ошибка одного отчёта не прерывает остальные
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+#YES
+def run_reports(db_path: str, out_dir: str, reports: Optional[Sequence[Tuple[str, Dict[str, Any]]]] = None,
+                formats: Sequence[str] = REPORT_FORMATS, processes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Пакетное построение отчётов параллельно в пуле процессов; время каждого отчёта записывается
+    в out_dir/timings.csv
+    :param db_path: путь к базе данных
+    :param out_dir: папка для файлов отчётов
+    :param reports: (отчёт из REPORTS, параметры), по умолчанию BATCH_REPORTS
+    :param formats: форматы из REPORT_FORMATS
+    :param processes: число процессов, по умолчанию — по числу ядер; 0 — в текущем процессе
+    :return: результаты run_report в порядке reports, с общим временем total_s
+    """
+    reports = list(reports if reports is not None else BATCH_REPORTS)
+    unknown = [name for name, _ in reports if name not in REPORTS] + [f for f in formats if f not in REPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Неизвестные отчёты или форматы: {', '.join(unknown)}")
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    if processes == 0:
+        results = [run_report(db_path, out_dir, name, params, formats) for name, params in reports]
+    else:
+        with ProcessPoolExecutor(max_workers=processes or min(len(reports), os.cpu_count() or 1)) as pool:
+            futures = [pool.submit(run_report, db_path, out_dir, name, params, formats) for name, params in reports]
+            results = [f.result() for f in futures]
+    total = time.perf_counter() - started
+    for r in results:
+        r["total_s"] = r["data_s"] + r["render_s"] + r["write_s"]
+    pd.DataFrame(results).to_csv(os.path.join(out_dir, "timings.csv"), index=False, encoding="utf-8")
+    print(f"отчётов: {len(results)}, общее время {total:.2f} с")
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетное построение отчётов аналитики без GUI")
+    parser.add_argument("--db", default="app.db", help="путь к базе данных")
+    parser.add_argument("--out", default="reports", help="папка для файлов отчётов")
+    parser.add_argument("--reports", help=f"отчёты через запятую ({', '.join(REPORTS)}), по умолчанию набор BATCH_REPORTS")
+    parser.add_argument("--formats", default=",".join(REPORT_FORMATS), help="форматы через запятую")
+    parser.add_argument("--processes", type=int, default=None, help="число процессов, 0 — без пула")
+    args = parser.parse_args(argv)
+    reports = [(name, {}) for name in args.reports.split(",")] if args.reports else None
+    results = run_reports(args.db, args.out, reports, args.formats.split(","), args.processes)
+    for r in results:
+        status = r["error"] or f"{r['rows']} строк"
+        print(f"{r['file']:<40} данные {r['data_s']:.2f} с, рисунок {r['render_s']:.2f} с, "
+              f"файлы {r['write_s']:.2f} с — {status}")
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
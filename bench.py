@@ -0,0 +1,965 @@
+"""
+Замеры производительности слоя базы данных.
+Запуск: python bench.py <сценарий> [параметры], список сценариев — python bench.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import statistics
+import json
+import csv
+import tracemalloc
+import dataclasses
+import sqlite3
+
+import db
+from models import Customer, Product, Order, OrderItem
+
+
+def _fresh_db(name: str, profile: db.DbProfile = None) -> str:
+    """
+    Создаёт пустую базу во временной папке
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_"), name)
+    db.init_db(path, profile)
+    return path
+
+
+def _seed(db_path: str, customers: int = 100, products: int = 50) -> None:
+    """
+    Заполняет базу клиентами и товарами для сценариев с заказами
+    """
+    for i in range(customers):
+        db.add_customer(db_path, Customer(name=f"Клиент {i}", email=f"c{i}@mail.ru", phone="+79000000000", city=f"Город {i % 10}"))
+    for i in range(products):
+        db.add_product(db_path, Product(name=f"Товар {i}", price=100.0 + i, sku=f"SKU-{i:05d}"))
+
+
+#YES
+def bench_wal(write_seconds: float = 2.0, readers: int = 4) -> None:
+    """
+    Читатели во время долгой транзакции записи: писатель держит исключительную блокировку (BEGIN EXCLUSIVE)
+    write_seconds — как долгий commit. С журналом отката (journal_mode=DELETE) чтение ждёт писателя
+    (или получает SQLITE_BUSY после busy_timeout), в режиме WAL (профиль по умолчанию) — нет.
+    Завершается с кодом 1, если под WAL чтение получило ошибку или ждало дольше четверти write_seconds,
+    либо если под DELETE блокировки не было (сценарий ничего не проверил)
+    """
+    failures = []
+    for title, profile in [("DELETE", db.DbProfile(journal_mode="DELETE")), ("WAL", db.DbProfile())]:
+        path = _fresh_db("wal.db", profile)
+        _seed(path, customers=10, products=10)
+        db.add_order(path, Order(customer_id=1, items=[OrderItem(product_id=1, quantity=1)]))
+        stop = threading.Event()
+        locked = threading.Event()
+        latencies: list = []
+        errors: list = []
+
+        def writer():
+            # одна длинная транзакция: с журналом отката EXCLUSIVE не пускает читателей до commit,
+            # в WAL запрещает только другие записи
+            with db.connect(path) as con:
+                con.execute("BEGIN EXCLUSIVE")
+                locked.set()
+                end = time.perf_counter() + write_seconds
+                while time.perf_counter() < end:
+                    con.execute("INSERT INTO orders(customer_id, date, status, total) VALUES(1, '2024-01-01', 'new', 1)")
+                    time.sleep(0.001)
+            stop.set()
+
+        def reader():
+            locked.wait()
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    db.get_orders(path)
+                except sqlite3.OperationalError as e:
+                    errors.append(e)
+                latencies.append(time.perf_counter() - t0)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        db.close_all(path)
+        worst = max(latencies)
+        print(f"{title:>6}: чтений={len(latencies)} ошибок={len(errors)} "
+              f"медиана={statistics.median(latencies) * 1000:.2f} мс макс={worst * 1000:.2f} мс")
+        blocked = bool(errors) or worst >= write_seconds / 4
+        if title == "WAL" and blocked:
+            failures.append("WAL: читатели ждали писателя или получили SQLITE_BUSY")
+        if title == "DELETE" and not blocked:
+            failures.append("DELETE: читатели не ждали писателя — сценарий не создал блокировку")
+    if failures:
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+#YES
+def bench_bulk(n: int = 5000, items_per_order: int = 3) -> None:
+    """
+    Сравнение add_orders_bulk с циклом по add_order на n заказах
+    """
+    def make_orders():
+        return [
+            Order(customer_id=1 + i % 100, date=f"2024-01-{1 + i % 28:02d}",
+                  items=[OrderItem(product_id=1 + (i + k) % 50, quantity=1 + k) for k in range(items_per_order)])
+            for i in range(n)
+        ]
+
+    path = _fresh_db("loop.db")
+    _seed(path)
+    orders = make_orders()
+    t0 = time.perf_counter()
+    for o in orders:
+        db.add_order(path, o)
+    loop_time = time.perf_counter() - t0
+
+    path = _fresh_db("bulk.db")
+    _seed(path)
+    orders = make_orders()
+    t0 = time.perf_counter()
+    ids = db.add_orders_bulk(path, orders)
+    bulk_time = time.perf_counter() - t0
+    assert len(ids) == n
+    print(f"add_order в цикле: {loop_time:.3f} с, add_orders_bulk: {bulk_time:.3f} с, ускорение x{loop_time / bulk_time:.1f}")
+
+
+# формы запросов приложения: (имя, SQL, параметры, таблицы с допустимым полным проходом (агрегат по всем строкам),
+# постраничный ли запрос — у страниц недопустим и проход по всему индексу: каждая страница читала бы все строки до курсора)
+def _query_shapes():
+    where, params = db._orders_filter(date_from="2024-01-05", date_to="2024-01-10")
+    yield "get_orders(date_from, date_to)", f"{db.ORDERS_SELECT} WHERE {where} ORDER BY date DESC", params, set(), False
+    where, params = db._orders_filter(date_from="2024-01-05", status="paid")
+    yield "get_orders(date_from, status)", f"{db.ORDERS_SELECT} WHERE {where} ORDER BY date DESC", params, set(), False
+    where, params = db._orders_filter(status="paid")
+    yield "get_orders(status)", f"{db.ORDERS_SELECT} WHERE {where} ORDER BY date DESC", params, set(), False
+    where, params = db._orders_filter(customer_search="клиент 1", fts=True)
+    yield "get_orders(customer_search)", f"{db.ORDERS_SELECT} WHERE {where} ORDER BY date DESC", params, set(), False
+    where, params = db._customers_filter("клиент 1", fts=True)
+    yield "get_customers(search)", f"SELECT * FROM customers WHERE {where} ORDER BY created_at DESC", params, set(), False
+    where, params = db._products_filter("sku-0001", fts=True)
+    yield "get_products(search)", f"SELECT * FROM products WHERE {where} ORDER BY created_at DESC", params, set(), False
+    yield "get_order_items", db.ORDER_ITEMS_SQL, [1], set(), False
+    yield "top_customers", db.TOP_CUSTOMERS_SQL, [5], set(), False
+    # страницы get_*_page со следующей страницей по курсору (db._keyset_sql): сортировка по умолчанию —
+    # с курсором на значении и на NULL в столбце, который может быть NULL, затем другие сортировки sort_spec
+    row = {"id": 100, "date": "2024-01-10", "total": 500.0, "status": "paid", "customer_name": "Клиент 1",
+           "name": "Клиент 1", "price": 120.0, "created_at": "2024-01-01"}
+    where, params = db._orders_filter()
+    for table, columns, select_sql, where, params, default, sorts in [
+        ("orders", db.OrderSort, db.ORDERS_SELECT, where, params, db.ORDERS_DEFAULT_SORT,
+         ["total DESC", "total ASC", "status ASC, date DESC"]),
+        ("customers", db.CustomerSort, "SELECT * FROM customers", "1=1", [], db.CUSTOMERS_DEFAULT_SORT, ["name ASC"]),
+        ("products", db.ProductSort, "SELECT * FROM products", "1=1", [], db.PRODUCTS_DEFAULT_SORT,
+         ["price DESC", "name ASC"]),
+    ]:
+        spec = db.sort_spec(columns, None, default)
+        cursors = [("", row)] + [(f", {col.field}=NULL", {**row, col.field: None}) for col, _ in spec if col.nullable]
+        for suffix, cursor_row in cursors:
+            queries = db._keyset_sql(select_sql, where, params, 500, db.cursor_after(spec, cursor_row), spec)
+            for i, (sql, query_params) in enumerate(queries, 1):
+                yield f"get_{table}_page{suffix} [{i}/{len(queries)}]", sql, query_params, set(), True
+        for sort in sorts:
+            spec = db.sort_spec(columns, sort, [])
+            for sql, query_params in db._keyset_sql(select_sql, where, params, 500, db.cursor_after(spec, row), spec):
+                yield f"{table} page sort={sort}", sql, query_params, set(), True
+
+
+#YES
+def bench_plans(n: int = 2000) -> None:
+    """
+    Проверка EXPLAIN QUERY PLAN: ни один запрос приложения не должен выполнять полный проход таблицы
+    (SCAN без индекса), кроме явно разрешённых агрегатов, а страницы с курсором — и полный проход индекса.
+    При регрессии — код возврата 1
+    """
+    path = _fresh_db("plans.db")
+    _seed(path)
+    db.add_orders_bulk(path, [
+        Order(customer_id=1 + i % 100, date=f"2024-01-{1 + i % 28:02d}", status=["new", "paid", "shipped"][i % 3],
+              items=[OrderItem(product_id=1 + i % 50, quantity=1)])
+        for i in range(n)
+    ])
+    with db.connect(path) as con:
+        con.execute("ANALYZE")
+    failed = False
+    for name, sql, params, allowed, paged in _query_shapes():
+        plan = db.explain_query_plan(path, sql, params)
+        scans = [line for line in plan if line.startswith("SCAN ") and (paged or " INDEX" not in line)
+                 and line.split()[1] not in allowed]
+        failed = failed or bool(scans)
+        print(f"{'FAIL' if scans else 'ok':>4} {name}: {'; '.join(plan)}")
+    if failed:
+        sys.exit(1)
+
+
+def _generate(db_path: str, order_items: int) -> None:
+    """
+    Быстрая генерация большого набора данных средствами SQL: order_items строк позиций,
+    по 10 позиций на заказ
+    """
+    orders = max(1, order_items // 10)
+    with db.connect(db_path, write=True) as con:
+        con.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000)
+            INSERT INTO customers(id, name, email, phone, city, created_at)
+            SELECT i, 'Клиент ' || i, 'c' || i || '@mail.ru', '+7900' || printf('%07d', i), 'Город ' || (i % 50),
+                   '2024-01-01T00:00:00'
+            FROM n
+        """)
+        con.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200)
+            INSERT INTO products(id, name, price, sku, created_at)
+            SELECT i, 'Товар ' || i, 100 + i, 'SKU-' || i, '2024-01-01T00:00:00' FROM n
+        """)
+        con.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO orders(id, customer_id, date, status, total)
+            SELECT i, 1 + i % 1000, date('2020-01-01', '+' || (i % 1500) || ' days'),
+                   CASE i % 4 WHEN 0 THEN 'new' WHEN 1 THEN 'paid' WHEN 2 THEN 'shipped' ELSE 'cancelled' END, 0
+            FROM n
+        """, (orders,))
+        con.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO order_items(id, order_id, product_id, quantity, price, subtotal)
+            SELECT i, 1 + (i - 1) / 10, 1 + i % 200, 1 + i % 3, 100 + i % 200, (1 + i % 3) * (100 + i % 200) FROM n
+        """, (orders * 10,))
+        con.execute("UPDATE orders SET total = (SELECT SUM(subtotal) FROM order_items WHERE order_id = orders.id)")
+
+
+def _measure(func, *args, trace: bool = True, **kwargs):
+    """
+    Время выполнения и пик памяти Python-аллокаций (tracemalloc, при trace=False — 0).
+    tracemalloc заметно замедляет выполнение, для сравнения скорости запускать с trace=False
+    """
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    func(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+#YES
+def bench_csv(rows: int = 1_000_000) -> None:
+    """
+    Потоковый экспорт/импорт CSV: пик памяти не должен зависеть от размера таблиц
+    """
+    src = _fresh_db("csv_src.db")
+    _generate(src, rows)
+    folder = tempfile.mkdtemp(prefix="bench_csv_")
+    elapsed, peak = _measure(db.export_to_csv, src, folder)
+    print(f"export_to_csv: {elapsed:.2f} с, пик памяти {peak / 2 ** 20:.1f} МиБ")
+    dst = _fresh_db("csv_dst.db")
+    elapsed, peak = _measure(db.import_from_csv, dst, folder)
+    print(f"import_from_csv: {elapsed:.2f} с, пик памяти {peak / 2 ** 20:.1f} МиБ")
+    with db.connect(dst) as con:
+        assert con.execute("SELECT COUNT(*) FROM order_items").fetchone()[0] == rows // 10 * 10
+
+
+def _legacy_export_json(db_path: str, path: str) -> None:
+    # прежняя реализация: все таблицы в памяти и json.dump(..., indent=2)
+    with db.connect(db_path) as con:
+        data = {t: [dict(r) for r in con.execute(f"SELECT * FROM {t}").fetchall()] for t in db.TABLES}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _legacy_import_json(db_path: str, path: str) -> None:
+    # прежняя реализация: json.load всего файла и один список значений на таблицу
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with db.connect(db_path, write=True) as con:
+        for t, rows in data.items():
+            if not rows:
+                continue
+            cols = rows[0].keys()
+            values = [tuple(row[c] for c in cols) for row in rows]
+            con.executemany(f"INSERT OR REPLACE INTO {t} ({','.join(cols)}) VALUES ({','.join(['?'] * len(cols))})", values)
+
+
+#YES
+def bench_json(rows: int = 1_000_000) -> None:
+    """
+    Экспорт/импорт JSON и NDJSON: время (без tracemalloc) и пик памяти (отдельным прогоном)
+    в сравнении с прежней реализацией
+    """
+    src = _fresh_db("json_src.db")
+    _generate(src, rows)
+    folder = tempfile.mkdtemp(prefix="bench_json_")
+    variants = [
+        ("прежний JSON", _legacy_export_json, _legacy_import_json, "legacy.json"),
+        ("JSON", db.export_to_json, db.import_from_json, "data.json"),
+        ("NDJSON", db.export_to_ndjson, db.import_from_ndjson, "data.ndjson"),
+        ("NDJSON.gz", db.export_to_ndjson, db.import_from_ndjson, "data.ndjson.gz"),
+    ]
+    for title, export, import_, name in variants:
+        path = os.path.join(folder, name)
+        t_exp, _ = _measure(export, src, path, trace=False)
+        _, m_exp = _measure(export, src, path)
+        t_imp, _ = _measure(import_, _fresh_db("json_dst.db"), path, trace=False)
+        _, m_imp = _measure(import_, _fresh_db("json_dst.db"), path)
+        print(f"{title:>13}: экспорт {t_exp:.2f} с / {m_exp / 2 ** 20:.1f} МиБ, "
+              f"импорт {t_imp:.2f} с / {m_imp / 2 ** 20:.1f} МиБ, файл {os.path.getsize(path) / 2 ** 20:.1f} МиБ")
+
+
+#YES
+def bench_stats(operations: int = 2000) -> None:
+    """
+    Инкрементальные customer_stats и orders_daily против полного пересчёта: случайные вставки, пакетные вставки,
+    изменения, удаления заказов и повторный импорт. При расхождении — код возврата 1
+    """
+    import random
+    random.seed(42)
+    path = _fresh_db("stats.db")
+    _generate(path, 5000)
+    for _ in range(operations):
+        r = random.random()
+        if r < 0.3:
+            db.add_order(path, Order(customer_id=random.randint(1, 1000), date=f"2025-{random.randint(1, 12):02d}-01",
+                                     items=[OrderItem(product_id=random.randint(1, 200), quantity=2)]))
+        elif r < 0.4:
+            db.add_orders_bulk(path, [Order(customer_id=random.randint(1, 1000), items=[OrderItem(product_id=1)])
+                                      for _ in range(10)])
+        elif r < 0.7:
+            with db.connect(path, write=True) as con:
+                con.execute("UPDATE orders SET customer_id = ?, total = total + 1, date = '2019-01-01', status = ? "
+                            "WHERE id = (SELECT id FROM orders ORDER BY random() LIMIT 1)",
+                            (random.randint(1, 1000), random.choice(["new", "paid", "shipped"])))
+        else:
+            with db.connect(path, write=True) as con:
+                con.execute("DELETE FROM orders WHERE id = (SELECT id FROM orders ORDER BY random() LIMIT 1)")
+    export = os.path.join(tempfile.mkdtemp(prefix="bench_stats_"), "data.ndjson")
+    db.export_to_ndjson(path, export)
+    db.import_from_ndjson(path, export)
+    mismatches = db.check_customer_stats(path) + db.check_orders_daily(path)
+    t0 = time.perf_counter()
+    top = db.top_customers(path, 5)
+    elapsed = time.perf_counter() - t0
+    print(f"расхождений: {len(mismatches)}, top_customers: {elapsed * 1000:.2f} мс, лидер: {top[0]}")
+    if mismatches:
+        print(mismatches[:5])
+        sys.exit(1)
+
+
+#YES
+def bench_search(orders: int = 50000) -> None:
+    """
+    Посимвольный ввод строк поиска: запрос к базе на каждый символ против SearchCache
+    (уточнение в памяти и попадания в кэш). Результаты обоих способов сверяются между собой, а результаты клиентов
+    по строкам от db.FTS_MIN_TERM символов — с поиском подстроки без учёта регистра перебором;
+    при расхождении — код возврата 1
+    """
+    import search
+    path = _fresh_db("search.db")
+    _generate(path, orders)
+    terms = ["Клиент 12", "Клиент 7", "Клиент 12", "Товар 1", "c42@", "иент 12", "ГОРОД 4", "0012"]
+    sources = [("customers", ()), ("orders", (None, None, None))]
+    typed = [(src, flt, t[:i]) for t in terms for src, flt in sources for i in range(1, len(t) + 1)]
+    t0 = time.perf_counter()
+    direct = [search.SOURCES[src].fetch_page(path, term, flt, 10 ** 9, None)[0] for src, flt, term in typed]
+    t_db = time.perf_counter() - t0
+    cache = search.SearchCache(path, max_rows=10 ** 6)
+    t0 = time.perf_counter()
+    cached = [cache.lookup(src, term, flt) for src, flt, term in typed]
+    t_cache = time.perf_counter() - t0
+    wrong = sum([r["id"] for r in a] != [r["id"] for r in b] for a, b in zip(direct, cached))
+    everyone = db.get_customers(path)
+    columns = search.SOURCES["customers"].columns
+    for (src, _, term), rows in zip(typed, direct):
+        if src == "customers" and len(term) >= db.FTS_MIN_TERM:
+            needle = term.lower()
+            expected = {r["id"] for r in everyone if any(needle in str(r[c]).lower() for c in columns)}
+            wrong += {r["id"] for r in rows} != expected
+    print(f"запросов: {len(typed)}, база: {t_db * 1000:.0f} мс, кэш: {t_cache * 1000:.0f} мс "
+          f"(попаданий {cache.hits}, уточнений {cache.narrowed}, запросов {cache.misses}), расхождений: {wrong}")
+    if wrong:
+        sys.exit(1)
+
+
+def _legacy_quicksort(orders, key=lambda o: o.date, reverse=False):
+    # прежняя реализация models.quicksort_orders — для сравнения
+    if len(orders) <= 1:
+        return orders[:]
+    pivot = orders[len(orders) // 2]
+    pivot_key = key(pivot)
+    left = [o for o in orders if key(o) < pivot_key]
+    middle = [o for o in orders if key(o) == pivot_key]
+    right = [o for o in orders if key(o) > pivot_key]
+    result = _legacy_quicksort(left, key) + middle + _legacy_quicksort(right, key)
+    return list(reversed(result)) if reverse else result
+
+
+#YES
+def bench_sort(max_n: int = 1_000_000) -> None:
+    """
+    Сортировка заказов: прежний рекурсивный quicksort против sorting (sort_records и SortIndex
+    с кэшем перестановок) на 10k/100k/1M заказов. Порядок ключей сверяется, при расхождении — код возврата 1
+    """
+    import random
+    import sorting
+    random.seed(42)
+    statuses = ["new", "paid", "shipped", "cancelled"]
+    wrong = 0
+    n = 10_000
+    while n <= max_n:
+        orders = [Order(id=i, customer_id=random.randint(1, 1000), date=f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                        status=random.choice(statuses), total=round(random.uniform(10, 10000), 2)) for i in range(n)]
+        for name, key, rev in [("date_desc", lambda o: o.date, True), ("total_asc", lambda o: o.total, False)]:
+            t0 = time.perf_counter()
+            try:
+                legacy = _legacy_quicksort(orders, key=key, reverse=rev)
+                t_legacy = f"{(time.perf_counter() - t0) * 1000:.0f} мс"
+            except RecursionError:
+                legacy, t_legacy = None, "RecursionError"
+            t0 = time.perf_counter()
+            new = sorting.sort_records(orders, key=key, reverse=rev)
+            t_new = time.perf_counter() - t0
+            if legacy is not None and [key(o) for o in legacy] != [key(o) for o in new]:
+                wrong += 1
+            print(f"n={n:>8} {name:>10}: quicksort {t_legacy}, sort_records {t_new * 1000:.0f} мс")
+        index = sorting.SortIndex(orders, sorting.ORDER_ATTR_KEYS)
+        spec = sorting.ORDER_SORTS["status_asc"]
+        t0 = time.perf_counter()
+        index.sorted(spec)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index.sorted(spec)
+        t_cached = time.perf_counter() - t0
+        print(f"n={n:>8} status, date desc, id desc: {t_first * 1000:.0f} мс, повторно из кэша {t_cached * 1000:.1f} мс")
+        n *= 10
+    if wrong:
+        print(f"расхождений: {wrong}")
+        sys.exit(1)
+
+
+def _retained(build):
+    """
+    Память Python, занятая результатом build() (tracemalloc, текущий объём после построения)
+    """
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+# прежние модели: dataclass без __slots__, to_dict через dataclasses.asdict — для сравнения
+@dataclasses.dataclass
+class _LegacyOrderItem:
+    id: int = None
+    order_id: int = None
+    product_id: int = 0
+    quantity: int = 1
+    price: float = 0.0
+    subtotal: float = 0.0
+
+
+@dataclasses.dataclass
+class _LegacyOrder:
+    id: int = None
+    customer_id: int = 0
+    date: str = ""
+    status: str = "new"
+    total: float = 0.0
+    items: list = dataclasses.field(default_factory=list)
+
+
+#YES
+def bench_models(n: int = 200_000, items_per_order: int = 3) -> None:
+    """
+    Память n заказов с позициями в разных представлениях: словари строк (как возвращает db),
+    прежние dataclass, SlottedOrder/SlottedOrderItem, колоночный OrderBatch; скорость to_dict и преобразования в DataFrame
+    """
+    import pandas as pd
+    from models import OrderBatch, SlottedOrder, SlottedOrderItem
+    rows = [(i, 1 + i % 1000, f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", ("new", "paid", "shipped")[i % 3],
+             round(10.0 + i % 500, 2)) for i in range(1, n + 1)]
+    item_rows = [(i * items_per_order + k, i, 1 + (i + k) % 200, 1 + k, 5.0, 5.0 * (1 + k))
+                 for i in range(1, n + 1) for k in range(items_per_order)]
+    cols = ("id", "customer_id", "date", "status", "total")
+    item_cols = ("id", "order_id", "product_id", "quantity", "price", "subtotal")
+
+    def group_items(make):
+        by_order = {}
+        for r in item_rows:
+            by_order.setdefault(r[1], []).append(make(r))
+        return by_order
+
+    def as_dicts():
+        items = group_items(lambda r: dict(zip(item_cols, r)))
+        return [dict(zip(cols, r), items=items.get(r[0], [])) for r in rows]
+
+    def as_legacy():
+        items = group_items(lambda r: _LegacyOrderItem(*r))
+        return [_LegacyOrder(*r, items=items.get(r[0], [])) for r in rows]
+
+    def as_slotted():
+        items = group_items(lambda r: SlottedOrderItem(*r))
+        return [SlottedOrder(*r, items=items.get(r[0], [])) for r in rows]
+
+    def as_batch():
+        batch = OrderBatch()
+        batch.extend_rows(rows)
+        batch.items.extend_rows(item_rows)
+        return batch
+
+    print(f"{n} заказов по {items_per_order} позиции")
+    results = {}
+    for name, build in (("словари", as_dicts), ("dataclass", as_legacy), ("SlottedOrder", as_slotted),
+                        ("OrderBatch", as_batch)):
+        obj, size = _retained(build)
+        results[name] = obj
+        print(f"  {name:>16}: {size / 2 ** 20:8.1f} МБ, {size / n:6.0f} байт на заказ")
+    batch, slotted = results["OrderBatch"], results["SlottedOrder"]
+    if [o.to_dict() for o in batch.to_orders()[:1000]] != [o.to_dict() for o in slotted[:1000]]:
+        print("OrderBatch.to_orders не совпадает с исходными заказами")
+        sys.exit(1)
+    sample = results["dataclass"][:50_000]
+    t0 = time.perf_counter()
+    for o in sample:
+        dataclasses.asdict(o)
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for o in slotted[:50_000]:
+        o.to_dict()
+    t_new = time.perf_counter() - t0
+    print(f"to_dict 50000 заказов: asdict {t_legacy * 1000:.0f} мс, SlottedOrder.to_dict {t_new * 1000:.0f} мс")
+    t0 = time.perf_counter()
+    pd.DataFrame.from_records(rows, columns=cols)
+    t_records = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    frame = batch.to_frame()
+    t_frame = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    OrderBatch.from_frame(frame)
+    t_back = time.perf_counter() - t0
+    print(f"DataFrame: из кортежей {t_records * 1000:.0f} мс, OrderBatch.to_frame {t_frame * 1000:.0f} мс, "
+          f"from_frame {t_back * 1000:.0f} мс")
+
+
+def _legacy_validate(customer) -> None:
+    # прежний Customer.validate: шаблоны компилировались (через кэш re) при каждом вызове
+    import re
+    email_re = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+    phone_re = re.compile(r"^\+?\d[\d\s\-()]{7,}$")
+    if customer.email and not email_re.match(customer.email):
+        raise ValueError("Некорректный email")
+    if customer.phone and not phone_re.match(customer.phone):
+        raise ValueError("Некорректный номер телефона")
+    if not customer.name:
+        raise ValueError("Имя клиента обязательно")
+
+
+#YES
+def bench_validate(n: int = 500_000, import_rows: int = 50_000) -> None:
+    """
+    Проверка n клиентов (3% с ошибками): по одному объекту с исключениями, validate_many по столбцам
+    (кортежи строк как при импорте и DataFrame); импорт первых import_rows строк CSV без проверки и с on_invalid="skip"
+    """
+    import pandas as pd
+    from validation import validate_many
+    cols = ["id", "name", "email", "phone", "city"]
+    rows = [(i, f"Клиент {i}" if i % 97 else "", f"c{i}@mail.ru" if i % 50 else f"c{i}@mail",
+             "+79000000000", f"Город {i % 10}") for i in range(1, n + 1)]
+    customers = [Customer(id=r[0], name=r[1], email=r[2], phone=r[3], city=r[4]) for r in rows]
+
+    def one_by_one(check):
+        bad = 0
+        for c in customers:
+            try:
+                check(c)
+            except ValueError:
+                bad += 1
+        return bad
+
+    t0 = time.perf_counter()
+    bad_legacy = one_by_one(_legacy_validate)
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bad_model = one_by_one(Customer.validate)
+    t_model = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    report = validate_many("customers", rows, cols)
+    t_many = time.perf_counter() - t0
+    frame = pd.DataFrame(rows, columns=cols)
+    t0 = time.perf_counter()
+    frame_report = validate_many("customers", frame)
+    t_frame = time.perf_counter() - t0
+    print(f"{n} клиентов: прежний validate {t_legacy * 1000:.0f} мс, Customer.validate {t_model * 1000:.0f} мс, "
+          f"validate_many {t_many * 1000:.0f} мс, validate_many(DataFrame) {t_frame * 1000:.0f} мс")
+    print("  " + report.summary())
+    if not (bad_legacy == bad_model == len(report.invalid_rows) == len(frame_report.invalid_rows)):
+        print(f"расхождение числа ошибок: {bad_legacy}, {bad_model}, {len(report.invalid_rows)}, "
+              f"{len(frame_report.invalid_rows)}")
+        sys.exit(1)
+    folder = tempfile.mkdtemp(prefix="bench_")
+    with open(os.path.join(folder, "customers.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(cols)
+        w.writerows(rows[:import_rows])
+    for on_invalid in (None, "skip"):
+        path = _fresh_db(f"validate_{on_invalid}.db")
+        elapsed, _ = _measure(db.import_from_csv, path, folder, on_invalid=on_invalid, trace=False)
+        print(f"импорт CSV {import_rows} строк, on_invalid={on_invalid}: {elapsed * 1000:.0f} мс")
+
+
+def _legacy_import_csv(db_path: str, folder: str, batch_size: int = db.IO_BATCH_SIZE) -> None:
+    # прежняя реализация: INSERT OR REPLACE пачками прямо в рабочие таблицы с индексами и триггерами
+    with db.connect(db_path, write=True) as con:
+        for t in db.TABLES:
+            with open(os.path.join(folder, f"{t}.csv"), "r", newline="", encoding="utf-8") as f:
+                r = csv.reader(f)
+                cols = next(r)
+                sql = f"INSERT OR REPLACE INTO {t} ({','.join(cols)}) VALUES ({','.join(['?'] * len(cols))})"
+                for chunk in db._batched(r, batch_size):
+                    con.executemany(sql, chunk)
+
+
+def _counts(db_path: str) -> str:
+    with db.connect(db_path) as con:
+        return ", ".join(f"{t} {con.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0]}" for t in db.TABLES)
+
+
+#YES
+def bench_import(rows: int = 1_000_000) -> None:
+    """
+    Импорт CSV через промежуточные таблицы в сравнении с прежней вставкой в рабочие таблицы:
+    в пустую базу (с пересозданием индексов и без) и повторно в заполненную (UPSERT против REPLACE)
+    """
+    src = _fresh_db("import_src.db")
+    _generate(src, rows)
+    folder = tempfile.mkdtemp(prefix="bench_import_")
+    db.export_to_csv(src, folder)
+    variants = [
+        ("прежний REPLACE", _legacy_import_csv, {}),
+        ("staging", db.import_from_csv, {"rebuild_indexes": False}),
+        ("staging + индексы", db.import_from_csv, {"rebuild_indexes": True}),
+    ]
+    for title, func, kwargs in variants:
+        path = _fresh_db("import_dst.db")
+        empty, _ = _measure(func, path, folder, trace=False, **kwargs)
+        again, _ = _measure(func, path, folder, trace=False, **kwargs)
+        print(f"{title:>17}: в пустую базу {empty:.2f} с, повторно {again:.2f} с ({_counts(path)})")
+    path = _fresh_db("import_dst.db")
+    db.import_from_csv(path, folder)
+    reports = db.import_from_csv(path, folder)
+    print("  " + "; ".join(r.summary() for r in reports.values()))
+    print(f"  расхождение агрегатов: customer_stats {len(db.check_customer_stats(path))}, "
+          f"orders_daily {len(db.check_orders_daily(path))}")
+
+
+STARTUP_HEAVY = ("pandas", "numpy", "matplotlib", "seaborn", "networkx")  # не должны загружаться при запуске
+
+
+def _import_times(module: str) -> dict:
+    """
+    Время импорта модуля в новом интерпретаторе по -X importtime: {модуль: (собственное, суммарное) в мкс}
+    """
+    import subprocess
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        times.setdefault(name.strip(), (int(own), int(total)))
+    return times
+
+
+#YES
+def bench_importtime(budget_ms: int = 300, runs: int = 5, module: str = "main") -> None:
+    """
+    Время импорта приложения (python -X importtime -c "import main"), медиана из runs запусков.
+    Завершается с кодом 1, если медиана больше budget_ms или при запуске загружается научный стек STARTUP_HEAVY
+    """
+    totals = []
+    for _ in range(runs):
+        times = _import_times(module)
+        totals.append(times[module][1] / 1000)
+    median = statistics.median(totals)
+    print(f"import {module}: медиана {median:.0f} мс (бюджет {budget_ms} мс), запуски: "
+          + ", ".join(f"{t:.0f}" for t in totals))
+    slowest = sorted(((total, name) for name, (_, total) in times.items() if "." not in name), reverse=True)[:10]
+    for total, name in slowest:
+        print(f"  {name:<24} {total / 1000:8.1f} мс")
+    heavy = [name for name in STARTUP_HEAVY if name in times]
+    if heavy:
+        print("при запуске загружаются: " + ", ".join(heavy))
+    if heavy or median > budget_ms:
+        sys.exit(1)
+
+
+def _legacy_seed_check(db_path: str) -> bool:
+    # прежняя проверка seed_if_empty: чтение всех клиентов и товаров
+    return bool(db.get_customers(db_path)) and bool(db.get_products(db_path))
+
+
+#YES
+def bench_startup(rows: int = 1_000_000, customers: int = 200_000, timeout: float = 30.0) -> None:
+    """
+    Запуск приложения на базе с rows позициями заказов и customers клиентами: проверка пустоты таблиц
+    (seed_if_empty) прежним способом и через EXISTS, затем (если есть дисплей) время до первой отрисовки окна
+    и до загрузки первой вкладки
+    """
+    import main
+    path = _fresh_db("startup.db")
+    _generate(path, rows)
+    with db.connect(path, write=True) as con:
+        con.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1001 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO customers(id, name, email, phone, city, created_at)
+            SELECT i, 'Клиент ' || i, 'c' || i || '@mail.ru', '+7900' || printf('%07d', i), 'Город ' || (i % 50),
+                   datetime('2024-01-01', '+' || i || ' minutes')
+            FROM n
+        """, (customers,))
+    print(", ".join(f"{t} {db.count_rows(path, t)}" for t in db.TABLES))
+    for title, check in (("прежняя проверка", _legacy_seed_check), ("seed_if_empty", main.seed_if_empty)):
+        elapsed, _ = _measure(check, path, trace=False)
+        print(f"{title:>16}: {elapsed * 1000:.1f} мс")
+    try:
+        from gui import App
+        t0 = time.perf_counter()
+        app = App(path, prewarm=False)
+    except Exception as e:  # tkinter.TclError без дисплея
+        print(f"окно не создано ({e}), замер запуска GUI пропущен")
+        return
+    try:
+        t_init = time.perf_counter() - t0
+        app.update()
+        t_draw = time.perf_counter() - t0
+        while app.tasks.busy() and time.perf_counter() - t0 < timeout:
+            app.update()
+            time.sleep(0.005)
+        t_loaded = time.perf_counter() - t0
+        print(f"окно: конструктор {t_init * 1000:.0f} мс, первая отрисовка {t_draw * 1000:.0f} мс, "
+              f"первая вкладка загружена {t_loaded * 1000:.0f} мс ({len(app.c_tree.get_children())} строк)")
+    finally:
+        app.tasks.shutdown()
+        app.destroy()
+
+
+BENCH_CHARTS = [
+    ("top_customers", {"n": 5}),
+    ("orders_timeseries", {"freq": "D"}),
+    ("orders_timeseries", {"freq": "M"}),
+    ("customers_network", {"by": "city", "mode": "aggregate"}),
+]
+
+
+#YES
+def bench_figures(clicks: int = 1000, legacy_clicks: int = 100, write_every: int = 100, rows: int = 20_000,
+                  leak_mib: float = 8.0) -> None:
+    """
+    Повторные клики по кнопкам графиков: прежний способ (новая фигура и новый холст на каждый клик)
+    и способ вкладки аналитики — данные из ChartCache, перерисованные в одну фигуру одного холста;
+    каждые write_every кликов данные «меняются» (db.bump_version).
+    Холст — FigureCanvasAgg, чтобы сценарий работал без дисплея. Память — RSS процесса после gc.collect()
+    (tracemalloc замедляет отрисовку на порядок) и число живых фигур и осей. Завершается с кодом 1, если после
+    первых 10% кликов RSS вырос больше чем на leak_mib или прибавились фигуры — медленную утечку
+    (например, пустых фигур) RSS на небольшом числе кликов не показывает
+    """
+    import gc
+    import warnings
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+    import analysis
+    from charts import ChartCache
+    warnings.simplefilter("ignore", FutureWarning)  # предупреждение seaborn о palette без hue
+    path = _fresh_db("figures.db")
+    _generate(path, rows)
+
+    def memory() -> float:
+        gc.collect()
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+    def live_artists() -> tuple:
+        # фигуры и оси, на которые ещё есть ссылки (вызывается после memory(), то есть после gc.collect())
+        objects = gc.get_objects()
+        return sum(isinstance(o, Figure) for o in objects), sum(isinstance(o, Axes) for o in objects)
+
+    def run(count, click):
+        marks = {}
+        t0 = time.perf_counter()
+        for i in range(count):
+            if i and i % write_every == 0:
+                db.bump_version(path, *db.TABLES)
+            click(*BENCH_CHARTS[i % len(BENCH_CHARTS)])
+            if (i + 1) % max(1, count // 10) == 0:
+                marks[i + 1] = (memory(), live_artists())
+        return time.perf_counter() - t0, marks
+
+    canvases = []
+
+    def render(chart, params, data, fig=None):
+        report = analysis.REPORTS[chart]
+        return report.render(data, fig=fig, **{k: params[k] for k in report.render_params if k in params})
+
+    def legacy_click(chart, params):
+        fig = render(chart, params, analysis.REPORTS[chart].data(path, **params))
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        canvases.append(canvas)  # в GUI прежние фигуры не закрывались, а холсты оставляли привязки событий окна
+
+    cache = ChartCache(path)
+    canvas = FigureCanvasAgg(Figure(figsize=(8, 5)))
+
+    def cached_click(chart, params):
+        key = cache.key(chart, params)
+        data = cache.get(key)
+        if data is None:
+            data = cache.put(key, analysis.REPORTS[chart].data(path, **params))
+        render(chart, params, data, fig=canvas.figure)
+        canvas.draw()
+
+    for title, count, click in (("ChartCache", clicks, cached_click), ("прежний", legacy_clicks, legacy_click)):
+        base = memory()
+        elapsed, marks = run(count, click)
+        print(f"{title:>11}: {count} кликов за {elapsed:.1f} с ({elapsed / count * 1000:.1f} мс на клик), RSS "
+              + ", ".join(f"{n}: {m - base:+.1f}" for n, (m, _) in marks.items()) + " МиБ")
+        (first, first_live), (last, last_live) = marks[min(marks)], marks[max(marks)]
+        print(f"{'':>11}  фигур и осей: {first_live} -> {last_live}")
+        if title == "ChartCache":
+            leaks = []
+            if last - first > leak_mib:
+                leaks.append(f"RSS {first:.1f} -> {last:.1f} МиБ")
+            if last_live[0] > first_live[0]:
+                leaks.append(f"фигуры {first_live[0]} -> {last_live[0]}")
+    print(f"  кэш: {cache.hits} попаданий, {cache.misses} построений, в кэше {len(cache)}")
+    if leaks:
+        print("память растёт: " + ", ".join(leaks))
+        sys.exit(1)
+
+
+#YES
+def bench_reports(rows: int = 1_000_000) -> None:
+    """
+    Пакетное построение отчётов (analysis.run_reports) в одном процессе и в пуле процессов
+    """
+    import analysis
+    path = _fresh_db("reports.db")
+    _generate(path, rows)
+    for processes in (0, None):
+        out = tempfile.mkdtemp(prefix="bench_reports_")
+        t0 = time.perf_counter()
+        results = analysis.run_reports(path, out, processes=processes)
+        elapsed = time.perf_counter() - t0
+        slowest = max(results, key=lambda r: r["total_s"])
+        print(f"processes={processes}: {elapsed:.2f} с, самый долгий отчёт {slowest['file']} {slowest['total_s']:.2f} с")
+
+
+LEGACY_PRODUCT_SALES_SQL = """
+    SELECT oi.product_id, COUNT(*), SUM(oi.quantity), SUM(oi.subtotal)
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+    WHERE o.status != 'cancelled'
+    GROUP BY oi.product_id
+"""
+
+
+#YES
+def bench_sales(rows: int = 1_000_000) -> None:
+    """
+    Аналитика продаж (sales): агрегаты по товарам против соединения каждой позиции с заказом,
+    агрегаты по клиентам, ABC и RFM поверх уже сгруппированных строк
+    """
+    import sales
+    path = _fresh_db("sales.db")
+    _generate(path, rows)
+    with db.connect(path) as con:
+        t0 = time.perf_counter()
+        legacy = con.execute(LEGACY_PRODUCT_SALES_SQL).fetchall()
+        print(f"соединение позиций с заказами: {time.perf_counter() - t0:.2f} с, товаров {len(legacy)}")
+    t0 = time.perf_counter()
+    products = sales.product_sales(path)
+    print(f"product_sales: {time.perf_counter() - t0:.2f} с, товаров {len(products)}")
+    t0 = time.perf_counter()
+    orders = sales.customer_orders(path)
+    print(f"customer_orders: {time.perf_counter() - t0:.2f} с, клиентов {len(orders)}")
+    t0 = time.perf_counter()
+    abc = sales.abc_classes(products)
+    rfm = sales.rfm_segments(orders)
+    summary = sales.sales_summary(products, orders)
+    print(f"ABC + RFM + сводка: {(time.perf_counter() - t0) * 1000:.1f} мс, "
+          f"классы {abc['abc'].value_counts().to_dict()}, сегментов {rfm['segment'].nunique()}, "
+          f"средний чек {summary['avg_order_value']:.2f}")
+    expected = {r[0]: round(r[3], 2) for r in legacy}
+    actual = dict(zip(products["product_id"], products["revenue"]))
+    if any(abs(expected[k] - actual.get(k, 0.0)) > 0.01 for k in expected):
+        print("выручка product_sales расходится с соединением")
+        sys.exit(1)
+
+
+# сценарии с проверками и их небольшие размеры для bench.py check
+CHECKS = [
+    ("plans", bench_plans, (500,)),
+    ("stats", bench_stats, (200,)),
+    ("search", bench_search, (2000,)),
+    ("sort", bench_sort, (10_000,)),
+    ("models", bench_models, (5000,)),
+    ("validate", bench_validate, (5000, 2000)),
+    ("wal", bench_wal, (0.5, 2)),
+    ("sales", bench_sales, (20_000,)),
+    ("figures", bench_figures, (120, 12, 40, 2000)),
+]
+
+
+#YES
+def bench_check() -> None:
+    """
+    Быстрый прогон сценариев с проверками (CHECKS) на небольших данных: сценарий не прошёл,
+    если завершился с ненулевым кодом или исключением. Код возврата 1, если не прошёл хотя бы один
+    """
+    import traceback
+    failed = []
+    for name, func, args in CHECKS:
+        print(f"--- {name}")
+        t0 = time.perf_counter()
+        try:
+            func(*args)
+        except SystemExit as e:
+            if e.code:
+                failed.append(name)
+        except Exception:
+            traceback.print_exc()
+            failed.append(name)
+        print(f"--- {name}: {'ошибка' if name in failed else 'ok'} за {time.perf_counter() - t0:.1f} с")
+    print(f"не прошли: {', '.join(failed)}" if failed else f"все {len(CHECKS)} сценариев прошли")
+    if failed:
+        sys.exit(1)
+
+
+SCENARIOS = {
+    "wal": bench_wal,
+    "bulk": bench_bulk,
+    "plans": bench_plans,
+    "csv": bench_csv,
+    "json": bench_json,
+    "stats": bench_stats,
+    "search": bench_search,
+    "sort": bench_sort,
+    "models": bench_models,
+    "validate": bench_validate,
+    "import": bench_import,
+    "importtime": bench_importtime,
+    "startup": bench_startup,
+    "figures": bench_figures,
+    "reports": bench_reports,
+    "sales": bench_sales,
+    "check": bench_check,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in SCENARIOS:
+        print("Сценарии:", ", ".join(SCENARIOS))
+        sys.exit(1)
+    SCENARIOS[sys.argv[1]](*[float(a) if "." in a else int(a) for a in sys.argv[2:]])
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+import db
+
+#кэш данных графиков вкладки аналитики (matplotlib здесь не импортируется — см. gui)
+
+# таблицы, от которых зависят отчёты analysis.REPORTS: данные действительны, пока не изменились их версии
+CHART_TABLES: Dict[str, Tuple[str, ...]] = {
+    "top_customers": ("customers", "orders"),
+    "orders_timeseries": ("orders",),
+    "customers_network": ("customers", "orders", "order_items", "products"),
+    "top_products": ("orders", "order_items", "products"),
+    "abc": ("orders", "order_items", "products"),
+    "rfm": ("customers", "orders"),
+    "sales_summary": ("orders", "order_items"),
+}
+
+ChartKey = Tuple[str, Tuple[Tuple[str, Hashable], ...], Tuple[int, ...]]
+
+
+#YES
+class ChartCache:
+    """
+    LRU-кэш данных графиков (результатов analysis.REPORTS[отчёт].data). Ключ — (отчёт, параметры,
+    версии таблиц CHART_TABLES): версии увеличивают функции записи db (db.data_version), поэтому после
+    изменения данных ключ другой и данные строятся заново.
+    Фигуры не кэшируются: вкладка перерисовывает данные в одну и ту же фигуру своего холста
+    (render(..., fig=...)), поэтому число фигур и холстов не зависит ни от числа кликов, ни от размера кэша.
+    Используется только из потока Tk
+    """
+    def __init__(self, db_path: str, max_entries: int = 16):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[ChartKey, object]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def key(self, chart: str, params: Dict[str, Hashable]) -> ChartKey:
+        versions = tuple(db.data_version(self.db_path, t) for t in CHART_TABLES[chart])
+        return chart, tuple(sorted(params.items())), versions
+
+    def get(self, key: ChartKey):
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: ChartKey, data):
+        """
+        Сохранение данных графика; данные того же отчёта и параметров с прежними версиями таблиц удаляются
+        Returns: data
+        """
+        for old in [k for k in self._entries if k[:2] == key[:2] and k != key]:
+            del self._entries[old]
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: ChartKey) -> bool:
+        return key in self._entries
@@ -1,42 +1,315 @@
 import sqlite3
-from typing import List, Optional, Dict, Any, Tuple
+import threading
+import time
+import functools
+from itertools import islice, chain, groupby
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator, Callable, Sequence, Type, Union
+from enum import Enum
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 import json
 import csv
+import base64
+import gzip
+import hashlib
+import tempfile
 import os
-from models import Customer, Product, Order, OrderItem
+from models import Customer, Product, Order, OrderItem, OrderBatch
+from validation import RowError, ValidationReport, validate_many
 
 #работа с базой данных
+#YES
+@dataclass
+class DbProfile:
+    """
+    Профиль производительности SQLite, применяется в init_db и к каждому подключению пула.
+    WAL позволяет читателям работать параллельно с одним писателем
+    """
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024  # байт
+    cache_size: int = -64000  # отрицательное значение — размер в КиБ
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000  # мс ожидания блокировки
+    write_retries: int = 5  # повторы записи, если блокировка не освободилась за busy_timeout
+    retry_delay: float = 0.05  # начальная пауза между повторами, с
+
+    def pragmas(self) -> List[str]:
+        """
+        Список PRAGMA для применения к подключению
+        """
+        return [
+            f"PRAGMA busy_timeout = {int(self.busy_timeout)};",
+            f"PRAGMA journal_mode = {self.journal_mode};",
+            f"PRAGMA synchronous = {self.synchronous};",
+            f"PRAGMA mmap_size = {int(self.mmap_size)};",
+            f"PRAGMA cache_size = {int(self.cache_size)};",
+            f"PRAGMA temp_store = {self.temp_store};",
+            "PRAGMA foreign_keys = ON;",
+            # INSERT OR REPLACE удаляет конфликтующую строку — без этого не срабатывают триггеры удаления
+            "PRAGMA recursive_triggers = ON;",
+        ]
+
+
+DEFAULT_PROFILE = DbProfile()
+
+
+#YES
+class ConnectionPool:
+    """
+    Менеджер подключений к одной базе данных: у каждого потока своё постоянное подключение,
+    PRAGMA применяются один раз при его открытии, закрытие — через close_all()
+    """
+    def __init__(self, db_path: str, profile: Optional[DbProfile] = None):
+        self.db_path = db_path
+        self.profile = profile or DEFAULT_PROFILE
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False только ради close_all() из главного потока,
+        # работает с подключением всегда поток-владелец
+        con = sqlite3.connect(self.db_path, timeout=self.profile.busy_timeout / 1000, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        for pragma in self.profile.pragmas():
+            con.execute(pragma)
+        with self._lock:
+            self._connections.append(con)
+        return con
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Возвращает подключение текущего потока, открывая его при первом обращении
+        """
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._open()
+            self._local.con = con
+            self._local.depth = 0
+        return con
+
+    def close_all(self) -> None:
+        """
+        Закрывает все подключения пула (всех потоков)
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for con in connections:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """
+    Возвращает пул подключений для db_path, создавая его при первом обращении
+    Args:
+        db_path: str: путь к базе данных
+    """
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_path, ConnectionPool(db_path))
+    return pool
+
+
+def configure(db_path: str, profile: DbProfile) -> None:
+    """
+    Устанавливает профиль производительности для db_path, открытые подключения переоткрываются с новыми PRAGMA
+    Args:
+        db_path: str: путь к базе данных
+        profile: DbProfile: профиль PRAGMA
+    """
+    pool = get_pool(db_path)
+    pool.profile = profile
+    pool.close_all()
+
+
+def close_all(db_path: Optional[str] = None) -> None:
+    """
+    Закрытие подключений при завершении приложения
+    Args:
+        db_path: путь к базе данных, по умолчанию закрываются все пулы
+    """
+    with _pools_lock:
+        if db_path is None:
+            pools = list(_pools.values())
+            _pools.clear()
+        else:
+            pool = _pools.pop(db_path, None)
+            pools = [pool] if pool else []
+    for pool in pools:
+        pool.close_all()
+
+
 #YES
 @contextmanager
-def connect(db_path: str):
+def connect(db_path: str, write: bool = False):
     """
          Работа с базой данных, управление подключением, автоматический commit|rollback
+         Подключение берётся из пула потока и не закрывается; вложенные вызовы connect
+         работают в транзакции внешнего, commit|rollback выполняет только внешний
         Args:
             db_path: str: путь к базе данных
+            write: транзакция записи — блокировка писателя берётся сразу (BEGIN IMMEDIATE),
+                   чтобы не получить "database is locked" посреди транзакции
         """
-    con = sqlite3.connect(db_path)
-    con.row_factory = sqlite3.Row
+    pool = get_pool(db_path)
+    con = pool.get()
+    local = pool._local
+    local.depth += 1
     try:
-        con.execute("PRAGMA foreign_keys = ON;")
+        if write and local.depth == 1 and not con.in_transaction:
+            con.execute("BEGIN IMMEDIATE")
         yield con
-        con.commit()
+        if local.depth == 1:
+            con.commit()
     except Exception:
-        con.rollback()
+        if local.depth == 1:
+            con.rollback()
         raise
     finally:
-        con.close()
+        local.depth -= 1
+
+
+def _is_locked_error(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def retry_on_busy(func):
+    """
+    Декоратор для функций записи: если блокировка писателя не освободилась за busy_timeout,
+    транзакция откатывается и функция повторяется с экспоненциальной паузой.
+    Внутри внешней транзакции повтор не выполняется — ошибка передаётся наружу
+    """
+    @functools.wraps(func)
+    def wrapper(db_path: str, *args, **kwargs):
+        pool = get_pool(db_path)
+        delay = pool.profile.retry_delay
+        for attempt in range(pool.profile.write_retries + 1):
+            try:
+                return func(db_path, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                nested = getattr(pool._local, "depth", 0) > 0
+                if nested or not _is_locked_error(e) or attempt >= pool.profile.write_retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+    return wrapper
+
+
+# Счётчики изменений таблиц в пределах процесса: кэши (поиск, графики) сравнивают
+# запомненную версию с текущей и сбрасываются только при записи в нужные таблицы
+_data_versions: Dict[Tuple[str, str], int] = {}
+_versions_lock = threading.Lock()
+
+
+def data_version(db_path: str, table: str) -> int:
+    """
+    Номер версии данных таблицы, увеличивается каждой функцией записи этого модуля
+    """
+    return _data_versions.get((db_path, table), 0)
+
+
+def bump_version(db_path: str, *tables: str) -> None:
+    """
+    Отметить изменение таблиц (для записи в обход функций модуля)
+    """
+    with _versions_lock:
+        for table in tables:
+            _data_versions[(db_path, table)] = _data_versions.get((db_path, table), 0) + 1
+
+
+def modifies(*tables: str):
+    """
+    Декоратор функций записи: после вызова (в том числе неудачного — часть пачек могла зафиксироваться)
+    увеличивает версии перечисленных таблиц
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(db_path: str, *args, **kwargs):
+            try:
+                return func(db_path, *args, **kwargs)
+            finally:
+                bump_version(db_path, *tables)
+        return wrapper
+    return decorator
+
+# Полнотекстовый поиск: таблица -> индексируемые столбцы
+FTS_TABLES: Dict[str, Tuple[str, ...]] = {
+    "customers": ("name", "email", "phone", "city"),
+    "products": ("name", "sku"),
+}
+# Индексы — с токенизатором trigram (SQLite 3.34+): MATCH ищет подстроку без учёта регистра, как LIKE '%...%'
+# (но регистр не учитывается и для кириллицы). Строки короче FTS_MIN_TERM символов триграммами не ищутся — для них LIKE
+FTS_TOKENIZER = "trigram"
+FTS_MIN_TERM = 3
+_fts_cache: Dict[Tuple[str, str], bool] = {}
+
+
+def fts5_available(con: sqlite3.Connection, tokenize: str = "unicode61") -> bool:
+    """
+    Поддерживает ли текущая сборка SQLite модуль FTS5 с токенизатором tokenize
+    """
+    try:
+        con.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x, tokenize='{tokenize}')")
+        con.execute("DROP TABLE IF EXISTS temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_fts(db_path: str, table: str) -> bool:
+    """
+    Есть ли в базе полнотекстовый индекс для table и может ли им пользоваться текущая сборка SQLite
+    (результат кэшируется, сбрасывается при миграциях)
+    """
+    key = (db_path, table)
+    if key not in _fts_cache:
+        with connect(db_path) as con:
+            exists = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_fts",)
+            ).fetchone() is not None
+            _fts_cache[key] = exists and fts5_available(con, FTS_TOKENIZER)
+    return _fts_cache[key]
+
+
+def fts_query(term: str, columns: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """
+    Строка запроса MATCH из пользовательского ввода: вся строка — одна фраза, то есть подстрока одного из полей
+    (как LIKE '%term%'). None, если строка короче FTS_MIN_TERM символов (тогда используется LIKE)
+    Args:
+        term: строка поиска
+        columns: ограничить поиск столбцами
+    """
+    if len(term) < FTS_MIN_TERM:
+        return None
+    query = '"' + term.replace('"', '""') + '"'
+    if columns:
+        query = "{" + " ".join(columns) + "} : " + query
+    return query
+
 #YES
-def init_db(db_path: str) -> None:
+@retry_on_busy
+def init_db(db_path: str, profile: Optional[DbProfile] = None) -> None:
     """
         Создание базы данных без перезаписи IF NOT EXISTS с индексацией
+        Применяет профиль производительности (WAL и прочие PRAGMA)
          Args:
              db_path: str: путь к базе данных
-         Returns:
-             id вставленной записи
+             profile: профиль PRAGMA, по умолчанию DEFAULT_PROFILE
     """
-
+    if profile is not None:
+        configure(db_path, profile)
     with connect(db_path) as con:
         cur = con.cursor()
         cur.executescript(
@@ -75,11 +348,360 @@ def init_db(db_path: str) -> None:
                 FOREIGN KEY (product_id) REFERENCES products(id)
             );
             CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date);
-            CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id);
             """
         )
+        _migrate(con)
+
+
+def _fts_migration(con: sqlite3.Connection, tokenize: str = "unicode61 remove_diacritics 2",
+                   options: str = "prefix='2 3', ") -> str:
+    """
+    Полнотекстовые индексы FTS5 по клиентам и товарам, синхронизируемые триггерами.
+    Если сборка SQLite без FTS5 (или без токенизатора tokenize) — миграция пустая, поиск работает через LIKE
+    """
+    if not fts5_available(con, tokenize):
+        return ""
+    script = ""
+    for table, cols in FTS_TABLES.items():
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        script += f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+            {col_list}, content='{table}', content_rowid='id', {options}tokenize='{tokenize}'
+        );
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts({table}_fts, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {table}_fts({table}_fts, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+            INSERT INTO {table}_fts(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END;
+        INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild');
+        """
+    return script
+
+
+def _fts_trigram_migration(con: sqlite3.Connection) -> str:
+    """
+    Замена индексов FTS5 по префиксам слов на индексы с токенизатором trigram: поиск снова ищет подстроку,
+    как до FTS. Без trigram (SQLite до 3.34) индексы только удаляются и поиск идёт через LIKE
+    """
+    script = "".join(
+        f"""
+        DROP TRIGGER IF EXISTS {table}_fts_ai;
+        DROP TRIGGER IF EXISTS {table}_fts_ad;
+        DROP TRIGGER IF EXISTS {table}_fts_au;
+        DROP TABLE IF EXISTS {table}_fts;
+        """ for table in FTS_TABLES
+    )
+    return script + _fts_migration(con, FTS_TOKENIZER, "")
+
+
+# Полный пересчёт customer_stats (используется миграцией и rebuild_customer_stats)
+CUSTOMER_STATS_REBUILD_SQL = """
+    DELETE FROM customer_stats;
+    INSERT INTO customer_stats(customer_id, order_count, total_sum, last_order_date)
+    SELECT c.id, COUNT(o.id), COALESCE(SUM(o.total), 0), MAX(o.date)
+    FROM customers c
+    LEFT JOIN orders o ON o.customer_id = c.id
+    GROUP BY c.id;
+"""
+
+
+# Полный пересчёт orders_daily (используется миграцией и rebuild_orders_daily)
+ORDERS_DAILY_REBUILD_SQL = """
+    DELETE FROM orders_daily;
+    INSERT INTO orders_daily(day, status, order_count, revenue)
+    SELECT COALESCE(date(date), substr(date, 1, 10)), status, COUNT(*), SUM(total)
+    FROM orders
+    GROUP BY 1, 2;
+"""
+
+
+# Миграции схемы: (версия, SQL-скрипт или функция, возвращающая скрипт). Применённая версия хранится
+# в PRAGMA user_version, каждая миграция выполняется в своей транзакции вместе с повышением версии
+MIGRATIONS: List[Tuple[int, Any]] = [
+    (1, """
+        -- составные/покрывающие индексы под фактические запросы get_orders, get_order_items и analysis.py;
+        -- idx_orders_customer(customer_id) заменён покрывающим (customer_id, total)
+        DROP INDEX IF EXISTS idx_orders_customer;
+        CREATE INDEX IF NOT EXISTS idx_orders_customer_total ON orders(customer_id, total);
+        CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status, date);
+        CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+        CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+        CREATE INDEX IF NOT EXISTS idx_customers_created ON customers(created_at);
+        CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at);
+        ANALYZE;
+    """),
+    (2, _fts_migration),
+    (3, """
+        -- материализованная статистика заказов клиентов, поддерживается триггерами.
+        -- В триггерах нет INSERT OR IGNORE: при INSERT OR REPLACE (импорт) внешняя политика конфликта
+        -- подменила бы его на REPLACE и обнулила бы строку статистики
+        CREATE TABLE IF NOT EXISTS customer_stats (
+            customer_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total_sum REAL NOT NULL DEFAULT 0,
+            last_order_date TEXT,
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_customer_stats_top ON customer_stats(order_count DESC, total_sum DESC);
+        CREATE TRIGGER IF NOT EXISTS customer_stats_customer_ai AFTER INSERT ON customers BEGIN
+            INSERT INTO customer_stats(customer_id)
+            SELECT new.id WHERE NOT EXISTS (SELECT 1 FROM customer_stats WHERE customer_id = new.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS customer_stats_order_ai AFTER INSERT ON orders BEGIN
+            INSERT INTO customer_stats(customer_id)
+            SELECT new.customer_id WHERE NOT EXISTS (SELECT 1 FROM customer_stats WHERE customer_id = new.customer_id);
+            UPDATE customer_stats SET
+                order_count = order_count + 1,
+                total_sum = total_sum + new.total,
+                last_order_date = CASE WHEN last_order_date IS NULL OR new.date > last_order_date
+                                       THEN new.date ELSE last_order_date END
+            WHERE customer_id = new.customer_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS customer_stats_order_ad AFTER DELETE ON orders BEGIN
+            UPDATE customer_stats SET
+                order_count = order_count - 1,
+                total_sum = total_sum - old.total,
+                last_order_date = (SELECT MAX(date) FROM orders WHERE customer_id = old.customer_id)
+            WHERE customer_id = old.customer_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS customer_stats_order_au AFTER UPDATE OF customer_id, total, date ON orders BEGIN
+            UPDATE customer_stats SET
+                order_count = order_count - 1,
+                total_sum = total_sum - old.total,
+                last_order_date = (SELECT MAX(date) FROM orders WHERE customer_id = old.customer_id)
+            WHERE customer_id = old.customer_id;
+            INSERT INTO customer_stats(customer_id)
+            SELECT new.customer_id WHERE NOT EXISTS (SELECT 1 FROM customer_stats WHERE customer_id = new.customer_id);
+            UPDATE customer_stats SET
+                order_count = order_count + 1,
+                total_sum = total_sum + new.total,
+                last_order_date = (SELECT MAX(date) FROM orders WHERE customer_id = new.customer_id)
+            WHERE customer_id = new.customer_id;
+        END;
+    """ + CUSTOMER_STATS_REBUILD_SQL),
+    (4, """
+        -- дневные агрегаты заказов по статусам для графика динамики, поддерживаются триггерами
+        CREATE TABLE IF NOT EXISTS orders_daily (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS orders_daily_ai AFTER INSERT ON orders BEGIN
+            INSERT INTO orders_daily(day, status)
+            SELECT COALESCE(date(new.date), substr(new.date, 1, 10)), new.status
+            WHERE NOT EXISTS (SELECT 1 FROM orders_daily
+                              WHERE day = COALESCE(date(new.date), substr(new.date, 1, 10)) AND status = new.status);
+            UPDATE orders_daily SET order_count = order_count + 1, revenue = revenue + new.total
+            WHERE day = COALESCE(date(new.date), substr(new.date, 1, 10)) AND status = new.status;
+        END;
+        CREATE TRIGGER IF NOT EXISTS orders_daily_ad AFTER DELETE ON orders BEGIN
+            UPDATE orders_daily SET order_count = order_count - 1, revenue = revenue - old.total
+            WHERE day = COALESCE(date(old.date), substr(old.date, 1, 10)) AND status = old.status;
+            DELETE FROM orders_daily
+            WHERE day = COALESCE(date(old.date), substr(old.date, 1, 10)) AND status = old.status AND order_count <= 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS orders_daily_au AFTER UPDATE OF date, status, total ON orders BEGIN
+            UPDATE orders_daily SET order_count = order_count - 1, revenue = revenue - old.total
+            WHERE day = COALESCE(date(old.date), substr(old.date, 1, 10)) AND status = old.status;
+            DELETE FROM orders_daily
+            WHERE day = COALESCE(date(old.date), substr(old.date, 1, 10)) AND status = old.status AND order_count <= 0;
+            INSERT INTO orders_daily(day, status)
+            SELECT COALESCE(date(new.date), substr(new.date, 1, 10)), new.status
+            WHERE NOT EXISTS (SELECT 1 FROM orders_daily
+                              WHERE day = COALESCE(date(new.date), substr(new.date, 1, 10)) AND status = new.status);
+            UPDATE orders_daily SET order_count = order_count + 1, revenue = revenue + new.total
+            WHERE day = COALESCE(date(new.date), substr(new.date, 1, 10)) AND status = new.status;
+        END;
+    """ + ORDERS_DAILY_REBUILD_SQL),
+    (5, """
+        -- индексы под сортировки sort_spec: rowid (id) хранится в конце индекса,
+        -- поэтому ORDER BY столбец, id в одном направлении читается из индекса без сортировки
+        CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name);
+        CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+        CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+        CREATE INDEX IF NOT EXISTS idx_orders_total ON orders(total);
+        ANALYZE;
+    """),
+    (6, """
+        -- строки импорта, не прошедшие проверку (on_invalid="quarantine"): исходные данные и ошибки в JSON
+        CREATE TABLE IF NOT EXISTS import_rejects (
+            id INTEGER PRIMARY KEY,
+            imported_at TEXT NOT NULL,
+            source TEXT,
+            table_name TEXT NOT NULL,
+            row_no INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            errors TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_import_rejects_imported_at ON import_rejects(imported_at);
+    """),
+    (7, """
+        -- покрывающие индексы позиций для аналитики продаж (sales.py): агрегаты по товарам читаются
+        -- из индекса без обращения к таблице. Прежние индексы по order_id и product_id — их префиксы,
+        -- поэтому удаляются: поиск позиций заказа и проверка внешних ключей пользуются новыми
+        CREATE INDEX IF NOT EXISTS idx_order_items_product_sales ON order_items(product_id, quantity, subtotal);
+        CREATE INDEX IF NOT EXISTS idx_order_items_order_sales ON order_items(order_id, product_id, quantity, subtotal);
+        DROP INDEX IF EXISTS idx_order_items_product;
+        DROP INDEX IF EXISTS idx_order_items_order;
+        ANALYZE;
+    """),
+    (8, _fts_trigram_migration),
+]
+
+
+def _migrate(con: sqlite3.Connection) -> None:
+    """
+    Применяет миграции схемы, версия которых больше PRAGMA user_version
+    """
+    con.commit()
+    _fts_cache.clear()
+    version = con.execute("PRAGMA user_version").fetchone()[0]
+    for target, script in MIGRATIONS:
+        if target <= version:
+            continue
+        if callable(script):
+            script = script(con)
+        try:
+            con.executescript(f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {target};\nCOMMIT;")
+        except Exception:
+            if con.in_transaction:
+                con.rollback()
+            raise
+
+# Сортировка выборок: допустимые столбцы перечислены в *Sort, направление — SortDir.
+# ORDER BY собирается только из членов перечислений, последним ключом всегда идёт id —
+# порядок однозначен и годится для постраничной выборки по ключу
+class SortDir(Enum):
+    ASC = "ASC"
+    DESC = "DESC"
+
+
+class SortColumn(Enum):
+    """
+    Базовый класс перечислений столбцов сортировки: значение — (SQL-выражение, поле строки результата, может ли быть NULL)
+    """
+    @property
+    def expr(self) -> str:
+        return self.value[0]
+
+    @property
+    def field(self) -> str:
+        return self.value[1]
+
+    @property
+    def nullable(self) -> bool:
+        return self.value[2]
+
+
+class CustomerSort(SortColumn):
+    CREATED_AT = ("created_at", "created_at", True)
+    NAME = ("name", "name", False)
+    CITY = ("city", "city", True)
+    EMAIL = ("email", "email", True)
+    ID = ("id", "id", False)
+
+
+class ProductSort(SortColumn):
+    CREATED_AT = ("created_at", "created_at", True)
+    NAME = ("name", "name", False)
+    PRICE = ("price", "price", False)
+    SKU = ("sku", "sku", True)
+    ID = ("id", "id", False)
+
+
+class OrderSort(SortColumn):
+    DATE = ("o.date", "date", False)
+    TOTAL = ("o.total", "total", False)
+    STATUS = ("o.status", "status", False)
+    CUSTOMER = ("c.name", "customer_name", False)
+    ID = ("o.id", "id", False)
+
+
+SortSpec = Sequence[Tuple[Any, Any]]  # [(столбец, направление), ...]
+
+
+def _sort_column(columns: Type[SortColumn], col: Any) -> SortColumn:
+    if isinstance(col, columns):
+        return col
+    if isinstance(col, str):
+        name = col.strip()
+        for member in columns:
+            if name.upper() == member.name or name in (member.field, member.expr):
+                return member
+    raise ValueError(f"Недопустимый столбец сортировки: {col!r}, доступны: {', '.join(m.name.lower() for m in columns)}")
+
+
+def _sort_dir(direction: Any) -> SortDir:
+    if isinstance(direction, SortDir):
+        return direction
+    if isinstance(direction, bool):
+        return SortDir.DESC if direction else SortDir.ASC
+    if isinstance(direction, str) and direction.strip().upper() in SortDir.__members__:
+        return SortDir[direction.strip().upper()]
+    raise ValueError(f"Недопустимое направление сортировки: {direction!r}")
+
+
+def sort_spec(columns: Type[SortColumn], spec: Union[str, SortSpec, None],
+              default: SortSpec) -> List[Tuple[SortColumn, SortDir]]:
+    """
+    Проверенная спецификация сортировки с id последним ключом
+    Args:
+        columns: перечисление столбцов (CustomerSort, ProductSort, OrderSort)
+        spec: [(столбец, направление), ...]; столбец — член columns или его имя/поле ("total"),
+              направление — SortDir, "asc"/"desc" или bool (True — по убыванию);
+              строка вида "date DESC, total ASC" разбирается так же. None — default
+        default: сортировка по умолчанию
+    Returns:
+        список (столбец, SortDir); если id не указан, он добавляется с направлением последнего ключа
+    """
+    if spec is None:
+        spec = default
+    if isinstance(spec, str):
+        items = []
+        for part in spec.split(","):
+            words = part.split()
+            if not 1 <= len(words) <= 2:
+                raise ValueError(f"Некорректная сортировка: {spec!r}")
+            items.append((words[0], words[1] if len(words) == 2 else SortDir.ASC))
+        spec = items
+    result: List[Tuple[SortColumn, SortDir]] = []
+    for col, direction in spec:
+        col = _sort_column(columns, col)
+        if any(c is col for c, _ in result):
+            continue
+        result.append((col, _sort_dir(direction)))
+        if col is columns.ID:
+            break  # id уникален, следующие ключи ничего не меняют
+    if not result:
+        raise ValueError("Пустая сортировка")
+    if result[-1][0] is not columns.ID:
+        result.append((columns.ID, result[-1][1]))
+    return result
+
+
+CUSTOMERS_DEFAULT_SORT: SortSpec = [(CustomerSort.CREATED_AT, SortDir.DESC)]
+PRODUCTS_DEFAULT_SORT: SortSpec = [(ProductSort.CREATED_AT, SortDir.DESC)]
+ORDERS_DEFAULT_SORT: SortSpec = [(OrderSort.DATE, SortDir.DESC)]
+
+
+def order_clause(spec: List[Tuple[SortColumn, SortDir]]) -> str:
+    """
+    Текст ORDER BY для проверенной спецификации sort_spec
+    """
+    return ", ".join(f"{col.expr} {direction.value}" for col, direction in spec)
 
 #YES
+@modifies("customers")
+@retry_on_busy
 def add_customer(db_path: str, customer: Customer) -> int:
     """
          Регистрация новых клиентов с валидацией введеных значений для Имени, телефона и email
@@ -91,7 +713,7 @@ def add_customer(db_path: str, customer: Customer) -> int:
              id вставленной записи
          """
     customer.validate()
-    with connect(db_path) as con:
+    with connect(db_path, write=True) as con:
         cur = con.cursor()
         cur.execute(
             "INSERT INTO customers(name, email, phone, city, created_at) VALUES(?,?,?,?,?)",
@@ -100,30 +722,94 @@ def add_customer(db_path: str, customer: Customer) -> int:
         return cur.lastrowid
 
 #YES
-def get_customers(db_path: str, search: Optional[str] = None, order_by: str = "created_at DESC") -> List[Dict[str, Any]]:
+def has_rows(db_path: str, table: str) -> bool:
+    """
+    Есть ли в таблице хотя бы одна строка: EXISTS останавливается на первой строке, таблица не читается
+    Args:
+        db_path: путь к базе данных
+        table: таблица из TABLES
+    """
+    if table not in TABLES:
+        raise ValueError(f"Неизвестная таблица: {table}")
+    with connect(db_path) as con:
+        return bool(con.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0])
+
+#YES
+def count_rows(db_path: str, table: str) -> int:
+    """
+    Число строк таблицы (COUNT(*) проходит по самому узкому индексу, строки в Python не передаются)
+    """
+    if table not in TABLES:
+        raise ValueError(f"Неизвестная таблица: {table}")
+    with connect(db_path) as con:
+        return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def _customers_filter(search: Optional[str], fts: bool = False) -> Tuple[str, List[Any]]:
+    """
+    Условие WHERE и параметры для поиска клиентов (подстрока в любом из полей): через FTS5, если индекс есть
+    и строка не короче FTS_MIN_TERM, иначе LIKE
+    """
+    if not search:
+        return "1=1", []
+    match = fts_query(search) if fts else None
+    if match:
+        return "id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)", [match]
+    like = f"%{search}%"
+    return "(name LIKE ? OR email LIKE ? OR phone LIKE ? OR city LIKE ?)", [like, like, like, like]
+
+#YES
+def get_customers(db_path: str, search: Optional[str] = None,
+                  order_by: Union[str, SortSpec] = "created_at DESC") -> List[Dict[str, Any]]:
     """
          получение списка клиентов из базы данных с возможностью поиска и сортировки
          Args:
              db_path: str: путь к базе данных
              search: Optional[str] = None поиск по имени или артикулу (SKU) по умолчанию не выполняется
-             order_by: str = "created_at DESC" строка для сортировки, по умолчанию по убыванию
+             order_by: сортировка (см. sort_spec, столбцы CustomerSort), по умолчанию по убыванию даты создания
          Returns:
              список словарей клиентов, отсортированых и удовлетворяющих условию поиска
          """
+    where, params = _customers_filter(search, has_fts(db_path, "customers"))
     with connect(db_path) as con:
         cur = con.cursor()
-        if search:
-            like = f"%{search}%"
-            cur.execute(
-                f"SELECT * FROM customers WHERE name LIKE ? OR email LIKE ? OR phone LIKE ? OR city LIKE ? ORDER BY {order_by}",
-                (like, like, like, like),
+        order = order_clause(sort_spec(CustomerSort, order_by, CUSTOMERS_DEFAULT_SORT))
+        cur.execute(f"SELECT * FROM customers WHERE {where} ORDER BY {order}", params)
+        return [dict(row) for row in cur.fetchall()]
+
+
+#YES
+def search_customers(db_path: str, term: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Поиск клиентов по подстроке с ранжированием по релевантности (bm25),
+    без FTS5 или для строк короче FTS_MIN_TERM — LIKE по тем же полям с сортировкой по имени
+    Args:
+        db_path: путь к базе данных
+        term: строка поиска
+        limit: максимальное число результатов
+    Returns:
+        список словарей клиентов, наиболее релевантные первыми
+    """
+    return _ranked_search(db_path, "customers", term, limit)
+
+
+def _ranked_search(db_path: str, table: str, term: str, limit: int) -> List[Dict[str, Any]]:
+    match = fts_query(term) if has_fts(db_path, table) else None
+    with connect(db_path) as con:
+        if match:
+            rows = con.execute(
+                f"SELECT t.* FROM {table}_fts f JOIN {table} t ON t.id = f.rowid "
+                f"WHERE {table}_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                (match, limit),
             )
         else:
-            cur.execute(f"SELECT * FROM customers ORDER BY {order_by}")
-        return [dict(row) for row in cur.fetchall()]
+            where, params = (_customers_filter if table == "customers" else _products_filter)(term)
+            rows = con.execute(f"SELECT * FROM {table} WHERE {where} ORDER BY name LIMIT ?", params + [limit])
+        return [dict(row) for row in rows]
 
 
 #YES
+@modifies("products")
+@retry_on_busy
 def add_product(db_path: str, product: Product) -> int:
     """
         Регистрация новых продуктов с валидацией введеных значений
@@ -134,7 +820,7 @@ def add_product(db_path: str, product: Product) -> int:
             id вставленной записи
         """
     product.validate()
-    with connect(db_path) as con:
+    with connect(db_path, write=True) as con:
         cur = con.cursor()
         cur.execute(
             "INSERT INTO products(name, price, sku, created_at) VALUES(?,?,?,?)",
@@ -142,31 +828,51 @@ def add_product(db_path: str, product: Product) -> int:
         )
         return cur.lastrowid
 
+def _products_filter(search: Optional[str], fts: bool = False) -> Tuple[str, List[Any]]:
+    """
+    Условие WHERE и параметры для поиска товаров (подстрока в названии или артикуле): через FTS5, если индекс есть
+    и строка не короче FTS_MIN_TERM, иначе LIKE
+    """
+    if not search:
+        return "1=1", []
+    match = fts_query(search) if fts else None
+    if match:
+        return "id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", [match]
+    like = f"%{search}%"
+    return "(name LIKE ? OR sku LIKE ?)", [like, like]
+
 #YES
-def get_products(db_path: str, search: Optional[str] = None, order_by: str = "created_at DESC") -> List[Dict[str, Any]]:
+def get_products(db_path: str, search: Optional[str] = None,
+                 order_by: Union[str, SortSpec] = "created_at DESC") -> List[Dict[str, Any]]:
     """
       получение списка товаров из базы данных с возможностью поиска и сортировки
       Args:
           db_path: str: путь к базе данных
           search: Optional[str] = None поиск по имени или артикулу (SKU) по умолчанию не выполняется
-          order_by: str = "created_at DESC" строка для сортировки по умолчанию по убыванию
+          order_by: сортировка (см. sort_spec, столбцы ProductSort), по умолчанию по убыванию даты создания
       Returns:
           список словарей товаров, отсортированых и удовлетворяющих условию поиска
       """
+    where, params = _products_filter(search, has_fts(db_path, "products"))
     with connect(db_path) as con:
         cur = con.cursor()
-        if search:
-            like = f"%{search}%"
-            cur.execute(
-                f"SELECT * FROM products WHERE name LIKE ? OR sku LIKE ? ORDER BY {order_by}",
-                (like, like),
-            )
-        else:
-            cur.execute(f"SELECT * FROM products ORDER BY {order_by}")
+        order = order_clause(sort_spec(ProductSort, order_by, PRODUCTS_DEFAULT_SORT))
+        cur.execute(f"SELECT * FROM products WHERE {where} ORDER BY {order}", params)
         return [dict(row) for row in cur.fetchall()]
 
 
 #YES
+def search_products(db_path: str, term: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Поиск товаров по подстроке в названии и артикуле с ранжированием по релевантности,
+    без FTS5 или для строк короче FTS_MIN_TERM — LIKE с сортировкой по названию
+    """
+    return _ranked_search(db_path, "products", term, limit)
+
+
+#YES
+@modifies("orders", "order_items")
+@retry_on_busy
 def add_order(db_path: str, order: Order) -> int:
     """
     добавление нового заказа в базу данных
@@ -174,7 +880,7 @@ def add_order(db_path: str, order: Order) -> int:
     :param order: новый заказ
     :return: ID созданного заказа
     """
-    with connect(db_path) as con:
+    with connect(db_path, write=True) as con:
         cur = con.cursor()
         # Обновим цену в позициях (чтобы зафиксировать цену на момент покупки)
         for it in order.items:
@@ -198,8 +904,119 @@ def add_order(db_path: str, order: Order) -> int:
             )
         return order_id
 
+SQLITE_MAX_PARAMS = 900  # ограничение числа параметров в одном запросе (с запасом для старых сборок SQLite)
+
+
+def _chunks(seq: List[Any], size: int):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _existing_ids(cur: sqlite3.Cursor, table: str, ids: List[int], column: str = "id") -> Dict[int, sqlite3.Row]:
+    """
+    Пакетная выборка строк по списку id: один запрос IN (...) на каждые SQLITE_MAX_PARAMS значений
+    """
+    found: Dict[int, sqlite3.Row] = {}
+    for chunk in _chunks(ids, SQLITE_MAX_PARAMS):
+        placeholders = ",".join(["?"] * len(chunk))
+        for row in cur.execute(f"SELECT * FROM {table} WHERE {column} IN ({placeholders})", chunk):
+            found[row[column]] = row
+    return found
+
+
+@retry_on_busy
+def _insert_orders_chunk(db_path: str, orders: List[Order]) -> List[int]:
+    """
+    Вставка пачки уже проверенных заказов одной транзакцией через executemany.
+    id назначаются явно (MAX(id)+1...) — под блокировкой писателя это безопасно
+    """
+    with connect(db_path, write=True) as con:
+        cur = con.cursor()
+        start = cur.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0] + 1
+        ids = list(range(start, start + len(orders)))
+        cur.executemany(
+            "INSERT INTO orders(id, customer_id, date, status, total) VALUES(?,?,?,?,?)",
+            [(oid, o.customer_id, o.date, o.status, o.total) for oid, o in zip(ids, orders)],
+        )
+        cur.executemany(
+            "INSERT INTO order_items(order_id, product_id, quantity, price, subtotal) VALUES(?,?,?,?,?)",
+            [(oid, it.product_id, it.quantity, it.price, it.subtotal) for oid, o in zip(ids, orders) for it in o.items],
+        )
+        return ids
+
 #YES
-def get_orders(db_path: str,date_from: Optional[str] = None,date_to: Optional[str] = None,status: Optional[str] = None,customer_search: Optional[str] = None,order_by: str = "date DESC",) -> List[Dict[str, Any]]:
+@modifies("orders", "order_items")
+def add_orders_bulk(db_path: str, orders: Iterable[Order], batch_size: int = 5000) -> List[int]:
+    """
+    Пакетное добавление заказов: товары и недостающие цены берутся одной пакетной выборкой,
+    все заказы проверяются до первой вставки, вставка — executemany пачками по batch_size заказов,
+    каждая пачка в своей транзакции
+    :param db_path: путь до базы данных
+    :param orders: заказы для добавления
+    :param batch_size: число заказов в одной транзакции
+    :return: список ID созданных заказов в порядке входных данных
+    """
+    orders = list(orders)
+    if not orders:
+        return []
+    with connect(db_path) as con:
+        cur = con.cursor()
+        # одна пакетная выборка и для недостающих цен, и для проверки существования товаров
+        products = _existing_ids(cur, "products", sorted({it.product_id for o in orders for it in o.items}))
+        customers = _existing_ids(cur, "customers", sorted({o.customer_id for o in orders}))
+    # Проверяем все заказы до вставки, чтобы не оставить половину пачек в базе
+    for o in orders:
+        for it in o.items:
+            if it.product_id not in products:
+                raise ValueError(f"Товар id={it.product_id} не найден")
+            if it.price <= 0:
+                it.price = float(products[it.product_id]["price"])
+            it.subtotal = round(it.price * it.quantity, 2)
+        o.validate()
+        if o.customer_id not in customers:
+            raise ValueError(f"Клиент id={o.customer_id} не найден")
+    ids: List[int] = []
+    for chunk in _chunks(orders, max(1, batch_size)):
+        ids.extend(_insert_orders_chunk(db_path, chunk))
+    return ids
+
+ORDERS_SELECT = """
+    SELECT o.*, c.name AS customer_name, c.email AS customer_email, c.city AS customer_city
+    FROM orders o
+    JOIN customers c ON c.id = o.customer_id
+"""
+
+
+def _orders_filter(date_from: Optional[str] = None, date_to: Optional[str] = None, status: Optional[str] = None,
+                   customer_search: Optional[str] = None, fts: bool = False) -> Tuple[str, List[Any]]:
+    """
+    Условие WHERE и параметры для фильтров заказов
+    """
+    conds = ["1=1"]
+    params: List[Any] = []
+    # сравнение непосредственно со столбцом, чтобы работали индексы по date;
+    # "date(o.date) <= date(?)" эквивалентно "o.date < следующий день" и для дат со временем
+    if date_from:
+        conds.append("o.date >= date(?)")
+        params.append(date_from)
+    if date_to:
+        conds.append("o.date < date(?, '+1 day')")
+        params.append(date_to)
+    if status:
+        conds.append("o.status = ?")
+        params.append(status)
+    match = fts_query(customer_search, ("name", "email", "city")) if customer_search and fts else None
+    if match:
+        conds.append("o.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)")
+        params.append(match)
+    elif customer_search:
+        like = f"%{customer_search}%"
+        conds.append("(c.name LIKE ? OR c.email LIKE ? OR c.city LIKE ?)")
+        params.extend([like, like, like])
+    return " AND ".join(conds), params
+
+#YES
+def get_orders(db_path: str,date_from: Optional[str] = None,date_to: Optional[str] = None,status: Optional[str] = None,customer_search: Optional[str] = None,order_by: Union[str, SortSpec] = "date DESC",) -> List[Dict[str, Any]]:
     """
     выполняет поиск и извлечение данных о заказах из базы данных.
     :param db_path: Путь к базе данных
@@ -207,35 +1024,30 @@ def get_orders(db_path: str,date_from: Optional[str] = None,date_to: Optional[st
     :param date_to: конечная дата
     :param status: статус заказа
     :param customer_search: поиск по email, имени или городу
-    :param order_by: по умолчанию сортировка по убыванию даты
+    :param order_by: сортировка (см. sort_spec, столбцы OrderSort), по умолчанию по убыванию даты
     :return:список словарей отсортированной таблицы
     """
+    where, params = _orders_filter(date_from, date_to, status, customer_search, has_fts(db_path, "customers"))
     with connect(db_path) as con:
         cur = con.cursor()
-        q = """
-            SELECT o.*, c.name AS customer_name, c.email AS customer_email, c.city AS customer_city
-            FROM orders o
-            JOIN customers c ON c.id = o.customer_id
-            WHERE 1=1
-        """
-        params: List[Any] = []
-        if date_from:
-            q += " AND date(o.date) >= date(?)"
-            params.append(date_from)
-        if date_to:
-            q += " AND date(o.date) <= date(?)"
-            params.append(date_to)
-        if status:
-            q += " AND o.status = ?"
-            params.append(status)
-        if customer_search:
-            like = f"%{customer_search}%"
-            q += " AND (c.name LIKE ? OR c.email LIKE ? OR c.city LIKE ?)"
-            params.extend([like, like, like])
-        q += f" ORDER BY {order_by}"
-        cur.execute(q, params)
+        order = order_clause(sort_spec(OrderSort, order_by, ORDERS_DEFAULT_SORT))
+        cur.execute(f"{ORDERS_SELECT} WHERE {where} ORDER BY {order}", params)
         return [dict(row) for row in cur.fetchall()]
 
+def explain_query_plan(db_path: str, sql: str, params: Iterable[Any] = ()) -> List[str]:
+    """
+    Возвращает строки EXPLAIN QUERY PLAN для запроса (поле detail)
+    """
+    with connect(db_path) as con:
+        return [row["detail"] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}", list(params))]
+
+ORDER_ITEMS_SQL = """
+    SELECT oi.*, p.name as product_name, p.sku
+    FROM order_items oi
+    JOIN products p ON p.id = oi.product_id
+    WHERE oi.order_id = ?
+"""
+
 #YES
 def get_order_items(db_path: str, order_id: int) -> List[Dict[str, Any]]:
     """
@@ -247,113 +1059,1010 @@ def get_order_items(db_path: str, order_id: int) -> List[Dict[str, Any]]:
     """
     with connect(db_path) as con:
         cur = con.cursor()
-        cur.execute(
-            """
-            SELECT oi.*, p.name as product_name, p.sku
-            FROM order_items oi
-            JOIN products p ON p.id = oi.product_id
-            WHERE oi.order_id = ?
-            """,
-            (order_id,),
-        )
+        cur.execute(ORDER_ITEMS_SQL, (order_id,))
         return [dict(row) for row in cur.fetchall()]
 
 
+# ТОП клиентов — индексный просмотр материализованной статистики customer_stats
+TOP_CUSTOMERS_SQL = """
+    SELECT c.id, c.name, s.order_count, s.total_sum
+    FROM customer_stats s
+    JOIN customers c ON c.id = s.customer_id
+    ORDER BY s.order_count DESC, s.total_sum DESC
+    LIMIT ?
+"""
+
+#YES
+def top_customers(db_path: str, n: int = 5) -> List[Dict[str, Any]]:
+    """
+    ТОП-n клиентов по числу заказов и их суммарной стоимости
+    Args:
+        db_path: путь к базе данных
+        n: количество клиентов
+    Returns: список словарей id, name, order_count, total_sum
+    """
+    with connect(db_path) as con:
+        return [dict(row) for row in con.execute(TOP_CUSTOMERS_SQL, (n,))]
+
+#YES
+@retry_on_busy
+def rebuild_customer_stats(db_path: str) -> None:
+    """
+    Полный пересчёт таблицы customer_stats по заказам (восстановление после ручных правок базы)
+    """
+    with connect(db_path, write=True) as con:
+        for stmt in CUSTOMER_STATS_REBUILD_SQL.split(";"):
+            if stmt.strip():
+                con.execute(stmt)
+
+#YES
+def check_customer_stats(db_path: str) -> List[Dict[str, Any]]:
+    """
+    Сверка customer_stats с полным пересчётом по заказам
+    Returns: список расхождений (пустой — статистика согласована)
+    """
+    with connect(db_path) as con:
+        rows = con.execute("""
+            WITH fresh AS (
+                SELECT c.id AS customer_id, COUNT(o.id) AS order_count, COALESCE(SUM(o.total), 0) AS total_sum,
+                       MAX(o.date) AS last_order_date
+                FROM customers c
+                LEFT JOIN orders o ON o.customer_id = c.id
+                GROUP BY c.id
+            )
+            SELECT f.customer_id, f.order_count AS expected_count, s.order_count AS actual_count,
+                   f.total_sum AS expected_sum, s.total_sum AS actual_sum,
+                   f.last_order_date AS expected_last, s.last_order_date AS actual_last
+            FROM fresh f
+            LEFT JOIN customer_stats s ON s.customer_id = f.customer_id
+            WHERE s.customer_id IS NULL
+               OR s.order_count != f.order_count
+               OR abs(s.total_sum - f.total_sum) > 0.005
+               OR s.last_order_date IS NOT f.last_order_date
+            UNION ALL
+            SELECT s.customer_id, NULL, s.order_count, NULL, s.total_sum, NULL, s.last_order_date
+            FROM customer_stats s
+            WHERE s.customer_id NOT IN (SELECT id FROM customers)
+        """)
+        return [dict(row) for row in rows]
+
+
+#YES
+def get_orders_daily(db_path: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Дневная динамика заказов из агрегатной таблицы orders_daily (без прохода по всем заказам)
+    Args:
+        db_path: путь к базе данных
+        date_from: начальная дата
+        date_to: конечная дата
+        status: только заказы с этим статусом, по умолчанию — все статусы
+    Returns: список словарей day, order_count, revenue по возрастанию дня
+    """
+    conds = ["1=1"]
+    params: List[Any] = []
+    if date_from:
+        conds.append("day >= date(?)")
+        params.append(date_from)
+    if date_to:
+        conds.append("day <= date(?)")
+        params.append(date_to)
+    if status:
+        conds.append("status = ?")
+        params.append(status)
+    with connect(db_path) as con:
+        rows = con.execute(
+            f"SELECT day, SUM(order_count) AS order_count, SUM(revenue) AS revenue FROM orders_daily "
+            f"WHERE {' AND '.join(conds)} GROUP BY day ORDER BY day",
+            params,
+        )
+        return [dict(row) for row in rows]
+
+#YES
+@retry_on_busy
+def rebuild_orders_daily(db_path: str) -> None:
+    """
+    Полный пересчёт дневных агрегатов orders_daily по заказам
+    """
+    with connect(db_path, write=True) as con:
+        for stmt in ORDERS_DAILY_REBUILD_SQL.split(";"):
+            if stmt.strip():
+                con.execute(stmt)
+
+#YES
+def check_orders_daily(db_path: str) -> List[Dict[str, Any]]:
+    """
+    Сверка orders_daily с полным пересчётом по заказам
+    Returns: список расхождений (пустой — агрегаты согласованы)
+    """
+    with connect(db_path) as con:
+        rows = con.execute("""
+            WITH fresh AS (
+                SELECT COALESCE(date(date), substr(date, 1, 10)) AS day, status, COUNT(*) AS order_count,
+                       SUM(total) AS revenue
+                FROM orders
+                GROUP BY 1, 2
+            )
+            SELECT f.day, f.status, f.order_count AS expected_count, d.order_count AS actual_count,
+                   f.revenue AS expected_revenue, d.revenue AS actual_revenue
+            FROM fresh f
+            LEFT JOIN orders_daily d ON d.day = f.day AND d.status = f.status
+            WHERE d.day IS NULL OR d.order_count != f.order_count OR abs(d.revenue - f.revenue) > 0.005
+            UNION ALL
+            SELECT d.day, d.status, NULL, d.order_count, NULL, d.revenue
+            FROM orders_daily d
+            WHERE NOT EXISTS (SELECT 1 FROM fresh f WHERE f.day = d.day AND f.status = d.status)
+        """)
+        return [dict(row) for row in rows]
+
+
+# Постраничная выборка по ключу (keyset) вместо OFFSET
+# ключ страницы — столбцы сортировки (sort_spec, последним id); курсор — их значения в последней строке страницы
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Упаковывает значения ключа в строку-курсор для продолжения выборки
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    """
+    Распаковывает курсор, созданный encode_cursor
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if not isinstance(values, list):
+        raise ValueError("Некорректный курсор")
+    return values
+
+
+def _spec_signature(spec: List[Tuple[SortColumn, SortDir]]) -> str:
+    return ",".join(f"{col.name}:{direction.value}" for col, direction in spec)
+
+
+def cursor_after(spec: List[Tuple[SortColumn, SortDir]], row: Dict[str, Any]) -> str:
+    """
+    Курсор, продолжающий выборку с сортировкой spec (результат sort_spec) сразу после строки row
+    """
+    return encode_cursor([_spec_signature(spec)] + [row[col.field] for col, _ in spec])
+
+
+def _keyset_after(spec: List[Tuple[SortColumn, SortDir]], values: List[Any]) -> List[Tuple[str, List[Any]]]:
+    """
+    Условия "строка после ключа values" для сортировки spec — по одному на часть выборки:
+    части идут подряд в порядке сортировки, следующая читается, когда исчерпана предыдущая
+    """
+    directions = {direction for _, direction in spec}
+    if len(directions) == 1 and not any(col.nullable for col, _ in spec[1:]):
+        # одно направление — сравнение кортежей, SQLite использует его как диапазон индекса
+        op = "<" if SortDir.DESC in directions else ">"
+
+        def after(keys, key_values):
+            cols = ", ".join(col.expr for col, _ in keys)
+            return f"({cols}) {op} ({','.join(['?'] * len(keys))})", list(key_values)
+
+        first = spec[0][0]
+        if not first.nullable:
+            return [after(spec, values)]
+        # первый ключ может быть NULL (NULL в SQLite меньше любого значения: последние при DESC, первые при ASC).
+        # Условие "(k1, ...) < (...) OR k1 IS NULL" диапазоном индекса не ограничивается, и каждая страница
+        # проходила бы все строки до курсора, поэтому значения и NULL — отдельные части, каждая — диапазон индекса
+        if values[0] is None:
+            cond, params = after(spec[1:], values[1:])
+            parts = [(f"{first.expr} IS NULL AND {cond}", params)]
+            if op == ">":
+                parts.append((f"{first.expr} IS NOT NULL", []))
+            return parts
+        parts = [after(spec, values)]  # сравнение с NULL не истинно — строки с NULL сюда не входят
+        if op == "<":
+            parts.append((f"{first.expr} IS NULL", []))
+        return parts
+    # разные направления или NULL не в первом ключе: (k1 после v1) OR (k1 = v1 AND k2 после v2) OR ...
+    ors: List[str] = []
+    params: List[Any] = []
+    for i, (col, direction) in enumerate(spec):
+        conds: List[str] = []
+        part: List[Any] = []
+        for (prev, _), value in zip(spec[:i], values[:i]):
+            if value is None:
+                conds.append(f"{prev.expr} IS NULL")
+            else:
+                conds.append(f"{prev.expr} = ?")
+                part.append(value)
+        value = values[i]
+        if direction is SortDir.ASC:
+            if value is None:
+                conds.append(f"{col.expr} IS NOT NULL")
+            else:
+                conds.append(f"{col.expr} > ?")
+                part.append(value)
+        else:
+            if value is None:
+                continue  # после NULL по убыванию других значений нет
+            conds.append(f"({col.expr} < ? OR {col.expr} IS NULL)" if col.nullable else f"{col.expr} < ?")
+            part.append(value)
+        ors.append("(" + " AND ".join(conds) + ")")
+        params.extend(part)
+    return [("(" + " OR ".join(ors) + ")" if ors else "0", params)]
+
+
+def _keyset_sql(select_sql: str, where: str, params: List[Any], limit: int, cursor: Optional[str],
+                spec: List[Tuple[SortColumn, SortDir]]) -> List[Tuple[str, List[Any]]]:
+    """
+    Запросы страницы выборки после курсора в порядке spec: следующий выполняется, если предыдущие
+    вернули меньше limit строк; последний параметр каждого запроса — LIMIT
+    """
+    order = order_clause(spec)
+    if not cursor:
+        return [(f"{select_sql} WHERE {where} ORDER BY {order} LIMIT ?", list(params) + [limit])]
+    values = decode_cursor(cursor)
+    if len(values) != len(spec) + 1 or values[0] != _spec_signature(spec):
+        raise ValueError("Курсор не соответствует сортировке")
+    return [(f"{select_sql} WHERE {where} AND {cond} ORDER BY {order} LIMIT ?", list(params) + cond_params + [limit])
+            for cond, cond_params in _keyset_after(spec, values[1:])]
+
+
+def _keyset_page(db_path: str, select_sql: str, where: str, params: List[Any], limit: int, cursor: Optional[str],
+                 spec: List[Tuple[SortColumn, SortDir]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Одна страница выборки: строки после курсора в порядке spec и курсор следующей страницы (None — строк больше нет)
+    """
+    queries = _keyset_sql(select_sql, where, params, limit, cursor, spec)
+    rows: List[Dict[str, Any]] = []
+    with connect(db_path) as con:
+        if len(queries) > 1 and not con.in_transaction:
+            con.execute("BEGIN")  # части страницы читаются из одного снимка базы, commit выполнит connect
+        cur = con.cursor()
+        for sql, query_params in queries:
+            cur.execute(sql, query_params[:-1] + [limit - len(rows)])
+            rows.extend(dict(row) for row in cur.fetchall())
+            if len(rows) >= limit:
+                break
+    next_cursor = cursor_after(spec, rows[-1]) if len(rows) == limit else None
+    return rows, next_cursor
+
+
+def _page_spec(columns: Type[SortColumn], sort: Union[str, SortSpec, None], created: SortColumn,
+               descending: bool) -> List[Tuple[SortColumn, SortDir]]:
+    return sort_spec(columns, sort, [(created, SortDir.DESC if descending else SortDir.ASC)])
+
+
+def _iter_pages(page_func, page_size: int, cursor: Optional[str]) -> Iterator[Dict[str, Any]]:
+    while True:
+        rows, cursor = page_func(page_size, cursor)
+        yield from rows
+        if cursor is None:
+            return
+
+#YES
+def get_customers_page(db_path: str, search: Optional[str] = None, limit: int = 500, cursor: Optional[str] = None,
+                       descending: bool = True,
+                       sort: Union[str, SortSpec, None] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Страница клиентов, по умолчанию упорядоченных по (created_at, id)
+    Args:
+        db_path: путь к базе данных
+        search: поиск как в get_customers
+        limit: размер страницы
+        cursor: курсор предыдущей страницы, None — с начала
+        descending: по убыванию (как get_customers по умолчанию), если sort не задан
+        sort: сортировка (см. sort_spec, столбцы CustomerSort); курсор действует только для той же сортировки
+    Returns:
+        строки страницы и курсор следующей страницы (None, если это последняя)
+    """
+    spec = _page_spec(CustomerSort, sort, CustomerSort.CREATED_AT, descending)
+    where, params = _customers_filter(search, has_fts(db_path, "customers"))
+    return _keyset_page(db_path, "SELECT * FROM customers", where, params, limit, cursor, spec)
+
+#YES
+def iter_customers(db_path: str, search: Optional[str] = None, page_size: int = 500, cursor: Optional[str] = None,
+                   descending: bool = True, sort: Union[str, SortSpec, None] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковый обход клиентов страницами по page_size строк без построения полного списка
+    Args:
+        cursor: продолжить после строки, для которой получен курсор (cursor_after)
+    """
+    return _iter_pages(lambda n, c: get_customers_page(db_path, search, n, c, descending, sort), page_size, cursor)
+
+#YES
+def get_products_page(db_path: str, search: Optional[str] = None, limit: int = 500, cursor: Optional[str] = None,
+                      descending: bool = True,
+                      sort: Union[str, SortSpec, None] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Страница товаров, по умолчанию упорядоченных по (created_at, id), параметры как у get_customers_page
+    (столбцы сортировки — ProductSort)
+    """
+    spec = _page_spec(ProductSort, sort, ProductSort.CREATED_AT, descending)
+    where, params = _products_filter(search, has_fts(db_path, "products"))
+    return _keyset_page(db_path, "SELECT * FROM products", where, params, limit, cursor, spec)
+
+#YES
+def iter_products(db_path: str, search: Optional[str] = None, page_size: int = 500, cursor: Optional[str] = None,
+                  descending: bool = True, sort: Union[str, SortSpec, None] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковый обход товаров страницами по page_size строк
+    """
+    return _iter_pages(lambda n, c: get_products_page(db_path, search, n, c, descending, sort), page_size, cursor)
+
+#YES
+def get_orders_page(db_path: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    status: Optional[str] = None, customer_search: Optional[str] = None, limit: int = 500,
+                    cursor: Optional[str] = None, descending: bool = True,
+                    sort: Union[str, SortSpec, None] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Страница заказов, по умолчанию упорядоченных по (date, id), фильтры как у get_orders
+    :param limit: размер страницы
+    :param cursor: курсор предыдущей страницы, None — с начала
+    :param descending: по убыванию даты (как get_orders по умолчанию), если sort не задан
+    :param sort: сортировка (см. sort_spec, столбцы OrderSort); курсор действует только для той же сортировки
+    :return: строки страницы и курсор следующей страницы (None, если это последняя)
+    """
+    spec = _page_spec(OrderSort, sort, OrderSort.DATE, descending)
+    where, params = _orders_filter(date_from, date_to, status, customer_search, has_fts(db_path, "customers"))
+    return _keyset_page(db_path, ORDERS_SELECT, where, params, limit, cursor, spec)
+
+#YES
+def iter_orders(db_path: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                status: Optional[str] = None, customer_search: Optional[str] = None, page_size: int = 500,
+                cursor: Optional[str] = None, descending: bool = True,
+                sort: Union[str, SortSpec, None] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковый обход заказов страницами по page_size строк без построения полного списка
+    """
+    return _iter_pages(
+        lambda n, c: get_orders_page(db_path, date_from, date_to, status, customer_search, n, c, descending, sort),
+        page_size, cursor,
+    )
+
+
+# Резервное копирование через SQLite backup API
+#YES
+def backup(db_path: str, dest: str, pages_per_step: int = 256, progress: Optional[Callable[[int, int], None]] = None,
+           compress: Optional[bool] = None, verify: bool = True, sleep: float = 0.005) -> Optional[str]:
+    """
+    Онлайн-копия базы данных: страницы копируются порциями по pages_per_step, между порциями блокировка
+    отпускается, и запись в базу не останавливается. Копия собирается во временном файле и
+    переименовывается в dest только после проверки
+    Args:
+        db_path: путь к базе данных
+        dest: путь к копии (.gz — сжатый архив)
+        pages_per_step: страниц за один шаг
+        progress: callback(скопировано страниц, всего страниц) после каждого шага
+        compress: сжать копию gzip, по умолчанию — по расширению .gz
+        verify: проверить копию PRAGMA integrity_check, а архив — по контрольной сумме
+        sleep: пауза между шагами, с
+    Returns:
+        sha256 несжатой копии для сжатого архива (также пишется в dest + ".sha256"), иначе None
+    """
+    if compress is None:
+        compress = dest.endswith(".gz")
+    folder = os.path.dirname(os.path.abspath(dest))
+    fd, tmp = tempfile.mkstemp(prefix=".backup_", suffix=".db", dir=folder)
+    os.close(fd)
+    try:
+        def step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+
+        target = sqlite3.connect(tmp)
+        try:
+            with connect(db_path) as con:
+                con.backup(target, pages=max(1, pages_per_step), progress=step, sleep=sleep)
+            if verify:
+                result = target.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    raise sqlite3.DatabaseError(f"Резервная копия повреждена: {result}")
+        finally:
+            target.close()
+        if not compress:
+            os.replace(tmp, dest)
+            return None
+        digest = _gzip_file(tmp, dest + ".tmp")
+        if verify and _gunzip_digest(dest + ".tmp") != digest:
+            raise IOError("Контрольная сумма архива не совпадает с резервной копией")
+        os.replace(dest + ".tmp", dest)
+        with open(dest + ".sha256", "w", encoding="utf-8") as f:
+            # контрольная сумма относится к распакованному файлу
+            f.write(f"{digest}  {os.path.basename(dest[:-3] if dest.endswith('.gz') else dest)}\n")
+        return digest
+    finally:
+        for path in (tmp, dest + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _gzip_file(src: str, dest: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Сжимает файл потоково, возвращает sha256 исходных данных
+    """
+    h = hashlib.sha256()
+    with open(src, "rb") as fin, gzip.open(dest, "wb", compresslevel=6) as fout:
+        for chunk in iter(lambda: fin.read(chunk_size), b""):
+            h.update(chunk)
+            fout.write(chunk)
+    return h.hexdigest()
+
+
+def _gunzip_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    sha256 распакованного содержимого архива
+    """
+    h = hashlib.sha256()
+    with gzip.open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 # Импорт/экспорт CSV / JSON
+TABLES = ["customers", "products", "orders", "order_items"]  # в порядке зависимостей внешних ключей
+IO_BATCH_SIZE = 5000  # строк в одном fetchmany/executemany
+
+#YES
+def get_orders_batch(db_path: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     status: Optional[str] = None, with_items: bool = False,
+                     batch_size: int = IO_BATCH_SIZE) -> OrderBatch:
+    """
+    Заказы для аналитики и массовой обработки в колоночном виде (models.OrderBatch) вместо списка словарей:
+    строки читаются кортежами через fetchmany и сразу раскладываются по столбцам
+    :param date_from: начальная дата
+    :param date_to: конечная дата
+    :param status: статус заказа
+    :param with_items: загрузить и позиции этих заказов (OrderBatch.items)
+    :param batch_size: строк в одном fetchmany
+    :return: заказы по возрастанию id
+    """
+    where, params = _orders_filter(date_from, date_to, status)
+    batch = OrderBatch()
+    with connect(db_path) as con:
+        cur = con.cursor()
+        cur.row_factory = None  # кортежи вместо sqlite3.Row
+        cur.execute(f"SELECT o.id, o.customer_id, o.date, o.status, o.total FROM orders o WHERE {where} ORDER BY o.id",
+                    params)
+        for rows in iter(lambda: cur.fetchmany(batch_size), []):
+            batch.extend_rows(rows)
+        if with_items:
+            cur.execute(
+                "SELECT oi.id, oi.order_id, oi.product_id, oi.quantity, oi.price, oi.subtotal "
+                f"FROM order_items oi JOIN orders o ON o.id = oi.order_id WHERE {where} ORDER BY oi.order_id, oi.id",
+                params,
+            )
+            for rows in iter(lambda: cur.fetchmany(batch_size), []):
+                batch.items.extend_rows(rows)
+    return batch
+
+
+def _batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_table(cur: sqlite3.Cursor, table: str, batch_size: int = IO_BATCH_SIZE) -> Tuple[List[str], Iterator[sqlite3.Row]]:
+    """
+    Потоковое чтение таблицы через fetchmany: столбцы и генератор строк
+    """
+    cur.execute(f"SELECT * FROM {table}")
+    cols = [d[0] for d in cur.description]
+
+    def rows():
+        while True:
+            chunk = cur.fetchmany(batch_size)
+            if not chunk:
+                return
+            yield from chunk
+    return cols, rows()
+
+
+def _clear_tables(cur: sqlite3.Cursor) -> None:
+    # по одному DELETE: executescript зафиксировал бы открытую транзакцию
+    for t in reversed(TABLES):
+        cur.execute(f"DELETE FROM {t}")
+
+
+IMPORT_INVALID_MODES = ("raise", "skip", "quarantine")
+# внешние ключи таблиц импорта, проверяются одним запросом на таблицу перед слиянием
+IMPORT_PARENTS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "orders": (("customer_id", "customers"),),
+    "order_items": (("order_id", "orders"), ("product_id", "products")),
+}
+IMPORT_UNIQUE: Dict[str, Tuple[str, ...]] = {"products": ("sku",)}  # UNIQUE-столбцы кроме id
+IMPORT_REBUILD_ROWS = 100_000  # с этого числа строк индексы и триггеры пересоздаются после слияния
+
+
+#YES
+@dataclass
+class ImportReport:
+    """
+    Итог импорта таблицы: добавлено, обновлено (по совпадению id), отклонено строк
+    и отчёт проверки строк (validation, при on_invalid)
+    """
+    table: str
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    validation: Optional[ValidationReport] = None
+
+    def summary(self) -> str:
+        return f"{self.table}: добавлено {self.inserted}, обновлено {self.updated}, отклонено {self.rejected}"
+
+
+class _StagedImport:
+    """
+    Импорт через промежуточные таблицы: строки файла загружаются в temp.stage_<таблица> (без индексов,
+    внешних ключей и триггеров), затем для каждой таблицы в порядке зависимостей:
+    - строки со ссылками на отсутствующие записи и с занятыми UNIQUE-значениями отбираются одним запросом;
+    - оставшиеся переносятся в рабочую таблицу одним INSERT ... ON CONFLICT(id) DO UPDATE (UPSERT):
+      в отличие от INSERT OR REPLACE существующая строка обновляется, а не удаляется, поэтому
+      не срабатывают ON DELETE CASCADE и триггеры удаления.
+    При больших объёмах (rebuild) вторичные индексы и триггеры рабочих таблиц на время слияния удаляются,
+    после — создаются заново, FTS и агрегаты пересчитываются целиком.
+    on_invalid — как проверять строки: None — без проверки содержимого, ошибка ссылок прерывает импорт;
+    "raise" — любая ошибка прерывает импорт; "skip" — неверные строки пропускаются;
+    "quarantine" — пропускаются и сохраняются в import_rejects. Всё выполняется в транзакции вызывающего
+    """
+    def __init__(self, cur: sqlite3.Cursor, source: str, on_invalid: Optional[str] = None,
+                 rebuild_indexes: Optional[bool] = None):
+        if on_invalid is not None and on_invalid not in IMPORT_INVALID_MODES:
+            raise ValueError(f"on_invalid: ожидалось одно из {', '.join(IMPORT_INVALID_MODES)}")
+        self.cur = cur
+        self.source = source
+        self.on_invalid = on_invalid
+        self.rebuild_indexes = rebuild_indexes
+        self.imported_at = datetime.now(timezone.utc).isoformat()
+        self.reports: Dict[str, ImportReport] = {}
+        self._columns: Dict[str, List[str]] = {}  # загруженные столбцы таблицы
+        self._loaded: Dict[str, int] = {}  # номер последней прочитанной строки таблицы
+
+    def _stage(self, table: str, cols: List[str]) -> None:
+        if table not in TABLES:
+            raise ValueError(f"Неизвестная таблица: {table}")
+        info = list(self.cur.execute(f"PRAGMA table_info({table})"))
+        known = [c[1] for c in info]
+        unknown = [c for c in cols if c not in known]
+        if unknown:
+            raise ValueError(f"Неизвестные столбцы таблицы {table}: {', '.join(unknown)}")
+        if table not in self._columns:
+            # типы столбцов как в рабочей таблице: текст из CSV приводится к числам так же, как при вставке
+            defs = ", ".join(f"{c[1]} {c[2]}" for c in info)
+            self.cur.execute(f"DROP TABLE IF EXISTS temp.stage_{table}")
+            self.cur.execute(f"CREATE TEMP TABLE stage_{table} (_row INTEGER PRIMARY KEY, {defs})")
+            self._columns[table] = []
+            self.reports[table] = ImportReport(table, validation=ValidationReport(table) if self.on_invalid else None)
+        self._columns[table] += [c for c in cols if c not in self._columns[table]]
+
+    def load(self, table: str, cols: List[str], rows: Iterable[Any], batch_size: int = IO_BATCH_SIZE,
+             progress: Optional[Callable[[str, int], None]] = None) -> int:
+        """
+        Загрузка потока строк таблицы в staging пачками по batch_size, при on_invalid — с проверкой validate_many
+        Returns: число загруженных строк
+        """
+        self._stage(table, cols)
+        report = self.reports[table]
+        sql = (f"INSERT INTO temp.stage_{table} (_row, {','.join(cols)}) "
+               f"VALUES ({','.join(['?'] * (len(cols) + 1))})")
+        done = 0
+        for chunk in _batched(rows, batch_size):
+            start = self._loaded.get(table, 0)
+            self._loaded[table] = start + len(chunk)
+            bad: Dict[int, List[RowError]] = {}
+            if self.on_invalid:
+                checked = validate_many(table, chunk, cols)
+                report.validation.merge(checked, start)
+                bad = checked.by_row()
+                if bad and self.on_invalid == "raise":
+                    report.validation.raise_first()
+                if bad:
+                    self._reject(table, [(start + i + 1, dict(zip(cols, chunk[i])), errors)
+                                         for i, errors in bad.items()])
+            self.cur.executemany(sql, [(start + i + 1, *row) for i, row in enumerate(chunk) if i not in bad])
+            done += len(chunk) - len(bad)
+            if progress:
+                progress(table, done)
+        return done
+
+    def _reject(self, table: str, rows: List[Tuple[int, Dict[str, Any], List[RowError]]]) -> None:
+        # rows: (номер строки в файле с 1, данные строки, ошибки)
+        self.reports[table].rejected += len(rows)
+        if self.on_invalid == "quarantine":
+            self.cur.executemany(
+                "INSERT INTO import_rejects(imported_at, source, table_name, row_no, data, errors) VALUES(?,?,?,?,?,?)",
+                [(self.imported_at, self.source, table, row_no, _json_encode(data),
+                  _json_encode([{"field": e.field, "message": e.message} for e in errors]))
+                 for row_no, data, errors in rows],
+            )
+
+    def _check_references(self, table: str) -> None:
+        """
+        Отбор строк staging, которые нельзя перенести: ссылка на отсутствующую запись
+        (родительские таблицы к этому моменту уже слиты) или UNIQUE-значение, занятое другой записью
+        """
+        cols = self._columns[table]
+        conditions: List[Tuple[str, str, str]] = []  # (условие, поле, сообщение)
+        for col, parent in IMPORT_PARENTS.get(table, ()):
+            if col in cols:
+                conditions.append((f"NOT EXISTS (SELECT 1 FROM main.{parent} p WHERE p.id = s.{col})", col,
+                                   f"Нет записи {parent} с таким id"))
+        for col in IMPORT_UNIQUE.get(table, ()):
+            if col in cols:
+                # строки с тем же id не конфликтуют: UPSERT применит их по очереди
+                same = "p.id IS NOT s.id" if "id" in cols else "1"
+                dup = "d.id IS NOT s.id" if "id" in cols else "1"
+                conditions.append((f"s.{col} IS NOT NULL AND (EXISTS (SELECT 1 FROM main.{table} p "
+                                   f"WHERE p.{col} = s.{col} AND {same}) OR EXISTS (SELECT 1 FROM temp.stage_{table} d "
+                                   f"WHERE d.{col} = s.{col} AND d._row > s._row AND {dup}))", col,
+                                   f"Повторяющееся значение {col}"))
+        if not conditions:
+            return
+        rejected: Dict[int, Tuple[Dict[str, Any], List[RowError]]] = {}
+        for condition, col, message in conditions:
+            for row in self.cur.execute(f"SELECT s._row, {', '.join(cols)} FROM temp.stage_{table} s WHERE {condition}"):
+                _, errors = rejected.setdefault(row[0], (dict(zip(cols, row[1:])), []))
+                errors.append(RowError(row[0] - 1, col, message))
+        if not rejected:
+            return
+        if self.on_invalid in (None, "raise"):
+            row_no = min(rejected)
+            error = rejected[row_no][1][0]
+            more = f" (всего строк с ошибками: {len(rejected)})" if len(rejected) > 1 else ""
+            raise ValueError(f"{table}, строка {row_no}: {error.message}, {error.field}={rejected[row_no][0][error.field]}"
+                             f"{more}")
+        if self.reports[table].validation is not None:
+            self.reports[table].validation.errors.extend(e for _, errors in rejected.values() for e in errors)
+        self._reject(table, [(row_no, data, errors) for row_no, (data, errors) in sorted(rejected.items())])
+        for chunk in _chunks(sorted(rejected), SQLITE_MAX_PARAMS):
+            self.cur.execute(f"DELETE FROM temp.stage_{table} WHERE _row IN ({','.join(['?'] * len(chunk))})", chunk)
+
+    def _merge_table(self, table: str) -> None:
+        cols = self._columns[table]
+        stage = f"temp.stage_{table}"
+        report = self.reports[table]
+        if "id" in cols:
+            # повторяющиеся id внутри файла: применяется последняя строка, как при построчной вставке
+            report.updated = self.cur.execute(
+                f"SELECT COUNT(DISTINCT s.id) FROM {stage} s WHERE s.id IN (SELECT id FROM main.{table})"
+            ).fetchone()[0]
+            report.inserted = self.cur.execute(
+                f"SELECT COUNT(DISTINCT s.id) + (SELECT COUNT(*) FROM {stage} WHERE id IS NULL) FROM {stage} s"
+            ).fetchone()[0] - report.updated
+            updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "id")
+            upsert = f" ON CONFLICT(id) DO UPDATE SET {updates}" if updates else " ON CONFLICT(id) DO NOTHING"
+        else:
+            report.inserted = self.cur.execute(f"SELECT COUNT(*) FROM {stage}").fetchone()[0]
+            upsert = ""
+        # WHERE true обязателен: без него ON CONFLICT разбирался бы как условие соединения
+        self.cur.execute(f"INSERT INTO main.{table} ({', '.join(cols)}) "
+                         f"SELECT {', '.join(cols)} FROM {stage} WHERE true ORDER BY _row{upsert}")
+        self.cur.execute(f"DROP TABLE {stage}")
+
+    def _drop_derived(self) -> List[str]:
+        """
+        Удаление вторичных индексов и триггеров рабочих таблиц, возвращает SQL для их восстановления
+        """
+        placeholders = ",".join(["?"] * len(TABLES))
+        objects = list(self.cur.execute(
+            f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+            f"AND tbl_name IN ({placeholders}) AND sql IS NOT NULL", TABLES,
+        ))
+        for kind, name, _ in objects:
+            self.cur.execute(f"DROP {kind.upper()} {name}")
+        return [sql for _, _, sql in objects]
+
+    def _restore_derived(self, statements: List[str]) -> None:
+        for sql in statements:
+            self.cur.execute(sql)
+        # триггеры не работали во время слияния — полнотекстовые индексы и агрегаты пересчитываются целиком
+        for table in FTS_TABLES:
+            if self.cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{table}_fts",)).fetchone():
+                self.cur.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+        for script in (CUSTOMER_STATS_REBUILD_SQL, ORDERS_DAILY_REBUILD_SQL):
+            for stmt in script.split(";"):
+                if stmt.strip():
+                    self.cur.execute(stmt)
+
+    def merge(self) -> Dict[str, ImportReport]:
+        """
+        Проверка ссылок и перенос всех загруженных таблиц в рабочие
+        Returns: итоги по таблицам
+        """
+        staged = sum(self.cur.execute(f"SELECT COUNT(*) FROM temp.stage_{t}").fetchone()[0] for t in self._columns)
+        rebuild = self.rebuild_indexes if self.rebuild_indexes is not None else staged >= IMPORT_REBUILD_ROWS
+        restore = self._drop_derived() if rebuild else []
+        for table in TABLES:
+            if table in self._columns:
+                self._check_references(table)
+                self._merge_table(table)
+        if rebuild:
+            self._restore_derived(restore)
+        return self.reports
+
 #YES
-def export_to_csv(db_path: str, folder: str) -> None:
+def export_to_csv(db_path: str, folder: str, batch_size: int = IO_BATCH_SIZE) -> None:
     """
-    Функция экспорта базы данных в .csv
+    Функция экспорта базы данных в .csv, строки читаются курсором пачками по batch_size
     Args:
         db_path: путь к БД
         folder: путь для сохранения .csv
+        batch_size: размер пачки fetchmany
     Returns: файлы .csv
     """
     os.makedirs(folder, exist_ok=True)
     with connect(db_path) as con:
         cur = con.cursor()
-        tables = ["customers", "products", "orders", "order_items"]
-        for t in tables:
-            rows = cur.execute(f"SELECT * FROM {t}").fetchall()
-            if not rows:
-                # создадим файл с заголовками
-                cols = [c[1] for c in cur.execute(f"PRAGMA table_info({t})")]
-            else:
-                cols = rows[0].keys()
+        for t in TABLES:
+            cols, rows = _iter_table(cur, t, batch_size)  # заголовки есть и у пустой таблицы
             path = os.path.join(folder, f"{t}.csv")
             with open(path, "w", newline="", encoding="utf-8") as f:
-                w = csv.DictWriter(f, fieldnames=cols)
-                w.writeheader()
-                for r in rows:
-                    w.writerow(dict(r))
+                w = csv.writer(f)
+                w.writerow(cols)
+                w.writerows(rows)
 
 #YES
-def import_from_csv(db_path: str, folder: str, clear_before: bool = False) -> None:
+@modifies(*TABLES)
+@retry_on_busy
+def import_from_csv(db_path: str, folder: str, clear_before: bool = False, batch_size: int = IO_BATCH_SIZE,
+                    progress: Optional[Callable[[str, int], None]] = None, on_invalid: Optional[str] = None,
+                    rebuild_indexes: Optional[bool] = None) -> Dict[str, ImportReport]:
     """
-    Функция импорта файлов .csv в бузу данных
+    Функция импорта файлов .csv в бузу данных: файлы читаются потоково и загружаются пачками
+    по batch_size строк в промежуточные таблицы, затем сливаются с рабочими (см. _StagedImport) в одной транзакции
     Args:
         db_path: путь к БД
         folder: папка в которой находятся csv файлы
         clear_before: флаг для очистки базы данных, не очищать по умолчанию
+        batch_size: размер пачки executemany
+        progress: callback(таблица, загружено строк) после каждой пачки
+        on_invalid: проверка строк: "raise", "skip" или "quarantine", None — проверяются только ссылки
+        rebuild_indexes: пересоздать индексы и триггеры после слияния, по умолчанию — от IMPORT_REBUILD_ROWS строк
+    Returns: итоги по таблицам (добавлено, обновлено, отклонено)
     """
-    with connect(db_path) as con:
+    with connect(db_path, write=True) as con:
         cur = con.cursor()
         if clear_before:# очистка базы данных по необходимости
-            cur.executescript("DELETE FROM order_items; DELETE FROM orders; DELETE FROM products; DELETE FROM customers;")
-        for t in ["customers", "products", "orders", "order_items"]:# для каждой таблицы формируем путь, преобразование
+            _clear_tables(cur)
+        staged = _StagedImport(cur, folder, on_invalid, rebuild_indexes)
+        for t in TABLES:# для каждой таблицы формируем путь, преобразование
             path = os.path.join(folder, f"{t}.csv")
             if not os.path.exists(path):
                 continue
             with open(path, "r", newline="", encoding="utf-8") as f:
-                r = csv.DictReader(f)
-                rows = list(r)
-                if not rows:
+                r = csv.reader(f)
+                cols = next(r, None)
+                if not cols:
                     continue
-                cols = rows[0].keys()
-                placeholders = ",".join(["?"] * len(cols))
-                col_list = ",".join(cols)
-                values = [tuple(row[c] for c in cols) for row in rows]
                 # Попробуем сохранить указанное id, если оно есть
-                cur.executemany(f"INSERT OR REPLACE INTO {t} ({col_list}) VALUES ({placeholders})", values)
+                staged.load(t, cols, r, batch_size, progress)
+        return staged.merge()
+
+def _open_text(path: str, mode: str, compress: Optional[bool] = None):
+    """
+    Открывает текстовый файл, при compress=True (или None и расширении .gz) — через gzip
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class _JsonStream:
+    """
+    Инкрементальный разбор JSON вида {"таблица": [{...}, ...], ...} без загрузки файла целиком:
+    текст читается блоками, каждая строка таблицы декодируется отдельно через raw_decode
+    """
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Следующий значимый символ (пробелы пропускаются), "" — конец файла
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Некорректный JSON: ожидалось {chars!r}, получено {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        """
+        Декодирует следующее значение (объект или строку), дочитывая файл, пока значение не будет полным
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            self.pos = end
+            return obj
+
+    def tables(self) -> Iterator[Tuple[str, Iterator[Dict[str, Any]]]]:
+        """
+        Пары (таблица, генератор строк); генератор строк нужно дочитать до перехода к следующей таблице
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            table = self.value()
+            self.expect(":")
+            self.expect("[")
+            rows = self._rows()
+            yield table, rows
+            for _ in rows:  # дочитываем, если потребитель остановился раньше
+                pass
+            if self.expect(",}") == "}":
+                return
+
+    def _rows(self) -> Iterator[Dict[str, Any]]:
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def _load_dicts(staged: _StagedImport, table: str, rows: Iterator[Dict[str, Any]], batch_size: int,
+                progress: Optional[Callable[[str, int], None]]) -> int:
+    """
+    Загрузка потока словарей в staging; набор столбцов берётся из первой строки
+    """
+    first = next(rows, None)
+    if first is None:
+        return 0
+    cols = list(first.keys())
+    values = (tuple(row[c] for c in cols) for row in chain([first], rows))
+    return staged.load(table, cols, values, batch_size, progress)
 
 #YES
-def export_to_json(db_path: str, path: str) -> None:
+def export_to_json(db_path: str, path: str, batch_size: int = IO_BATCH_SIZE, compress: Optional[bool] = None) -> None:
     """
-    Функция экспорта базы данных в .json
+    Функция экспорта базы данных в .json, таблицы пишутся построчно по мере чтения курсором
     Args:
         db_path: Путь к базе данных
-        path: путь для сохранения .json
+        path: путь для сохранения .json (.json.gz — со сжатием gzip)
+        batch_size: размер пачки fetchmany
+        compress: сжатие gzip, по умолчанию — по расширению .gz
     Returns: файл .json в виде словарей, где кажды словарь это таблица
     """
     with connect(db_path) as con:
         cur = con.cursor()
-        data = {}
-        for t in ["customers", "products", "orders", "order_items"]:
-            rows = cur.execute(f"SELECT * FROM {t}").fetchall()
-            data[t] = [dict(r) for r in rows]
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with _open_text(path, "w", compress) as f:
+            f.write("{")
+            for i, t in enumerate(TABLES):
+                cols, rows = _iter_table(cur, t, batch_size)
+                f.write(("," if i else "") + "\n" + _json_encode(t) + ": [")
+                sep = "\n"
+                for chunk in _batched(rows, batch_size):
+                    # одна пачка кодируется одним вызовом кодировщика, скобки списка отбрасываются
+                    f.write(sep + _json_encode([dict(zip(cols, r)) for r in chunk])[1:-1])
+                    sep = ",\n"
+                f.write("\n]")
+            f.write("\n}\n")
 
 #YES
-def import_from_json(db_path: str, path: str, clear_before: bool = False) -> None:
+@modifies(*TABLES)
+@retry_on_busy
+def import_from_json(db_path: str, path: str, clear_before: bool = False, batch_size: int = IO_BATCH_SIZE,
+                     progress: Optional[Callable[[str, int], None]] = None, on_invalid: Optional[str] = None,
+                     rebuild_indexes: Optional[bool] = None) -> Dict[str, ImportReport]:
     """
-    Функция импорта базы из файл .json
+    Функция импорта базы из файл .json (или .json.gz): файл разбирается потоково,
+    строки загружаются пачками по batch_size через промежуточные таблицы в одной транзакции
     Args:
         db_path: путь к базе данных
         path: путь к файлу .json
         clear_before: флаг для очистки текущей базы данных
+        batch_size: размер пачки executemany
+        progress: callback(таблица, загружено строк) после каждой пачки
+        on_invalid: проверка строк, как в import_from_csv
+        rebuild_indexes: как в import_from_csv
+    Returns: итоги по таблицам (добавлено, обновлено, отклонено)
+    """
+    with _open_text(path, "r") as f, connect(db_path, write=True) as con:
+        cur = con.cursor()
+        if clear_before:
+            _clear_tables(cur)
+        staged = _StagedImport(cur, path, on_invalid, rebuild_indexes)
+        for t, rows in _JsonStream(f).tables():
+            _load_dicts(staged, t, rows, batch_size, progress)
+        return staged.merge()
+
+#YES
+def export_to_ndjson(db_path: str, path: str, batch_size: int = IO_BATCH_SIZE, compress: Optional[bool] = None) -> None:
+    """
+    Экспорт базы данных в NDJSON: одна запись на строку вида {"table": "...", "data": {...}}
+    Args:
+        db_path: Путь к базе данных
+        path: путь для сохранения .ndjson (.ndjson.gz — со сжатием gzip)
+        batch_size: размер пачки fetchmany
+        compress: сжатие gzip, по умолчанию — по расширению .gz
     """
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
     with connect(db_path) as con:
+        cur = con.cursor()
+        with _open_text(path, "w", compress) as f:
+            for t in TABLES:
+                cols, rows = _iter_table(cur, t, batch_size)
+                prefix = '{"table":' + _json_encode(t) + ',"data":'
+                for chunk in _batched(rows, batch_size):
+                    f.write("".join(prefix + _json_encode(dict(zip(cols, r))) + "}\n" for r in chunk))
+
+#YES
+@modifies(*TABLES)
+@retry_on_busy
+def import_from_ndjson(db_path: str, path: str, clear_before: bool = False, batch_size: int = IO_BATCH_SIZE,
+                       progress: Optional[Callable[[str, int], None]] = None, on_invalid: Optional[str] = None,
+                       rebuild_indexes: Optional[bool] = None) -> Dict[str, ImportReport]:
+    """
+    Импорт NDJSON (или .ndjson.gz), созданного export_to_ndjson: файл читается построчно,
+    подряд идущие записи одной таблицы загружаются пачками через промежуточные таблицы в одной транзакции
+    Args:
+        db_path: путь к базе данных
+        path: путь к файлу .ndjson
+        clear_before: флаг для очистки текущей базы данных
+        batch_size: размер пачки executemany
+        progress: callback(таблица, загружено строк) после каждой пачки
+        on_invalid: проверка строк, как в import_from_csv
+        rebuild_indexes: как в import_from_csv
+    Returns: итоги по таблицам (добавлено, обновлено, отклонено)
+    """
+    def records(f):
+        # строки декодируются пачками: одна пачка — один вызов json.loads для массива из этих строк
+        for lines in _batched((line for line in f if line.strip()), batch_size):
+            try:
+                batch = json.loads("[" + ",".join(lines) + "]")
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Некорректная строка NDJSON: {e}") from e
+            for rec in batch:
+                if not isinstance(rec, dict) or "table" not in rec or "data" not in rec:
+                    raise ValueError("Ожидалась запись вида {\"table\": ..., \"data\": ...}")
+                yield rec["table"], rec["data"]
+
+    with _open_text(path, "r") as f, connect(db_path, write=True) as con:
         cur = con.cursor()
         if clear_before:
-            cur.executescript("DELETE FROM order_items; DELETE FROM orders; DELETE FROM products; DELETE FROM customers;")
-        for t, rows in data.items():
-            if not rows:
-                continue
-            cols = rows[0].keys()
-            placeholders = ",".join(["?"] * len(cols))
-            col_list = ",".join(cols)
-            values = [tuple(row[c] for c in cols) for row in rows]
-            cur.executemany(f"INSERT OR REPLACE INTO {t} ({col_list}) VALUES ({placeholders})", values)
\ No newline at end of file
+            _clear_tables(cur)
+        staged = _StagedImport(cur, path, on_invalid, rebuild_indexes)
+        done: Dict[str, int] = {}
+        for t, group in groupby(records(f), key=lambda rec: rec[0]):
+            base = done.get(t, 0)
+            step = (lambda table, n, base=base: progress(table, base + n)) if progress else None
+            done[t] = base + _load_dicts(staged, t, (data for _, data in group), batch_size, step)
+        return staged.merge()
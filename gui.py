@@ -1,28 +1,67 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import re
-from typing import List
+from typing import Dict
 
-from models import Customer, Product, Order, OrderItem, quicksort_orders
+from models import Customer, Product, Order, OrderItem
+from sorting import ORDER_SORTS
 import db
-import analysis
+from tasks import TaskExecutor
+from virtual_tree import VirtualTreeview
+from search import SearchCache, Debouncer
+from charts import ChartCache
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+# analysis (pandas, seaborn, matplotlib, networkx) и холст matplotlib для Tk импортируются не при запуске,
+# а при первом построении графика или заранее в фоне (см. _chart_data, App.prewarm_analytics)
 
+JSON_FILETYPES = [("JSON", "*.json"), ("JSON (gzip)", "*.json.gz")]
+NDJSON_FILETYPES = [("NDJSON", "*.ndjson"), ("NDJSON (gzip)", "*.ndjson.gz")]
+PAGE_SIZE = 200  # строк на страницу в таблицах вкладок, в дереве держится до 5 страниц
+PREWARM_DELAY_MS = 500  # задержка фонового импорта аналитики после запуска, чтобы сначала отрисовалось окно
+COMBO_LIMIT = 100  # строк в выпадающих списках клиентов и товаров формы заказа: первые по имени из найденных по тексту
+
+
+def _customer_values(r) -> tuple:
+    return (r["id"], r["name"], r["email"], r["phone"], r["city"], r["created_at"])
+
+
+def _product_values(r) -> tuple:
+    return (r["id"], r["name"], f'{r["price"]:.2f}', r["sku"], r["created_at"])
+
+
+def _customer_choice(r) -> tuple:
+    return f'{r["name"]} (id={r["id"]})', r["id"]
+
+
+def _product_choice(r) -> tuple:
+    return f'{r["name"]} (id={r["id"]}, {r["price"]:.2f})', (r["id"], float(r["price"]), r["name"])
+
+
+def _order_values(r) -> tuple:
+    return (r["id"], r["date"], r["customer_name"], r["status"], f'{r["total"]:.2f}')
 
-EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
-PHONE_RE = re.compile(r"^\+?\d[\d\s\-()]{7,}$")
 
 #класс для работы с GUI
 class App(tk.Tk):
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, analytics_processes: int = 0, prewarm: bool = True):
         super().__init__()
         self.title("Интернет-магазин")
         self.geometry("1100x750")
         self.db_path = db_path
 
-        nb = ttk.Notebook(self)
+        # запросы к базе, импорт/экспорт и построение графиков выполняются в фоне,
+        # analytics_processes > 0 — графики строятся в отдельных процессах
+        self.tasks = TaskExecutor(self, cpu_workers=analytics_processes)
+        self.search = SearchCache(db_path)
+        self.charts = ChartCache(db_path)
+        # кнопки, недоступные, пока выполняется задача с их ключом: ввод-вывод ("io") и запись из форм
+        self._task_buttons: Dict[str, list] = {"io": [], "add_customer": [], "add_product": [], "add_order": []}
+        self._build_status_bar()
+        self.tasks.on_state = self._on_tasks_state
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        nb = self.notebook = ttk.Notebook(self)
         self.tab_customers = ttk.Frame(nb)
         self.tab_products = ttk.Frame(nb)
         self.tab_orders = ttk.Frame(nb)
@@ -43,9 +82,105 @@ class App(tk.Tk):
         self._build_analytics_tab()
         self._build_admin_tab()
 
-        self.refresh_customers()
-        self.refresh_products()
+        # поиск при вводе: запрос уходит, когда пользователь перестал печатать
+        for var, refresh in [
+            (self.c_search, self.refresh_customers),
+            (self.p_search, self.refresh_products),
+            (self.o_cust_search, self.refresh_orders),
+        ]:
+            var.trace_add("write", Debouncer(self, refresh).schedule)
+
+        # таблицы вкладки загружаются при первом её показе, остальные вкладки не читают базу до перехода на них
+        self._tab_loaders = {
+            str(self.tab_customers): self.refresh_customers,
+            str(self.tab_products): self.refresh_products,
+            str(self.tab_orders): self._load_orders_tab,
+        }
+        self._loaded_tabs = set()
+        nb.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._on_tab_changed()
+        if prewarm:
+            self.after(PREWARM_DELAY_MS, self.prewarm_analytics)
+
+    def _on_tab_changed(self, event=None):
+        """
+        Загрузка таблиц вкладки при первом показе (или первом показе после refresh_tabs)
+        """
+        tab = self.notebook.select()
+        loader = self._tab_loaders.get(tab)
+        if loader and tab not in self._loaded_tabs:
+            self._loaded_tabs.add(tab)
+            loader()
+
+    def _load_orders_tab(self):
         self.refresh_orders()
+        for table in self._combos:
+            self._lookup_combo(table)
+
+    def refresh_tabs(self):
+        """
+        Обновление после изменения всех таблиц (импорт): видимая вкладка перезагружается сразу,
+        остальные — при следующем показе
+        """
+        self._loaded_tabs.clear()
+        self._on_tab_changed()
+
+    def prewarm_analytics(self):
+        """
+        Фоновый импорт модулей аналитики, чтобы первый график не ждал загрузки pandas и matplotlib.
+        Отдельный поток, а не TaskExecutor: импорт не занимает пул запросов и не показывается в строке состояния.
+        Если пользователь нажмёт кнопку графика раньше, построение подождёт завершения этого импорта
+        """
+        threading.Thread(target=_prewarm_analytics, name="analytics-prewarm", daemon=True).start()
+
+    #YES
+    def _build_status_bar(self):
+        """
+        строка состояния внизу окна: ход фоновых задач и кнопка их отмены
+        """
+        bar = ttk.Frame(self)
+        bar.pack(side=tk.BOTTOM, fill=tk.X, padx=8, pady=(0, 6))
+        self.status_text = tk.StringVar(value="Готово")
+        self.status_progress = ttk.Progressbar(bar, length=200, mode="determinate")
+        self.status_progress.pack(side=tk.LEFT)
+        self.cancel_btn = ttk.Button(bar, text="Отмена", command=self.tasks.cancel, state="disabled")
+        self.cancel_btn.pack(side=tk.LEFT, padx=6)
+        ttk.Label(bar, textvariable=self.status_text).pack(side=tk.LEFT, padx=6)
+
+    def _on_tasks_state(self, active: int, progress=None):
+        """
+        Обновление строки состояния по событиям исполнителя задач
+        :param active: число выполняемых и ожидающих задач
+        :param progress: последний прогресс (done, total, text) или None
+        """
+        for key, buttons in self._task_buttons.items():
+            state = ["disabled"] if self.tasks.busy(key) else ["!disabled"]
+            for btn in buttons:
+                btn.state(state)
+        if not active:
+            self.status_progress.stop()
+            self.status_progress.configure(mode="determinate", value=0)
+            self.cancel_btn.state(["disabled"])
+            self.status_text.set("Готово")
+            return
+        self.cancel_btn.state(["!disabled"])
+        if progress and progress[1]:
+            done, total, text = progress
+            self.status_progress.stop()
+            self.status_progress.configure(mode="determinate", maximum=total, value=done)
+            self.status_text.set(text or f"{done}/{total}")
+        else:
+            if str(self.status_progress["mode"]) != "indeterminate":
+                self.status_progress.configure(mode="indeterminate")
+                self.status_progress.start(15)
+            self.status_text.set(progress[2] if progress and progress[2] else f"Выполняется задач: {active}")
+
+    def _show_error(self, e: BaseException):
+        messagebox.showerror("Ошибка", str(e))
+
+    def _on_close(self):
+        self.tasks.shutdown()
+        self.destroy()
 
     #YES
     # Вкладка клиентов с методами добавления и перезагрузки/сортировки таблицы клиентов в БД
@@ -72,7 +207,9 @@ class App(tk.Tk):
         ttk.Entry(form, textvariable=self.c_phone, width=30).grid(row=1, column=1, sticky="w")
         ttk.Label(form, text="Город:").grid(row=1, column=2, sticky="w")
         ttk.Entry(form, textvariable=self.c_city, width=30).grid(row=1, column=3, sticky="w")
-        ttk.Button(form, text="Добавить", command=self.add_customer).grid(row=0, column=4, rowspan=2, padx=6)
+        add_btn = ttk.Button(form, text="Добавить", command=self.add_customer)
+        add_btn.grid(row=0, column=4, rowspan=2, padx=6)
+        self._task_buttons["add_customer"].append(add_btn)
 
         search_frm = ttk.Frame(frm) #поиск клиентов
         search_frm.pack(fill=tk.X, padx=8)
@@ -82,7 +219,9 @@ class App(tk.Tk):
         ttk.Button(search_frm, text="Найти", command=self.refresh_customers).pack(side=tk.LEFT, padx=6)
 
         #виджет вывода таблицы клиентов
-        self.c_tree = ttk.Treeview(frm, columns=("id", "name", "email", "phone", "city", "created_at"), show="headings")
+        tree_frm = ttk.Frame(frm)
+        tree_frm.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.c_tree = ttk.Treeview(tree_frm, columns=("id", "name", "email", "phone", "city", "created_at"), show="headings")
         for col, txt, w in [
             ("id", "ID", 50),
             ("name", "Имя", 160),
@@ -93,46 +232,45 @@ class App(tk.Tk):
         ]:
             self.c_tree.heading(col, text=txt)
             self.c_tree.column(col, width=w, anchor="w")
-        self.c_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        c_scroll = ttk.Scrollbar(tree_frm, orient=tk.VERTICAL)
+        c_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.c_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.c_view = VirtualTreeview(self.c_tree, c_scroll, self.tasks, "customers", _customer_values,
+                                      page_size=PAGE_SIZE, on_error=self._show_error)
 
     #YES
     def add_customer(self):
         """
         добавляет новых пользователей в базу данных с указанием времени, после ч его очищает поля ввода,
-        проводит проверку через регулярные выражения корректности email и телефона
-        при возникновении выводит ошибку через конструкцию try..except
-        """
-        try:
-            name = self.c_name.get().strip()
-            email = self.c_email.get().strip()
-            phone = self.c_phone.get().strip()
-            city = self.c_city.get().strip()
-            if email and not EMAIL_RE.match(email):
-                raise ValueError("Некорректный email")
-            if phone and not PHONE_RE.match(phone):
-                raise ValueError("Некорректный телефон")
-            cust = Customer(name=name, email=email, phone=phone, city=city)
-            db.add_customer(self.db_path, cust)
-            self.c_name.set("")
-            self.c_email.set("")
-            self.c_phone.set("")
-            self.c_city.set("")
-            self.refresh_customers()
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        корректность email и телефона проверяет Customer.validate (правила validation.RULES).
+        Запись выполняется в фоне (база может быть занята импортом), кнопка недоступна до её завершения,
+        ошибка выводится сообщением
+        """
+        name = self.c_name.get().strip()
+        email = self.c_email.get().strip()
+        phone = self.c_phone.get().strip()
+        city = self.c_city.get().strip()
+        cust = Customer(name=name, email=email, phone=phone, city=city)
+        self.tasks.submit("add_customer", db.add_customer, self.db_path, cust,
+                          on_done=self._customer_added, on_error=self._show_error)
+
+    def _customer_added(self, customer_id):
+        self.c_name.set("")
+        self.c_email.set("")
+        self.c_phone.set("")
+        self.c_city.set("")
+        self.refresh_customers()
 
     #YES
     def refresh_customers(self):
         """
-        Метод перезагрузки базы и вывода актуальной базы данных
+        Метод перезагрузки базы и вывода актуальной базы данных, запрос выполняется в фоне.
+        Таблица загружается страницами по мере прокрутки, при тех же условиях поиска
+        показанные строки обновляются на месте, результаты поиска берутся из кэша (SearchCache)
         """
-        for i in self.c_tree.get_children():
-            self.c_tree.delete(i)
         search = self.c_search.get().strip() or None
-        rows = db.get_customers(self.db_path, search=search) #загружаем отсоритрованю таблицу из базы данных
-        for r in rows:
-            #выводим результаты в виджет построчно
-            self.c_tree.insert("", tk.END, values=(r["id"], r["name"], r["email"], r["phone"], r["city"], r["created_at"]))
+        #загружаем отсоритрованю таблицу из базы данных
+        self.c_view.load(self.search.pager("customers", search), filters=(search,))
 
     #yes
     # Вкладка товаров с методами добавления и перезагрузки/сортировки таблицы товаров в БД
@@ -157,7 +295,9 @@ class App(tk.Tk):
         ttk.Entry(form, textvariable=self.p_price, width=20).grid(row=0, column=3, sticky="w")
         ttk.Label(form, text="SKU:").grid(row=0, column=4, sticky="w")
         ttk.Entry(form, textvariable=self.p_sku, width=20).grid(row=0, column=5, sticky="w")
-        ttk.Button(form, text="Добавить", command=self.add_product).grid(row=0, column=6, padx=6)
+        add_btn = ttk.Button(form, text="Добавить", command=self.add_product)
+        add_btn.grid(row=0, column=6, padx=6)
+        self._task_buttons["add_product"].append(add_btn)
 
         # блок поиска/сортировки товаров
         search_frm = ttk.Frame(frm)
@@ -168,7 +308,9 @@ class App(tk.Tk):
         ttk.Button(search_frm, text="Найти", command=self.refresh_products).pack(side=tk.LEFT, padx=6)
 
         # оформление блока визуализации зарегистрированных товаров
-        self.p_tree = ttk.Treeview(frm, columns=("id", "name", "price", "sku", "created_at"), show="headings")
+        tree_frm = ttk.Frame(frm)
+        tree_frm.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.p_tree = ttk.Treeview(tree_frm, columns=("id", "name", "price", "sku", "created_at"), show="headings")
         for col, txt, w in [
             ("id", "ID", 50),
             ("name", "Название", 220),
@@ -178,40 +320,46 @@ class App(tk.Tk):
         ]:
             self.p_tree.heading(col, text=txt)
             self.p_tree.column(col, width=w, anchor="w")
-        self.p_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        p_scroll = ttk.Scrollbar(tree_frm, orient=tk.VERTICAL)
+        p_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.p_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.p_view = VirtualTreeview(self.p_tree, p_scroll, self.tasks, "products", _product_values,
+                                      page_size=PAGE_SIZE, on_error=self._show_error)
 
     #YES
     def add_product(self):
         """
-        добавляет новые товары в базу данных с указанием времени, после чего очищает поля ввода
-        при возникновении выводит ошибку через конструкцию try..except
+        добавляет новые товары в базу данных с указанием времени, после чего очищает поля ввода.
+        Запись выполняется в фоне, кнопка недоступна до её завершения, ошибка выводится сообщением
         """
         try:
             name = self.p_name.get().strip()
             price = float(self.p_price.get().strip().replace(",", "."))
             sku = self.p_sku.get().strip()
-            pr = Product(name=name, price=price, sku=sku)
-            db.add_product(self.db_path, pr)
-            self.p_name.set("")
-            self.p_price.set("")
-            self.p_sku.set("")
-            self.refresh_products()
         except ValueError as ve:
             messagebox.showerror("Ошибка", str(ve))
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось добавить товар: {e}")
+            return
+        pr = Product(name=name, price=price, sku=sku)
+        self.tasks.submit("add_product", db.add_product, self.db_path, pr,
+                          on_done=self._product_added, on_error=self._product_error)
+
+    def _product_added(self, product_id):
+        self.p_name.set("")
+        self.p_price.set("")
+        self.p_sku.set("")
+        self.refresh_products()
+
+    def _product_error(self, e: BaseException):
+        messagebox.showerror("Ошибка", str(e) if isinstance(e, ValueError) else f"Не удалось добавить товар: {e}")
 
     #YES
     def refresh_products(self):
         """
-        метод перезагрузки базы и вывода актуальной таблицы товаров из базы данных
+        метод перезагрузки базы и вывода актуальной таблицы товаров из базы данных, запрос выполняется в фоне,
+        таблица загружается страницами по мере прокрутки
         """
-        for i in self.p_tree.get_children():
-            self.p_tree.delete(i)
         search = self.p_search.get().strip() or None
-        rows = db.get_products(self.db_path, search=search)
-        for r in rows:
-            self.p_tree.insert("", tk.END, values=(r["id"], r["name"], f'{r["price"]:.2f}', r["sku"], r["created_at"]))
+        self.p_view.load(self.search.pager("products", search), filters=(search,))
 
     #YES
     # Вкладка заказов с методами добавления/отображения заказов
@@ -241,11 +389,12 @@ class App(tk.Tk):
         ttk.Entry(top, textvariable=self.o_cust_search, width=20).pack(side=tk.LEFT)
         ttk.Button(top, text="Применить фильтры", command=self.refresh_orders).pack(side=tk.LEFT, padx=6)
 
-        # демонстрация собственной сортировки
+        # сортировка выполняется в базе (db.sort_spec), в таблицу приходит только видимая страница
         ttk.Label(top, text="Сортировка:").pack(side=tk.LEFT, padx=(20, 2))
         self.o_sort = tk.StringVar(value="date_desc")
-        ttk.Combobox(top, textvariable=self.o_sort, values=["date_desc", "date_asc", "total_desc", "total_asc"], width=12).pack(side=tk.LEFT)
-        ttk.Button(top, text="Моя сортировка", command=self.custom_sort_orders).pack(side=tk.LEFT, padx=6)
+        sort_cb = ttk.Combobox(top, textvariable=self.o_sort, values=list(ORDER_SORTS), width=12, state="readonly")
+        sort_cb.pack(side=tk.LEFT)
+        sort_cb.bind("<<ComboboxSelected>>", lambda e: self.custom_sort_orders())
 
         # Виджет создания заказов с реализацией выпадащего списка Combobox для товаров и заказов
         form = ttk.LabelFrame(frm, text="Создать заказ")
@@ -280,10 +429,14 @@ class App(tk.Tk):
         self.items_tree.grid(row=1, column=0, columnspan=7, sticky="we", pady=6)
 
         ttk.Button(form, text="Удалить позицию", command=self.remove_selected_item).grid(row=2, column=0, sticky="w")
-        ttk.Button(form, text="Создать заказ", command=self.create_order).grid(row=2, column=6, sticky="e")
+        create_btn = ttk.Button(form, text="Создать заказ", command=self.create_order)
+        create_btn.grid(row=2, column=6, sticky="e")
+        self._task_buttons["add_order"].append(create_btn)
 
         # визуализация блока всех заказов
-        self.o_tree = ttk.Treeview(frm, columns=("id", "date", "customer", "status", "total"), show="headings")
+        tree_frm = ttk.Frame(frm)
+        tree_frm.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.o_tree = ttk.Treeview(tree_frm, columns=("id", "date", "customer", "status", "total"), show="headings")
         for col, txt, w in [
             ("id", "ID", 60),
             ("date", "Дата", 110),
@@ -293,28 +446,69 @@ class App(tk.Tk):
         ]:
             self.o_tree.heading(col, text=txt)
             self.o_tree.column(col, width=w, anchor="w")
-        self.o_tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        o_scroll = ttk.Scrollbar(tree_frm, orient=tk.VERTICAL)
+        o_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.o_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.o_tree.bind("<Double-1>", self.show_order_details)
-
-        self._order_buffer = []  # для своей сортировки
+        self.o_view = VirtualTreeview(self.o_tree, o_scroll, self.tasks, "orders", _order_values,
+                                      page_size=PAGE_SIZE, on_error=self._show_error)
+
+        # выпадающие списки формы заказа: виджет, переменная, функция страницы db, пункт (подпись, значение), выбор
+        self._customers_map: Dict[str, int] = {}
+        self._products_map: Dict[str, tuple] = {}
+        self._combos = {
+            "customers": (self.o_customer_cb, self.o_customer, db.get_customers_page, _customer_choice,
+                          self._customers_map),
+            "products": (self.o_product_cb, self.o_product, db.get_products_page, _product_choice,
+                         self._products_map),
+        }
+        self._combo_loaded: Dict[str, tuple] = {}
+        for table in self._combos:
+            self._combos[table][1].trace_add("write", Debouncer(self, lambda t=table: self._lookup_combo(t)).schedule)
 
     #YES
     def _reload_customers_cb(self):
         """
-        выгрузка списка клиентов с id из базы данных в выпадающий список
+        выпадающий список клиентов перед открытием: первые COMBO_LIMIT клиентов по введённому тексту
+        ищутся в фоне (db.get_customers_page), таблица целиком не читается
         """
-        rows = db.get_customers(self.db_path)
-        self._customers_map = {f'{r["name"]} (id={r["id"]})': r["id"] for r in rows}
-        self.o_customer_cb["values"] = list(self._customers_map.keys())
+        self._lookup_combo("customers")
 
     #YES
     def _reload_products_cb(self):
         """
-        выгрузка списка товаров с id из базы данных в выпадающий список
+        выпадающий список товаров перед открытием — как и список клиентов
+        """
+        self._lookup_combo("products")
+
+    def _lookup_combo(self, table: str):
+        """
+        Поиск строк выпадающего списка формы заказа в фоне. Повторный поиск — только если изменились
+        введённый текст или данные таблицы (db.data_version). Выбранный пункт списка строкой поиска не считается.
+        Найденные пункты добавляются в словарь выбора (_customers_map / _products_map), список показывает последние
         """
-        rows = db.get_products(self.db_path)
-        self._products_map = {f'{r["name"]} (id={r["id"]}, {r["price"]:.2f})': (r["id"], float(r["price"]), r["name"]) for r in rows}
-        self.o_product_cb["values"] = list(self._products_map.keys())
+        cb, var, fetch, choice, choices = self._combos[table]
+        text = var.get().strip()
+        term = "" if text in choices else text
+        state = (db.data_version(self.db_path, table), term)
+        if self._combo_loaded.get(table) == state:
+            return
+        self._combo_loaded[table] = state
+
+        def fill(result):
+            labels = []
+            for r in result[0]:
+                label, value = choice(r)
+                choices[label] = value
+                labels.append(label)
+            cb["values"] = labels
+
+        def failed(e):
+            self._combo_loaded.pop(table, None)
+            self._show_error(e)
+
+        self.tasks.submit(f"{table}_choices", fetch, self.db_path, term or None, COMBO_LIMIT, sort="name",
+                          on_done=fill, on_error=failed)
 
     #YES
     def add_order_item_to_list(self):
@@ -322,7 +516,7 @@ class App(tk.Tk):
         добавления товара в текущий заказ с проверкой того, что бы поля были выбраны
         """
         sel = self.o_product.get()
-        if not sel or sel not in getattr(self, "_products_map", {}):
+        if not sel or sel not in self._products_map:
             messagebox.showwarning("Внимание", "Выберите товар")
             return
         pid, price, pname = self._products_map[sel]
@@ -341,11 +535,12 @@ class App(tk.Tk):
     #YES
     def create_order(self):
         """
-        оформление нового заказа: сбор данных, проверка, добавление в базу и очистка интерфейса
+        оформление нового заказа: сбор данных и проверка формы, добавление в базу в фоне
+        (кнопка недоступна до завершения), затем очистка интерфейса
         """
         try:
             sel = self.o_customer.get()
-            if not sel or sel not in getattr(self, "_customers_map", {}):
+            if not sel or sel not in self._customers_map:
                 raise ValueError("Выберите клиента")
             customer_id = self._customers_map[sel]
             items = []
@@ -355,65 +550,47 @@ class App(tk.Tk):
                 items.append(it)
             if not items:
                 raise ValueError("Добавьте хотя бы один товар в заказ")
-            order = Order(customer_id=customer_id, date=datetime.utcnow().date().isoformat(), status="new", items=items)
-            db.add_order(self.db_path, order)
-            # Очистить форму
-            for i in self.items_tree.get_children():
-                self.items_tree.delete(i)
-            self.o_customer.set("")
-            self.o_product.set("")
-            self.o_qty.set(1)
-            self.refresh_orders()
-            messagebox.showinfo("Успех", "Заказ создан")
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
+            return
+        order = Order(customer_id=customer_id, date=datetime.utcnow().date().isoformat(), status="new", items=items)
+        self.tasks.submit("add_order", db.add_order, self.db_path, order,
+                          on_done=self._order_created, on_error=self._show_error)
+
+    def _order_created(self, order_id):
+        # Очистить форму
+        for i in self.items_tree.get_children():
+            self.items_tree.delete(i)
+        self.o_customer.set("")
+        self.o_product.set("")
+        self.o_qty.set(1)
+        self.refresh_orders()
+        messagebox.showinfo("Успех", "Заказ создан")
 
     #YES
     def refresh_orders(self):
         """
-        Обновляет таблицу виджета отображения заказов применя сортировку по дате, имени, email и статусу заказа клиента
-        """
-        for i in self.o_tree.get_children(): #очищает предыдущий вывод
-            self.o_tree.delete(i)
-        rows = db.get_orders(
-            self.db_path,
-            date_from=self.o_from.get().strip() or None,
-            date_to=self.o_to.get().strip() or None,
-            status=self.o_status.get().strip() or None,
-            customer_search=self.o_cust_search.get().strip() or None,
-            order_by="date DESC",
+        Обновляет таблицу виджета отображения заказов применя сортировку по дате, имени, email и статусу заказа клиента,
+        запрос выполняется в фоне, при повторных нажатиях выводится результат последнего.
+        Заказы загружаются страницами по мере прокрутки, при тех же фильтрах показанные строки обновляются на месте
+        """
+        filters = (
+            self.o_from.get().strip() or None,
+            self.o_to.get().strip() or None,
+            self.o_status.get().strip() or None,
+            ORDER_SORTS.get(self.o_sort.get(), ORDER_SORTS["date_desc"]),
         )
-        self._order_buffer = rows[:]  # сохраняем для своей сортировки
-        for r in rows:
-            self.o_tree.insert("", tk.END, values=(r["id"], r["date"], r["customer_name"], r["status"], f'{r["total"]:.2f}'))
+        customer_search = self.o_cust_search.get().strip() or None
+        self.o_view.load(self.search.pager("orders", customer_search, filters), filters=filters + (customer_search,))
 
     #YES
     def custom_sort_orders(self):
         """
-        Собственная сортировка, конвертирует список словарей в объекты `Order`, сортирует их по выбранному
-        пользовательским способом критерию с помощью быстрой сортировки (`quicksort_orders`) и обновляет таблицу заказов
-        """
-        orders = []
-        for r in self._order_buffer:
-            o = Order(id=r["id"], customer_id=r["customer_id"], date=r["date"], status=r["status"], total=r["total"], items=[])
-            orders.append(o)
-        #создаем словарь
-        keymap = {
-            "date_desc": (lambda o: o.date, True),
-            "date_asc": (lambda o: o.date, False),
-            "total_desc": (lambda o: o.total, True),
-            "total_asc": (lambda o: o.total, False),
-        }
-        key, rev = keymap.get(self.o_sort.get(), (lambda o: o.date, True))
-        sorted_orders = quicksort_orders(orders, key=key, reverse=rev)
-
-        # Обновить таблицу, удаляя и вставляя результаты сортировки
-        by_id = {r["id"]: r for r in self._order_buffer}
-        for i in self.o_tree.get_children():
-            self.o_tree.delete(i)
-        for o in sorted_orders:
-            r = by_id[o.id]
-            self.o_tree.insert("", tk.END, values=(r["id"], r["date"], r["customer_name"], r["status"], f'{r["total"]:.2f}'))
+        Сортировка заказов по выбранному критерию (sorting.ORDER_SORTS): запрос с ORDER BY по индексу
+        и постраничной выборкой, таблица загружается заново с первой страницы.
+        Результат поиска по клиенту, уже найденный с другой сортировкой, переупорядочивается в памяти (SearchCache)
+        """
+        self.refresh_orders()
 
     #YES
     def show_order_details(self, event=None):
@@ -427,9 +604,14 @@ class App(tk.Tk):
         if not sel:
             return
         order_id = int(self.o_tree.item(sel[0], "values")[0])
-        items = db.get_order_items(self.db_path, order_id)
-        details = "\n".join([f'- {i["product_name"]} x{i["quantity"]} = {i["subtotal"]:.2f}' for i in items])
-        messagebox.showinfo("Детали заказа", f"Позиции заказа #{order_id}:\n{details}")
+
+        def show(items):
+            details = "\n".join([f'- {i["product_name"]} x{i["quantity"]} = {i["subtotal"]:.2f}' for i in items])
+            messagebox.showinfo("Детали заказа", f"Позиции заказа #{order_id}:\n{details}")
+
+        # позиции читаются в фоне, при двойных кликах подряд показывается последний заказ
+        self.tasks.submit("order_details", db.get_order_items, self.db_path, order_id,
+                          on_done=show, on_error=self._show_error)
 
     #YES
     # Вкладка аналитики
@@ -442,47 +624,111 @@ class App(tk.Tk):
         btns = ttk.Frame(frm)
         btns.pack(fill=tk.X, padx=8, pady=8)
         ttk.Button(btns, text="Топ-5 клиентов", command=self.draw_top5).pack(side=tk.LEFT, padx=6)
-        ttk.Button(btns, text="Динамика заказов", command=lambda: self.draw_timeseries("D")).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btns, text="Динамика заказов", command=lambda: self.draw_timeseries(self.ts_freq.get())).pack(side=tk.LEFT, padx=6)
+        self.ts_freq = tk.StringVar(value="D")
+        ttk.Combobox(btns, textvariable=self.ts_freq, values=["D", "W", "M", "Q", "Y"], width=4, state="readonly").pack(side=tk.LEFT)
         ttk.Button(btns, text="Граф связей", command=self.draw_network).pack(side=tk.LEFT, padx=6)
+        self.net_by = tk.StringVar(value="city")
+        ttk.Combobox(btns, textvariable=self.net_by, values=["city", "product"], width=8, state="readonly").pack(side=tk.LEFT)
+        self.net_mode = tk.StringVar(value="bipartite")
+        ttk.Combobox(btns, textvariable=self.net_mode, values=["bipartite", "aggregate"], width=10, state="readonly").pack(side=tk.LEFT)
+
+        sales_btns = ttk.Frame(frm)
+        sales_btns.pack(fill=tk.X, padx=8)
+        ttk.Button(sales_btns, text="Топ товаров", command=self.draw_top_products).pack(side=tk.LEFT, padx=6)
+        self.sales_by = tk.StringVar(value="revenue")
+        ttk.Combobox(sales_btns, textvariable=self.sales_by, values=["revenue", "quantity"], width=9, state="readonly").pack(side=tk.LEFT)
+        ttk.Button(sales_btns, text="ABC-анализ", command=self.draw_abc).pack(side=tk.LEFT, padx=6)
+        ttk.Button(sales_btns, text="RFM-сегменты", command=self.draw_rfm).pack(side=tk.LEFT, padx=6)
+        ttk.Button(sales_btns, text="Сводка продаж", command=self.draw_sales_summary).pack(side=tk.LEFT, padx=6)
 
         self.canvas_frame = ttk.Frame(frm)
         self.canvas_frame.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
         self._current_canvas = None
 
     #YES
-    def _show_figure(self, fig):
-        """
-        отображает, растягивает, проверят, не отображен ли другой график в интерфейсе, по необходимости удаляет.
-        размещает график полученный из matplotlib в tkinter
-        :param fig: график полученный из matplotlib
-        """
-        if self._current_canvas:
-            self._current_canvas.get_tk_widget().destroy()
-        canvas = FigureCanvasTkAgg(fig, master=self.canvas_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        self._current_canvas = canvas
+    def _show_chart(self, chart: str, params: dict, data):
+        """
+        отображает и растягивает график в интерфейсе. Фигура и холст создаются один раз при первом графике,
+        дальше данные перерисовываются в ту же фигуру (analysis.REPORTS[chart].render(..., fig=...)):
+        прежние оси удаляются, новых фигур и холстов не появляется, размер фигуры следует за размером холста
+        :param chart: отчёт из analysis.REPORTS
+        :param params: параметры отчёта
+        :param data: данные отчёта (из фона или ChartCache)
+        """
+        import analysis  # уже загружен фоновой задачей или prewarm_analytics
+        report = analysis.REPORTS[chart]
+        render_params = {k: params[k] for k in report.render_params if k in params}
+        if self._current_canvas is None:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            canvas = FigureCanvasTkAgg(report.render(data, **render_params), master=self.canvas_frame)
+            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self._current_canvas = canvas
+        else:
+            report.render(data, fig=self._current_canvas.figure, **render_params)
+        self._current_canvas.draw_idle()
 
     #YES
     def draw_top5(self):
         """
         функция вызова функции построения графика ТОП-5 клиентов и размещения фигуры на странице
         """
-        fig = analysis.top5_customers_figure(self.db_path)
-        self._show_figure(fig)
+        self._draw("top_customers", n=5)
 
     #YES
     def draw_timeseries(self, freq="D"):
         """
         функция вызова функции динамики заказов и размещения фигуры на странице
         """
-        fig = analysis.orders_timeseries_figure(self.db_path, freq=freq)
-        self._show_figure(fig)
+        self._draw("orders_timeseries", freq=freq)
 
     #YES
     def draw_network(self):
-        fig = analysis.customers_network_figure(self.db_path, by="city")
-        self._show_figure(fig)
+        self._draw("customers_network", by=self.net_by.get(), mode=self.net_mode.get())
+
+    #YES
+    def draw_top_products(self):
+        """
+        ТОП-10 товаров по выручке или количеству (без отменённых заказов)
+        """
+        self._draw("top_products", by=self.sales_by.get())
+
+    #YES
+    def draw_abc(self):
+        """
+        ABC-анализ товаров по выручке
+        """
+        self._draw("abc")
+
+    #YES
+    def draw_rfm(self):
+        """
+        RFM-сегменты клиентов
+        """
+        self._draw("rfm")
+
+    #YES
+    def draw_sales_summary(self):
+        """
+        сводка продаж: средний чек, корзина, повторные покупки
+        """
+        self._draw("sales_summary")
+
+    def _draw(self, chart: str, **params):
+        """
+        построение данных отчёта analysis.REPORTS[chart] в фоне и отрисовка их на холсте вкладки;
+        все графики делят один ключ задачи, поэтому на странице всегда оказывается последний запрошенный.
+        Если данные с теми же параметрами уже строились и с тех пор не менялись, они берутся из кэша
+        """
+        key = self.charts.key(chart, params)
+        data = self.charts.get(key)
+        if data is not None:
+            self.tasks.cancel("chart")  # начатое раньше построение не должно заменить этот график
+            self._show_chart(chart, params, data)
+            return
+        self.tasks.submit("chart", _chart_data, chart, self.db_path,
+                          on_done=lambda result: self._show_chart(chart, params, self.charts.put(key, result)),
+                          on_error=self._show_error, process=True, **params)
 
     # Вкладка администрирование
     def _build_admin_tab(self):
@@ -494,14 +740,50 @@ class App(tk.Tk):
         lbl = ttk.LabelFrame(frm, text="Импорт/Экспорт")
         lbl.pack(fill=tk.X, padx=8, pady=8)
 
-        ttk.Button(lbl, text="Экспорт CSV (папка)", command=self.export_csv).pack(side=tk.LEFT, padx=6, pady=6)
-        ttk.Button(lbl, text="Импорт CSV (папка)", command=self.import_csv).pack(side=tk.LEFT, padx=6, pady=6)
-        ttk.Button(lbl, text="Экспорт JSON (файл)", command=self.export_json).pack(side=tk.LEFT, padx=6, pady=6)
-        ttk.Button(lbl, text="Импорт JSON (файл)", command=self.import_json).pack(side=tk.LEFT, padx=6, pady=6)
+        # операции ввода-вывода идут по одной, кнопки блокируются на время выполнения
+        for text, command in [
+            ("Экспорт CSV (папка)", self.export_csv),
+            ("Импорт CSV (папка)", self.import_csv),
+            ("Экспорт JSON (файл)", self.export_json),
+            ("Импорт JSON (файл)", self.import_json),
+            ("Экспорт NDJSON (файл)", self.export_ndjson),
+            ("Импорт NDJSON (файл)", self.import_ndjson),
+        ]:
+            btn = ttk.Button(lbl, text=text, command=command)
+            btn.pack(side=tk.LEFT, padx=6, pady=6)
+            self._task_buttons["io"].append(btn)
 
         lbl2 = ttk.LabelFrame(frm, text="Утилиты")
         lbl2.pack(fill=tk.X, padx=8, pady=8)
-        ttk.Button(lbl2, text="Резервная копия БД", command=self.backup_db).pack(side=tk.LEFT, padx=6, pady=6)
+        self.backup_btn = ttk.Button(lbl2, text="Резервная копия БД", command=self.backup_db)
+        self.backup_btn.pack(side=tk.LEFT, padx=6, pady=6)
+        self._task_buttons["io"].append(self.backup_btn)
+        self.backup_compress = tk.BooleanVar(value=False)
+        ttk.Checkbutton(lbl2, text="Сжать (gzip + sha256)", variable=self.backup_compress).pack(side=tk.LEFT, padx=6)
+
+    def _run_io(self, func, *args, done_text: str, refresh: bool = False, on_done=None, **kwargs):
+        """
+        запуск импорта/экспорта/резервного копирования в фоне под общим ключом "io"
+        :param done_text: сообщение по завершении
+        :param refresh: обновить таблицы после завершения (для импорта)
+        :param on_done: дополнительная обработка результата, возвращает дополнение к сообщению
+        """
+        def finished(result):
+            if refresh:
+                self.refresh_tabs()
+            extra = on_done(result) if on_done else ""
+            messagebox.showinfo("Готово", done_text + (extra or ""))
+
+        self.tasks.submit("io", func, *args, on_done=finished, on_error=self._show_error, **kwargs)
+
+    def _run_import(self, func, path: str, clear: bool):
+        """
+        импорт с выводом числа загруженных строк; «Отмена» прерывает импорт на следующей пачке с откатом транзакции.
+        Строки, не прошедшие проверку, не загружаются и сохраняются в таблицу import_rejects, итог — в сообщении
+        """
+        self._run_io(_with_table_progress, func, self.db_path, path, clear_before=clear, on_invalid="quarantine",
+                     done_text=f"Импортировано из {path}", refresh=True, pass_task=True,
+                     on_done=lambda reports: "".join(f"\n{r.summary()}" for r in reports.values()))
 
     #YES
     def export_csv(self):
@@ -509,30 +791,21 @@ class App(tk.Tk):
         Экспорт базы данных в .csv
         Returns: файлы .csv
         """
-        try:
-            folder = filedialog.askdirectory()
-            if not folder:
-                return
-            db.export_to_csv(self.db_path, folder)
-            messagebox.showinfo("Готово", f"Экспортировано в {folder}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        self._run_io(db.export_to_csv, self.db_path, folder, done_text=f"Экспортировано в {folder}")
 
     #YES
     def import_csv(self):
         """
         Импорт базы данных из .csv c возможность очистки ужу созданной базы данных
         """
-        try:
-            folder = filedialog.askdirectory()
-            if not folder:
-                return
-            clear = messagebox.askyesno("Очистка", "Очистить текущие данные перед импортом?")
-            db.import_from_csv(self.db_path, folder, clear_before=clear)
-            self.refresh_customers(); self.refresh_products(); self.refresh_orders()
-            messagebox.showinfo("Готово", f"Импортировано из {folder}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        clear = messagebox.askyesno("Очистка", "Очистить текущие данные перед импортом?")
+        self._run_import(db.import_from_csv, folder, clear)
 
     #YES
     def export_json(self):
@@ -540,43 +813,80 @@ class App(tk.Tk):
         Экспорт базы данных в .json
         Returns: файл .json
         """
-        try:
-            path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
-            if not path:
-                return
-            db.export_to_json(self.db_path, path)
-            messagebox.showinfo("Готово", f"Экспортировано в {path}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=JSON_FILETYPES)
+        if not path:
+            return
+        self._run_io(db.export_to_json, self.db_path, path, done_text=f"Экспортировано в {path}")
 
     #YES
     def import_json(self):
         """
         Импорт базы данных из .json с возможностью предварительной очистки
         """
-        try:
-            path = filedialog.askopenfilename(filetypes=[("JSON", "*.json")])
-            if not path:
-                return
-            clear = messagebox.askyesno("Очистка", "Очистить текущие данные перед импортом?")
-            db.import_from_json(self.db_path, path, clear_before=clear)
-            self.refresh_customers(); self.refresh_products(); self.refresh_orders()
-            messagebox.showinfo("Готово", f"Импортировано из {path}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        path = filedialog.askopenfilename(filetypes=JSON_FILETYPES)
+        if not path:
+            return
+        clear = messagebox.askyesno("Очистка", "Очистить текущие данные перед импортом?")
+        self._run_import(db.import_from_json, path, clear)
+
+    #YES
+    def export_ndjson(self):
+        """
+        Экспорт базы данных в .ndjson (по записи на строку), .ndjson.gz — со сжатием
+        """
+        path = filedialog.asksaveasfilename(defaultextension=".ndjson", filetypes=NDJSON_FILETYPES)
+        if not path:
+            return
+        self._run_io(db.export_to_ndjson, self.db_path, path, done_text=f"Экспортировано в {path}")
+
+    #YES
+    def import_ndjson(self):
+        """
+        Импорт базы данных из .ndjson с возможностью предварительной очистки
+        """
+        path = filedialog.askopenfilename(filetypes=NDJSON_FILETYPES)
+        if not path:
+            return
+        clear = messagebox.askyesno("Очистка", "Очистить текущие данные перед импортом?")
+        self._run_import(db.import_from_ndjson, path, clear)
 
     #YES
     def backup_db(self):
         """
-        Сохранение базы данных (резервное копирование)
+        Сохранение базы данных (резервное копирование) через SQLite backup API в фоне,
+        прогресс по страницам выводится в строке состояния, «Отмена» прерывает копирование
         Returns: файл базы данных
         """
-        try:
-            path = filedialog.asksaveasfilename(defaultextension=".db", filetypes=[("SQLite DB", "*.db")])
-            if not path:
-                return
-            import shutil
-            shutil.copyfile(self.db_path, path)
-            messagebox.showinfo("Готово", f"Резервная копия сохранена: {path}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
\ No newline at end of file
+        compress = self.backup_compress.get()
+        ext, types = (".db.gz", [("SQLite DB (gzip)", "*.db.gz")]) if compress else (".db", [("SQLite DB", "*.db")])
+        path = filedialog.asksaveasfilename(defaultextension=ext, filetypes=types)
+        if not path:
+            return
+        self._run_io(_backup_with_progress, self.db_path, path, compress=compress, pass_task=True,
+                     done_text=f"Резервная копия сохранена: {path}",
+                     on_done=lambda digest: f"\nsha256: {digest}" if digest else "")
+
+
+def _chart_data(chart: str, db_path: str, **params):
+    """
+    Выполняется в фоне (в потоке или процессе аналитики): модуль analysis импортируется при первом вызове
+    """
+    import analysis
+    return analysis.REPORTS[chart].data(db_path, **params)
+
+
+def _prewarm_analytics() -> None:
+    import analysis  # noqa: F401
+    from matplotlib.backends import backend_tkagg  # noqa: F401
+
+
+def _with_table_progress(func, *args, task, **kwargs):
+    """
+    вызов импорта из фоновой задачи: прогресс (таблица, строк) передаётся в строку состояния
+    """
+    return func(*args, progress=lambda table, n: task.report(n, 0, f"{table}: {n} строк"), **kwargs)
+
+
+def _backup_with_progress(db_path: str, path: str, compress: bool, task):
+    return db.backup(db_path, path, compress=compress,
+                     progress=lambda done, total: task.report(done, total, f"Копирование: {done}/{total} стр."))
@@ -1,22 +1,43 @@
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from array import array
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sorting import sort_records
+from validation import validate_record
 
 #описаны основные классы и функции
+
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> Tuple[str, ...]:
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls))
+    return names
+
+
 class BaseModel:
+    # пустые __slots__: у вариантов моделей со слотами (Slotted*) не должно появиться __dict__ из базовых классов
+    __slots__ = ()
+
     def to_dict(self) -> Dict[str, Any]:
         """
-        Преобразует экземпляр класса в словарь с помощью
+        Преобразует экземпляр класса в словарь по полям dataclass.
+        В отличие от dataclasses.asdict значения не копируются рекурсивно (поля моделей — неизменяемые скаляры,
+        вложенные позиции заказа преобразует Order.to_dict)
         Returns: словарь
         """
-        return asdict(self)
+        return {name: getattr(self, name) for name in _field_names(type(self))}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]):
         """
         Создает новый экземпляр класса из словаря данных.
+        Ключи, которых нет среди полей модели (например, customer_name в строках db.get_orders), пропускаются
         """
-        return cls(**data)
+        return cls(**{name: data[name] for name in _field_names(cls) if name in data})
 
     def validate(self) -> None:
         """
@@ -25,13 +46,14 @@ class BaseModel:
         pass
 
 
+# Поля и методы каждой модели описаны в классе _<Модель>Fields без __dict__ и __slots__ полей. От него наследуются
+# обычный dataclass (Customer и т.д.: атрибуты экземпляра в __dict__, можно добавлять свои) и вариант
+# со слотами (SlottedCustomer и т.д.: __slots__ по полям, без __dict__ — для миллионов записей в памяти).
+# Слоты объявлены в подклассе, поэтому не конфликтуют со значениями по умолчанию — атрибутами базового класса
+
 @dataclass
-class Customer(BaseModel):
-    """
-    Представляет клиента:
-    - Поля включают ID, имя, email, телефон, город, дату создания.
-    - Метод `validate()` проверяет корректность email и номера телефона с помощью регулярных выражений, а также обязательность имени.
-    """
+class _CustomerFields(BaseModel):
+    __slots__ = ()
     id: Optional[int] = None
     name: str = ""
     email: str = ""
@@ -42,25 +64,31 @@ class Customer(BaseModel):
     def validate(self) -> None:
         """
         Проверяет корректность email и номера телефона с помощью регулярных выражений, а также обязательность имени
-        Демонстрация инкапсуляции: валидация внутри модели
+        Демонстрация инкапсуляции: валидация внутри модели, правила общие с пакетной проверкой (validation.RULES)
         """
-        import re
-        email_re = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
-        phone_re = re.compile(r"^\+?\d[\d\s\-()]{7,}$")
-        if self.email and not email_re.match(self.email):
-            raise ValueError("Некорректный email")
-        if self.phone and not phone_re.match(self.phone):
-            raise ValueError("Некорректный номер телефона")
-        if not self.name:
-            raise ValueError("Имя клиента обязательно")
+        validate_record("customers", self)
 
 
 @dataclass
-class Product(BaseModel):
+class Customer(_CustomerFields):
     """
-    Представляет товар:
-    Поля: ID, название, цена, артикул (SKU), дата создания.
+    Представляет клиента:
+    - Поля включают ID, имя, email, телефон, город, дату создания.
+    - Метод `validate()` проверяет корректность email и номера телефона с помощью регулярных выражений, а также обязательность имени.
     """
+
+
+@dataclass
+class SlottedCustomer(_CustomerFields):
+    """
+    Customer со __slots__: без __dict__ у экземпляра
+    """
+    __slots__ = _field_names(_CustomerFields)
+
+
+@dataclass
+class _ProductFields(BaseModel):
+    __slots__ = ()
     id: Optional[int] = None
     name: str = ""
     price: float = 0.0
@@ -71,18 +99,28 @@ class Product(BaseModel):
         """
         Проверяет наличие названия и что цена не отрицательная.
         """
-        if not self.name:
-            raise ValueError("Название товара обязательно")
-        if self.price < 0:
-            raise ValueError("Цена не может быть отрицательной")
+        validate_record("products", self)
 
 
 @dataclass
-class OrderItem(BaseModel):
+class Product(_ProductFields):
     """
-    Представляет позицию заказа:
-    Поля: ID, ID заказа, ID продукта, количество, цена, сумма.
+    Представляет товар:
+    Поля: ID, название, цена, артикул (SKU), дата создания.
     """
+
+
+@dataclass
+class SlottedProduct(_ProductFields):
+    """
+    Product со __slots__: без __dict__ у экземпляра
+    """
+    __slots__ = _field_names(_ProductFields)
+
+
+@dataclass
+class _OrderItemFields(BaseModel):
+    __slots__ = ()
     id: Optional[int] = None
     order_id: Optional[int] = None
     product_id: int = 0
@@ -104,17 +142,31 @@ class OrderItem(BaseModel):
 
 
 @dataclass
-class Order(BaseModel):
+class OrderItem(_OrderItemFields):
     """
-    Представляет заказ:
-    Поля:ID, ID клиента, дата, статус, общий итог, список позиций заказа.
+    Представляет позицию заказа:
+    Поля: ID, ID заказа, ID продукта, количество, цена, сумма.
+    """
+
+
+@dataclass
+class SlottedOrderItem(_OrderItemFields):
+    """
+    OrderItem со __slots__: без __dict__ у экземпляра
     """
+    __slots__ = _field_names(_OrderItemFields)
+
+
+@dataclass
+class _OrderFields(BaseModel):
+    __slots__ = ()
+    item_type: ClassVar[type]  # класс позиций, в которые from_dict преобразует словари
     id: Optional[int] = None
     customer_id: int = 0
     date: str = field(default_factory=lambda: datetime.utcnow().date().isoformat())
     status: str = "new"
     total: float = 0.0
-    items: List[OrderItem] = field(default_factory=list)
+    items: List[_OrderItemFields] = field(default_factory=list)
 
     def validate(self) -> None:
         """
@@ -130,26 +182,50 @@ class Order(BaseModel):
         if self.total != calc_total:
             self.total = calc_total
 
+    def to_dict(self) -> Dict[str, Any]:
+        d = super().to_dict()
+        d["items"] = [it.to_dict() for it in self.items]
+        return d
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        """
+        Создает заказ из словаря, позиции-словари преобразуются в item_type
+        """
+        items = [it if isinstance(it, _OrderItemFields) else cls.item_type.from_dict(it) for it in data.get("items", ())]
+        return cls(**{name: data[name] for name in _field_names(cls) if name in data and name != "items"}, items=items)
+
+
+@dataclass
+class Order(_OrderFields):
+    """
+    Представляет заказ:
+    Поля:ID, ID клиента, дата, статус, общий итог, список позиций заказа.
+    """
+    item_type = OrderItem
+
+
+@dataclass
+class SlottedOrder(_OrderFields):
+    """
+    Order со __slots__: без __dict__ у экземпляра, позиции из словарей — SlottedOrderItem
+    """
+    __slots__ = _field_names(_OrderFields)
+    item_type = SlottedOrderItem
+
 
 #YES
 def quicksort_orders(orders: List[Order], key=lambda o: o.date, reverse: bool = False) -> List[Order]:
     """
-    Реализация алгоритма сортировки “быстрая сортировка” (quicksort), который принимает список объектов `Order` и сортирует
-    его по определенному ключу (например, по дате или по общему итогу заказа).
+    Сортировка списка объектов `Order` по определенному ключу (например, по дате или по общему итогу заказа).
+    Имя сохранено для совместимости: вместо рекурсивной быстрой сортировки используется устойчивая
+    sorting.sort_records — O(n log n) без рекурсии, ключ вычисляется один раз на заказ
     :param orders: Список, который нужно отсортировать
     :param key: функция, которая для каждого объекта возвращает значение для сравнения. По умолчанию сортировка по дате.
-    :param reverse: если True итоговый список переворачивается
-    :return: Возвращает отсортированный (или обратный при `reverse=True`) список объектов `Order`
+    :param reverse: если True — по убыванию, заказы с равным ключом сохраняют исходный порядок
+    :return: Возвращает новый отсортированный список объектов `Order`
     """
-    if len(orders) <= 1:
-        return orders[:]
-    pivot = orders[len(orders) // 2]
-    pivot_key = key(pivot)
-    left = [o for o in orders if key(o) < pivot_key]
-    middle = [o for o in orders if key(o) == pivot_key]
-    right = [o for o in orders if key(o) > pivot_key]
-    result = quicksort_orders(left, key) + middle + quicksort_orders(right, key)
-    return list(reversed(result)) if reverse else result
+    return sort_records(orders, key=key, reverse=reverse)
 
 
 # Полиморфизм на примере форматирования для экспорта
@@ -157,6 +233,8 @@ class Exportable:
     """
     Предложение для наследников реализовать метод `export()`, который возвращает словарь для экспорта.
     """
+    __slots__ = ()
+
     def export(self) -> Dict[str, Any]:
         """
         Может быть переопределено наследниками
@@ -168,6 +246,8 @@ class ExportableCustomer(Customer, Exportable):
     """
     Наследование от соответствующих моделей и `Exportable`.
     """
+    __slots__ = ()
+
     def export(self) -> Dict[str, Any]:
         d = super().export()
         d["type"] = "customer"
@@ -178,7 +258,279 @@ class ExportableProduct(Product, Exportable):
     """
     Наследования от соответствующих моделей и `Exportable`.
     """
+    __slots__ = ()
+
     def export(self) -> Dict[str, Any]:
         d = super().export()
         d["type"] = "product"
-        return d
\ No newline at end of file
+        return d
+
+
+# Колоночные контейнеры: каждое поле хранится в array (числа — машинными словами, без объекта на значение),
+# повторяющиеся строки (дата, статус) — словарным кодированием: код в array и список уникальных значений.
+# numpy и pandas импортируются только при преобразованиях, чтобы не замедлять импорт models
+
+class _Dictionary:
+    """
+    Словарное кодирование столбца строк: values[code] — значение, код -1 — None
+    """
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> Any:
+        return self.values[code] if code >= 0 else None
+
+
+def _np_column(data: array):
+    import numpy as np
+    # копия: представление буфера запретило бы дальнейшее добавление строк в array (BufferError)
+    return np.frombuffer(data, dtype=data.typecode).copy() if len(data) else np.empty(0, dtype=data.typecode)
+
+
+def _np_to_array(values, code: str) -> array:
+    return array(code, values.astype(code, copy=False).tobytes())
+
+
+def _encode_strings(dictionary: _Dictionary, column) -> array:
+    """
+    Коды столбца DataFrame: кодируются только уникальные значения, коды строк получаются индексированием numpy
+    """
+    import numpy as np
+    import pandas as pd
+    cat = pd.Categorical(column)
+    # код -1 (пропуск) выбирает последний элемент — код None
+    lookup = np.array([dictionary.code(v) for v in cat.categories] + [-1], dtype="i")
+    return _np_to_array(lookup[cat.codes], "i")
+
+
+#YES
+class OrderItemBatch:
+    """
+    Позиции заказов в колоночном виде: id, order_id, product_id, quantity, price, subtotal.
+    Занимает 48 байт на позицию вместо нескольких сотен у объекта OrderItem или словаря строки.
+    id = 0 означает отсутствие id (позиция ещё не сохранена)
+    """
+    COLUMNS = (("id", "q"), ("order_id", "q"), ("product_id", "q"), ("quantity", "q"), ("price", "d"), ("subtotal", "d"))
+    __slots__ = ("_data",)
+
+    def __init__(self):
+        self._data: Dict[str, array] = {name: array(code) for name, code in self.COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self._data["id"])
+
+    def append_row(self, row: Sequence[Any]) -> None:
+        """
+        Добавление строки в порядке COLUMNS (например, из SELECT id, order_id, ... FROM order_items)
+        """
+        for (name, _), value in zip(self.COLUMNS, row):
+            self._data[name].append(value or 0)
+
+    def extend_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self.append_row(row)
+
+    def append(self, item: OrderItem, order_id: Optional[int] = None) -> None:
+        self.append_row((item.id, item.order_id or order_id, item.product_id, item.quantity, item.price, item.subtotal))
+
+    def __getitem__(self, i: int) -> OrderItem:
+        d = self._data
+        return OrderItem(id=d["id"][i] or None, order_id=d["order_id"][i] or None, product_id=d["product_id"][i],
+                         quantity=d["quantity"][i], price=d["price"][i], subtotal=d["subtotal"][i])
+
+    def __iter__(self) -> Iterator[OrderItem]:
+        return (self[i] for i in range(len(self)))
+
+    def column(self, name: str):
+        """
+        Столбец как массив numpy (копия)
+        """
+        return _np_column(self._data[name])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in self._data.values())
+
+    def to_frame(self):
+        """
+        DataFrame со столбцами COLUMNS
+        """
+        import pandas as pd
+        return pd.DataFrame({name: self.column(name) for name, _ in self.COLUMNS})
+
+    @classmethod
+    def from_frame(cls, df) -> "OrderItemBatch":
+        """
+        Контейнер из DataFrame со столбцами COLUMNS (id и order_id можно не указывать)
+        """
+        import numpy as np
+        batch = cls()
+        for name, code in cls.COLUMNS:
+            values = df[name].fillna(0).to_numpy() if name in df else np.zeros(len(df))
+            batch._data[name] = _np_to_array(values, code)
+        return batch
+
+
+def _parse_iso(value: Any) -> Optional[datetime]:
+    # дата ISO 8601 ("2024-01-10" или "2024-01-10T12:30:00"); со смещением — в UTC; не дата — None (NaT).
+    # Разбор явный: format="ISO8601" в pd.to_datetime есть только в pandas 2
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+#YES
+class OrderBatch:
+    """
+    Заказы в колоночном виде: id, customer_id, total — в array, date и status — словарным кодированием,
+    позиции — в OrderItemBatch (атрибут items). 32 байта на заказ против нескольких сотен у объекта Order
+    или словаря строки db.get_orders; преобразуется в DataFrame без построчных объектов Python.
+    id = 0 означает отсутствие id (заказ ещё не сохранён)
+    """
+    COLUMNS = ("id", "customer_id", "date", "status", "total")
+    __slots__ = ("_id", "_customer_id", "_date", "_status", "_total", "dates", "statuses", "items")
+
+    def __init__(self):
+        self._id = array("q")
+        self._customer_id = array("q")
+        self._date = array("i")
+        self._status = array("i")
+        self._total = array("d")
+        self.dates = _Dictionary()
+        self.statuses = _Dictionary()
+        self.items = OrderItemBatch()
+
+    def __len__(self) -> int:
+        return len(self._id)
+
+    def append_row(self, row: Sequence[Any]) -> None:
+        """
+        Добавление строки (id, customer_id, date, status, total), например, из SELECT по таблице orders
+        """
+        oid, customer_id, date, status, total = row[:5]
+        self._id.append(oid or 0)
+        self._customer_id.append(customer_id)
+        self._date.append(self.dates.code(date))
+        self._status.append(self.statuses.code(status))
+        self._total.append(total)
+
+    def extend_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self.append_row(row)
+
+    def append(self, order: Order) -> None:
+        self.append_row((order.id, order.customer_id, order.date, order.status, order.total))
+        for it in order.items:
+            self.items.append(it, order.id)
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.append(order)
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order]) -> "OrderBatch":
+        batch = cls()
+        batch.extend(orders)
+        return batch
+
+    def __getitem__(self, i: int) -> Order:
+        """
+        Заказ без позиций (позиции всех заказов — to_orders())
+        """
+        return Order(id=self._id[i] or None, customer_id=self._customer_id[i], date=self.dates.value(self._date[i]),
+                     status=self.statuses.value(self._status[i]), total=self._total[i])
+
+    def __iter__(self) -> Iterator[Order]:
+        return (self[i] for i in range(len(self)))
+
+    def to_orders(self) -> List[Order]:
+        """
+        Объекты Order с позициями из items (по order_id)
+        """
+        orders = list(self)
+        by_id = {o.id: o for o in orders if o.id is not None}
+        for it in self.items:
+            order = by_id.get(it.order_id)
+            if order is not None:
+                order.items.append(it)
+        return orders
+
+    def column(self, name: str):
+        """
+        Столбец как массив numpy (копия); date и status — массивы строк (object)
+        """
+        import numpy as np
+        if name in ("date", "status"):
+            dictionary = self.dates if name == "date" else self.statuses
+            return np.array(dictionary.values + [None], dtype=object)[_np_column(getattr(self, "_" + name))]
+        return _np_column(getattr(self, "_" + name))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Размер данных заказов (без позиций и словарей уникальных значений)
+        """
+        return sum(a.itemsize * len(a) for a in (self._id, self._customer_id, self._date, self._status, self._total))
+
+    def to_frame(self, parse_dates: bool = True):
+        """
+        DataFrame со столбцами COLUMNS: status — category, date — datetime64 (parse_dates) или category.
+        Даты разбираются один раз на уникальное значение
+        """
+        import numpy as np
+        import pandas as pd
+        codes = _np_column(self._date)
+        if parse_dates:
+            # последний элемент — NaT для кода -1
+            unique = [_parse_iso(value) for value in self.dates.values] + [None]
+            date = np.array(unique, dtype="datetime64[ns]")[codes]
+        else:
+            date = pd.Categorical.from_codes(codes, categories=pd.Index(self.dates.values, dtype=object))
+        return pd.DataFrame({
+            "id": _np_column(self._id),
+            "customer_id": _np_column(self._customer_id),
+            "date": date,
+            "status": pd.Categorical.from_codes(_np_column(self._status),
+                                                categories=pd.Index(self.statuses.values, dtype=object)),
+            "total": _np_column(self._total),
+        })
+
+    @classmethod
+    def from_frame(cls, df, items=None) -> "OrderBatch":
+        """
+        Контейнер из DataFrame со столбцами COLUMNS (например, результат to_frame или pd.read_sql);
+        date может быть строкой или datetime64 (тогда хранится в виде YYYY-MM-DD)
+        Args:
+            df: заказы
+            items: DataFrame позиций для OrderItemBatch.from_frame
+        """
+        import numpy as np
+        import pandas as pd
+        batch = cls()
+        batch._id = _np_to_array(df["id"].fillna(0).to_numpy() if "id" in df else np.zeros(len(df)), "q")
+        batch._customer_id = _np_to_array(df["customer_id"].to_numpy(), "q")
+        batch._total = _np_to_array(df["total"].to_numpy(), "d")
+        dates = df["date"]
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            dates = dates.dt.strftime("%Y-%m-%d")
+        batch._date = _encode_strings(batch.dates, dates)
+        batch._status = _encode_strings(batch.statuses, df["status"])
+        if items is not None:
+            batch.items = OrderItemBatch.from_frame(items)
+        return batch
@@ -0,0 +1,209 @@
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import db
+
+#аналитика продаж по позициям заказов: товары (выручка, количество, ABC), клиенты (RFM, повторные покупки), корзина.
+# Агрегаты считаются в SQL (GROUP BY по покрывающим индексам), pandas получает уже сгруппированные строки —
+# по одной на товар или клиента, поэтому время почти не зависит от Python и растёт только с размером таблиц в SQLite
+
+EXCLUDED_STATUSES: Tuple[str, ...] = ("cancelled",)  # заказы этих статусов не считаются продажами
+
+ABC_THRESHOLDS = (0.8, 0.95)  # накопленная доля выручки: A — до 80%, B — до 95%, C — остальное
+
+# сегменты RFM по баллам r (давность) и f (частота) от 1 до 5: условие над столбцами баллов,
+# проверяются по порядку, клиенту достаётся первый подходящий, не подошедшие ни к одному — RFM_DEFAULT_SEGMENT
+RFM_SEGMENTS: Sequence[Tuple[str, Callable[[pd.Series, pd.Series], pd.Series]]] = (
+    ("Чемпионы", lambda r, f: (r >= 4) & (f >= 4)),
+    ("Лояльные", lambda r, f: (r >= 3) & (f >= 4)),
+    ("Новые", lambda r, f: (r >= 4) & (f <= 1)),
+    ("Перспективные", lambda r, f: (r >= 3) & (f >= 2)),
+    ("Под угрозой", lambda r, f: (r <= 2) & (f >= 3)),
+    ("Потерянные", lambda r, f: r <= 1),
+)
+RFM_DEFAULT_SEGMENT = "Спящие"
+
+# продажи по товарам = все позиции минус позиции исключённых заказов: первый запрос читает только покрывающий
+# индекс idx_order_items_product_sales (уже упорядочен по product_id — GROUP BY без сортировки), второй —
+# только исключённые заказы по idx_orders_status_date и их позиции по idx_order_items_order_sales (миграция 7).
+# Соединение каждой позиции с заказом ради статуса было бы в несколько раз медленнее
+PRODUCT_SALES_SQL = """
+    SELECT product_id, COUNT(*) AS lines, SUM(quantity) AS quantity, SUM(subtotal) AS revenue
+    FROM order_items
+    GROUP BY product_id
+"""
+
+EXCLUDED_SALES_SQL = """
+    SELECT oi.product_id, COUNT(*) AS lines, SUM(oi.quantity) AS quantity, SUM(oi.subtotal) AS revenue
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id
+    WHERE o.status IN ({excluded})
+    GROUP BY oi.product_id
+"""
+
+CUSTOMER_ORDERS_SQL = """
+    SELECT customer_id, COUNT(*) AS frequency, SUM(total) AS monetary, MAX(date) AS last_order
+    FROM orders
+    WHERE status NOT IN ({excluded})
+    GROUP BY customer_id
+"""
+
+
+#YES
+@contextmanager
+def snapshot(db_path: str) -> Iterator[sqlite3.Connection]:
+    """
+    Чтение из одного снимка базы: запись между запросами не меняет итоги (иначе, например, доли выручки
+    в сумме не дали бы 100%). Функции модуля читают внутри snapshot; вызванные внутри внешнего snapshot
+    того же потока, они видят его снимок — так согласованы product_sales и customer_orders одной сводки.
+    Транзакцию завершает db.connect
+    """
+    with db.connect(db_path) as con:
+        if not con.in_transaction:
+            con.execute("BEGIN")
+        yield con
+
+
+def _read(con: sqlite3.Connection, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+    cur = con.execute(sql, tuple(params))
+    columns = [d[0] for d in cur.description]
+    return pd.DataFrame(cur.fetchall(), columns=columns)
+
+
+def _excluded(statuses: Sequence[str]) -> Tuple[str, Tuple[str, ...]]:
+    statuses = tuple(statuses) or ("",)  # IN () — синтаксическая ошибка
+    return ",".join(["?"] * len(statuses)), statuses
+
+
+#YES
+def product_sales(db_path: str, exclude_statuses: Sequence[str] = EXCLUDED_STATUSES) -> pd.DataFrame:
+    """
+    Продажи по товарам: агрегаты всех позиций за вычетом позиций заказов с исключёнными статусами
+    Args:
+        db_path: путь к базе данных
+        exclude_statuses: статусы заказов, которые не считаются продажами
+    Returns:
+        DataFrame product_id, name, sku, lines, quantity, revenue по убыванию выручки (товары без продаж не входят)
+    """
+    columns = ["lines", "quantity", "revenue"]
+    with snapshot(db_path) as con:
+        sales = _read(con, PRODUCT_SALES_SQL).set_index("product_id")
+        excluded = None
+        if exclude_statuses:
+            placeholders, params = _excluded(exclude_statuses)
+            excluded = _read(con, EXCLUDED_SALES_SQL.format(excluded=placeholders), params).set_index("product_id")
+        products = _read(con, "SELECT id AS product_id, name, sku FROM products")
+    if excluded is not None:
+        sales = sales.sub(excluded.reindex(sales.index, fill_value=0), fill_value=0)
+        # разность сумм с плавающей точкой — до копеек, как цены
+        sales["revenue"] = sales["revenue"].round(2)
+        sales = sales[sales["lines"] > 0]
+    sales = sales.astype({"lines": "int64", "quantity": "int64"})[columns].reset_index()
+    sales = products.merge(sales, on="product_id", how="right")
+    return sales.sort_values(["revenue", "product_id"], ascending=[False, True], ignore_index=True)
+
+
+#YES
+def top_products(sales: pd.DataFrame, n: int = 10, by: str = "revenue") -> pd.DataFrame:
+    """
+    ТОП-n товаров из product_sales по выручке ("revenue") или количеству ("quantity")
+    """
+    if by not in ("revenue", "quantity"):
+        raise ValueError(f"Неизвестный показатель: {by}")
+    return sales.nlargest(n, [by, "revenue"]).reset_index(drop=True)
+
+
+#YES
+def abc_classes(sales: pd.DataFrame, thresholds: Tuple[float, float] = ABC_THRESHOLDS) -> pd.DataFrame:
+    """
+    ABC-классификация (Парето) товаров по выручке: доля выручки, накопленная доля и класс A/B/C.
+    Класс определяется по накопленной доле до товара, поэтому товар, пересекающий границу, остаётся в старшем классе
+    Args:
+        sales: результат product_sales
+        thresholds: границы накопленной доли для классов A и B
+    Returns:
+        копия sales по убыванию выручки со столбцами share, cum_share, abc
+    """
+    df = sales.sort_values("revenue", ascending=False, ignore_index=True)
+    total = df["revenue"].sum()
+    df["share"] = df["revenue"] / total if total else 0.0
+    df["cum_share"] = df["share"].cumsum()
+    before = df["cum_share"] - df["share"]
+    df["abc"] = np.select([before < thresholds[0], before < thresholds[1]], ["A", "B"], "C")
+    return df
+
+
+def _scores(values: pd.Series, bins: int, reverse: bool = False) -> pd.Series:
+    # баллы 1..bins по процентилю: одинаковые значения получают одинаковый (младший) балл,
+    # например при одном заказе у всех клиентов частота у всех — 1
+    pct = values.rank(method="min", pct=True, ascending=not reverse)
+    return np.ceil(pct * bins).clip(1, bins).fillna(1).astype("int64")
+
+
+#YES
+def customer_orders(db_path: str, exclude_statuses: Sequence[str] = EXCLUDED_STATUSES) -> pd.DataFrame:
+    """
+    Заказы по клиентам: число, сумма и дата последнего (только клиенты, у которых есть заказы)
+    Returns:
+        DataFrame customer_id, name, frequency, monetary, last_order
+    """
+    placeholders, params = _excluded(exclude_statuses)
+    with snapshot(db_path) as con:
+        orders = _read(con, CUSTOMER_ORDERS_SQL.format(excluded=placeholders), params)
+        names = _read(con, "SELECT id AS customer_id, name FROM customers")
+    return names.merge(orders, on="customer_id", how="right")
+
+
+#YES
+def rfm_segments(orders: pd.DataFrame, as_of: Optional[str] = None, bins: int = 5) -> pd.DataFrame:
+    """
+    RFM-сегментация клиентов: давность последнего заказа (дней до as_of), частота и сумма заказов
+    переводятся в баллы 1..bins по процентилям, сегмент — по RFM_SEGMENTS
+    Args:
+        orders: результат customer_orders
+        as_of: дата отсчёта давности, по умолчанию — дата последнего заказа в данных
+        bins: число баллов
+    Returns:
+        копия orders со столбцами recency_days, r, f, m, rfm ("545"), segment
+    """
+    df = orders.copy()
+    last = pd.to_datetime(df["last_order"].str.slice(0, 10), errors="coerce")
+    ref = pd.Timestamp(as_of) if as_of else last.max()
+    df["recency_days"] = (ref - last).dt.days
+    df["r"] = _scores(df["recency_days"], bins, reverse=True)
+    df["f"] = _scores(df["frequency"], bins)
+    df["m"] = _scores(df["monetary"], bins)
+    df["rfm"] = df["r"].astype(str) + df["f"].astype(str) + df["m"].astype(str)
+    conditions = [rule(df["r"], df["f"]).to_numpy(dtype=bool) for _, rule in RFM_SEGMENTS]
+    df["segment"] = np.select(conditions, [name for name, _ in RFM_SEGMENTS], RFM_DEFAULT_SEGMENT)
+    return df
+
+
+#YES
+def sales_summary(sales: pd.DataFrame, orders: pd.DataFrame) -> Dict[str, float]:
+    """
+    Средняя корзина и повторные покупки по уже посчитанным агрегатам (без повторного прохода по таблицам)
+    Args:
+        sales: результат product_sales
+        orders: результат customer_orders
+    Returns:
+        orders — число заказов, revenue — выручка, avg_order_value — средний чек,
+        avg_lines / avg_quantity — позиций и единиц товара в заказе,
+        customers — покупателей, repeat_rate — доля покупателей с двумя и более заказами
+    """
+    n_orders = int(orders["frequency"].sum())
+    customers = len(orders)
+    revenue = float(orders["monetary"].sum())
+    return {
+        "orders": n_orders,
+        "revenue": revenue,
+        "avg_order_value": revenue / n_orders if n_orders else 0.0,
+        "avg_lines": float(sales["lines"].sum()) / n_orders if n_orders else 0.0,
+        "avg_quantity": float(sales["quantity"].sum()) / n_orders if n_orders else 0.0,
+        "customers": customers,
+        "repeat_rate": float((orders["frequency"] >= 2).sum()) / customers if customers else 0.0,
+    }
@@ -0,0 +1,258 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import db
+from sorting import ORDER_KEYS, SortIndex
+
+#поиск для вкладок GUI: отложенный запуск при вводе и кэш результатов с уточнением в памяти
+
+Rows = List[Dict[str, Any]]
+PageFetch = Callable[[int, Optional[str]], Tuple[Rows, Optional[str]]]
+
+MEM_CURSOR = "mem:"  # курсоры по результату из кэша (курсоры базы — base64 без двоеточия)
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """
+    Источник поиска:
+    - tables — таблицы, от версий которых зависит результат;
+    - fts_table — таблица FTS-индекса, которым пользуется запрос в db;
+    - columns — поля строк результата, по которым идёт поиск (для уточнения в памяти);
+    - fetch_page(db_path, term, filters, limit, cursor) — страница результата из базы;
+    - sort_keys, sort_at — ключи sorting для сортировки filters[sort_at] в формате sorting.SortSpec:
+      результат того же поиска с другой сортировкой переупорядочивается в памяти (SortIndex), как это сделал бы ORDER BY
+    """
+    tables: Tuple[str, ...]
+    fts_table: str
+    columns: Tuple[str, ...]
+    fetch_page: Callable[[str, str, tuple, int, Optional[str]], Tuple[Rows, Optional[str]]]
+    sort_keys: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None
+    sort_at: int = 0
+
+
+# filters клиентов и товаров: (сортировка,) или (); заказов: (date_from, date_to, status[, сортировка]).
+# Сортировка — в формате db.sort_spec и должна быть хешируемой (кортеж или строка), она входит в ключ кэша
+SOURCES: Dict[str, SearchSource] = {
+    "customers": SearchSource(
+        ("customers",), "customers", ("name", "email", "phone", "city"),
+        lambda p, term, filters, limit, cursor: db.get_customers_page(p, term, limit, cursor,
+                                                                      sort=filters[0] if filters else None),
+    ),
+    "products": SearchSource(
+        ("products",), "products", ("name", "sku"),
+        lambda p, term, filters, limit, cursor: db.get_products_page(p, term, limit, cursor,
+                                                                     sort=filters[0] if filters else None),
+    ),
+    "orders": SearchSource(
+        ("orders", "customers"), "customers", ("customer_name", "customer_email", "customer_city"),
+        lambda p, term, filters, limit, cursor: db.get_orders_page(
+            p, *filters[:3], customer_search=term, limit=limit, cursor=cursor,
+            sort=filters[3] if len(filters) > 3 else None,
+        ),
+        sort_keys=ORDER_KEYS, sort_at=3,
+    ),
+}
+
+
+
+
+def _ascii_lower(text: str) -> str:
+    # LIKE в SQLite не учитывает регистр только для латиницы
+    return "".join(ch.lower() if ch.isascii() else ch for ch in text)
+
+
+def search_mode(term: str, fts: bool) -> str:
+    """
+    Способ поиска в db для строки, оба ищут подстроку: "fts" — триграммный индекс (регистр не учитывается),
+    "like" — LIKE (нет FTS5 или строка короче db.FTS_MIN_TERM; регистр не учитывается только для латиницы)
+    """
+    return "fts" if fts and len(term) >= db.FTS_MIN_TERM else "like"
+
+
+def haystack(row: Dict[str, Any], columns: Tuple[str, ...], mode: str) -> str:
+    """
+    Подготовленное для проверки содержимое строки: текст полей через разделитель в регистре способа поиска.
+    Считается один раз на строку кэшированного результата
+    """
+    fold = str.lower if mode == "fts" else _ascii_lower
+    return "\0".join(fold(str(row[c])) for c in columns if row.get(c) is not None)
+
+
+def term_matcher(term: str, mode: str) -> Optional[Callable[[str], bool]]:
+    """
+    Проверка подготовленной строки (haystack), повторяющая условие поиска в db.
+    None, если повторить условие точно нельзя (символы-шаблоны LIKE) — тогда нужен запрос к базе
+    """
+    if mode == "fts":
+        needle = term.lower()
+    elif "_" in term or "%" in term:
+        return None
+    else:
+        needle = _ascii_lower(term)
+    return lambda text: needle in text
+
+
+def _sortable(order: Any, keys: Dict[str, Callable[[Dict[str, Any]], Any]]) -> bool:
+    # сортировка в формате sorting.SortSpec по известным ключам; id последним — порядок однозначен, как в ORDER BY
+    return (isinstance(order, tuple) and bool(order) and order[-1][0] == "id"
+            and all(isinstance(k, tuple) and len(k) == 2 and k[0] in keys for k in order))
+
+
+def _mem_page(rows: Rows, limit: int, cursor: Optional[str]) -> Tuple[Rows, Optional[str]]:
+    start = int(cursor[len(MEM_CURSOR):]) if cursor else 0
+    end = start + limit
+    return rows[start:end], (f"{MEM_CURSOR}{end}" if end < len(rows) else None)
+
+
+@dataclass
+class _Entry:
+    versions: Tuple[int, ...]
+    rows: Optional[Rows]  # None — результат больше max_rows, не кэшируется
+    mode: str = "like"
+    hay: Optional[List[str]] = None  # haystack строк rows, заполняется при первом уточнении
+    index: Optional[SortIndex] = None  # ключи и перестановки строк для других сортировок, при первой пересортировке
+
+
+#YES
+class SearchCache:
+    """
+    LRU-кэш результатов поиска для постраничных таблиц GUI.
+    Ключ — (источник, фильтры, строка поиска); запись действительна, пока не изменились версии таблиц источника
+    (db.data_version увеличивают функции записи db: add_customer, add_product, add_order, импорт).
+    Если новая строка поиска продолжает уже найденную, результат получается фильтрацией в памяти,
+    а тот же поиск с другой сортировкой (SearchSource.sort_keys) — перестановкой уже найденных строк.
+    Результаты больше max_rows строк не кэшируются и читаются из базы постранично.
+    Методы вызываются из фоновых потоков, доступ к кэшу защищён блокировкой
+    """
+    def __init__(self, db_path: str, max_entries: int = 64, max_rows: int = 5000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple[str, tuple, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.narrowed = self.resorted = self.misses = 0
+
+    def pager(self, source: str, term: Optional[str], filters: tuple = ()) -> PageFetch:
+        """
+        Функция страниц fetch(limit, cursor) для VirtualTreeview
+        """
+        spec = SOURCES[source]
+        term = (term or "").strip()
+        if not term:
+            return lambda limit, cursor: spec.fetch_page(self.db_path, "", filters, limit, cursor)
+        return lambda limit, cursor: self.page(source, term, filters, limit, cursor)
+
+    def page(self, source: str, term: str, filters: tuple, limit: int,
+             cursor: Optional[str]) -> Tuple[Rows, Optional[str]]:
+        spec = SOURCES[source]
+        if cursor and not cursor.startswith(MEM_CURSOR):
+            return spec.fetch_page(self.db_path, term, filters, limit, cursor)
+        rows = self.lookup(source, term, filters)
+        if rows is None:
+            # результат слишком велик для кэша — страницы из базы
+            if cursor:
+                raise ValueError("Результат поиска изменился, обновите таблицу")
+            return spec.fetch_page(self.db_path, term, filters, limit, None)
+        return _mem_page(rows, limit, cursor)
+
+    def lookup(self, source: str, term: str, filters: tuple = ()) -> Optional[Rows]:
+        """
+        Полный результат поиска: из кэша, уточнением кэшированного результата или запросом к базе.
+        None — результат больше max_rows строк
+        """
+        spec = SOURCES[source]
+        versions = tuple(db.data_version(self.db_path, t) for t in spec.tables)
+        mode = search_mode(term, db.has_fts(self.db_path, spec.fts_table))
+        key = (source, filters, term)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.versions == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.rows
+            same = self._other_sort(source, filters, term, versions)
+            base = self._narrowest(source, filters, term, versions, mode) if same is None else None
+        rows, hay, index = None, None, None
+        if same is not None:
+            # значения ключей считаются один раз на набор строк, перестановка — один раз на сортировку;
+            # индекс общий для всех сортировок этого набора
+            if same.index is None:
+                same.index = SortIndex(same.rows, spec.sort_keys)
+            index = same.index
+            rows = index.sorted(filters[spec.sort_at])
+            self.resorted += 1
+        match = term_matcher(term, mode) if base is not None else None
+        if match is not None:
+            if base.hay is None:
+                base.hay = [haystack(row, spec.columns, mode) for row in base.rows]
+            picked = [i for i, h in enumerate(base.hay) if match(h)]
+            rows = [base.rows[i] for i in picked]
+            hay = [base.hay[i] for i in picked]
+            self.narrowed += 1
+        if rows is None:
+            self.misses += 1
+            rows, cursor = spec.fetch_page(self.db_path, term, filters, self.max_rows + 1, None)
+            if len(rows) > self.max_rows:
+                rows = None
+        with self._lock:
+            self._entries[key] = _Entry(versions, rows, mode, hay, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rows
+
+    def _other_sort(self, source: str, filters: tuple, term: str, versions: Tuple[int, ...]) -> Optional[_Entry]:
+        # полный результат того же поиска с теми же фильтрами, кроме сортировки, если её можно повторить в памяти
+        spec = SOURCES[source]
+        at = spec.sort_at
+        if spec.sort_keys is None or len(filters) <= at or not _sortable(filters[at], spec.sort_keys):
+            return None
+        for (src, flt, cached_term), entry in self._entries.items():
+            if (src == source and cached_term == term and entry.rows is not None and entry.versions == versions
+                    and len(flt) == len(filters) and flt[:at] == filters[:at] and flt[at + 1:] == filters[at + 1:]):
+                return entry
+        return None
+
+    def _narrowest(self, source: str, filters: tuple, term: str, versions: Tuple[int, ...],
+                   mode: str) -> Optional[_Entry]:
+        # самая длинная кэшированная подстрока строки поиска с полным результатом (строки с term — её подмножество);
+        # уточнять можно только в пределах одного способа поиска (FTS или LIKE)
+        best, best_len = None, 0
+        for (src, flt, cached_term), entry in self._entries.items():
+            if (src == source and flt == filters and entry.rows is not None and entry.versions == versions
+                    and entry.mode == mode and len(cached_term) > best_len and cached_term in term):
+                best, best_len = entry, len(cached_term)
+        return best
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+#YES
+class Debouncer:
+    """
+    Отложенный вызов callback через delay_ms после последнего schedule() — поиск запускается,
+    когда пользователь перестал печатать
+    """
+    def __init__(self, widget, callback: Callable[[], None], delay_ms: int = 300):
+        self.widget = widget
+        self.callback = callback
+        self.delay_ms = delay_ms
+        self._after_id = None
+
+    def schedule(self, *_) -> None:
+        self.cancel()
+        self._after_id = self.widget.after(self.delay_ms, self._fire)
+
+    def cancel(self) -> None:
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _fire(self) -> None:
+        self._after_id = None
+        self.callback()
@@ -0,0 +1,113 @@
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+#сортировка записей в памяти: устойчивая, по нескольким ключам, с кэшем перестановок
+
+SortSpec = Tuple[Tuple[str, bool], ...]  # ((ключ, по убыванию), ...) — от главного ключа к второстепенным
+
+# ключи заказов для строк из db.get_orders / get_orders_page
+ORDER_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "date": itemgetter("date"),
+    "total": itemgetter("total"),
+    "status": itemgetter("status"),
+    "customer": itemgetter("customer_name"),
+    "id": itemgetter("id"),
+}
+
+# те же ключи для объектов Order (customer — по customer_id, имени в объекте нет)
+ORDER_ATTR_KEYS: Dict[str, Callable[[Any], Any]] = {
+    "date": attrgetter("date"),
+    "total": attrgetter("total"),
+    "status": attrgetter("status"),
+    "customer": attrgetter("customer_id"),
+    "id": attrgetter("id"),
+}
+
+# варианты сортировки вкладки заказов; id в конце — однозначный порядок при равных значениях
+ORDER_SORTS: Dict[str, SortSpec] = {
+    "date_desc": (("date", True), ("id", True)),
+    "date_asc": (("date", False), ("id", False)),
+    "total_desc": (("total", True), ("date", True), ("id", True)),
+    "total_asc": (("total", False), ("date", True), ("id", True)),
+    "status_asc": (("status", False), ("date", True), ("id", True)),
+    "customer_asc": (("customer", False), ("date", True), ("id", True)),
+}
+
+
+def _null_safe(value: Any) -> Tuple[bool, Any]:
+    # None встаёт перед любыми значениями (как NULL в ORDER BY ... ASC в SQLite) и не ломает сравнение
+    return (value is not None, value)
+
+
+def sort_permutation(columns: Sequence[List[Any]], descending: Sequence[bool], size: int) -> List[int]:
+    """
+    Порядок индексов записей по нескольким столбцам ключей
+    Args:
+        columns: значения каждого ключа для всех записей (уже вычисленные)
+        descending: направление для каждого ключа
+        size: число записей
+    Returns:
+        перестановка индексов; при равенстве всех ключей сохраняется исходный порядок
+    """
+    perm = list(range(size))
+    # устойчивая сортировка от второстепенного ключа к главному даёт лексикографический порядок
+    # с разными направлениями без составных ключей и обращения списков
+    for col, desc in reversed(list(zip(columns, descending))):
+        perm.sort(key=col.__getitem__, reverse=desc)
+    return perm
+
+
+#YES
+def sort_records(records: Sequence[Any], key: Callable[[Any], Any] = None, reverse: bool = False,
+                 spec: Optional[SortSpec] = None, keys: Optional[Dict[str, Callable[[Any], Any]]] = None) -> List[Any]:
+    """
+    Устойчивая сортировка за O(n log n): ключ вычисляется один раз на запись
+    Args:
+        records: записи (словари или объекты)
+        key: функция ключа для сортировки по одному ключу
+        reverse: по убыванию (для key)
+        spec: сортировка по нескольким ключам ((имя ключа, по убыванию), ...), имена из keys
+        keys: функции ключей для spec
+    Returns:
+        новый отсортированный список
+    """
+    if spec is None:
+        return sorted(records, key=lambda r: _null_safe(key(r)), reverse=reverse)
+    index = SortIndex(records, keys or {})
+    return index.sorted(spec)
+
+
+#YES
+class SortIndex:
+    """
+    Сортировки одного набора записей по разным ключам:
+    значения каждого ключа вычисляются один раз (decorate-once) и переиспользуются всеми сортировками,
+    готовые перестановки кэшируются по спецификации. Для нового набора записей создаётся новый SortIndex
+    """
+    def __init__(self, records: Sequence[Any], keys: Dict[str, Callable[[Any], Any]]):
+        self.records = list(records)
+        self.keys = keys
+        self._columns: Dict[str, List[Any]] = {}
+        self._perms: Dict[SortSpec, List[int]] = {}
+
+    def column(self, name: str) -> List[Any]:
+        if name not in self._columns:
+            if name not in self.keys:
+                raise ValueError(f"Неизвестный ключ сортировки: {name}")
+            getter = self.keys[name]
+            self._columns[name] = [_null_safe(getter(r)) for r in self.records]
+        return self._columns[name]
+
+    def permutation(self, spec: SortSpec) -> List[int]:
+        """
+        Перестановка индексов записей для spec (из кэша, если уже считалась)
+        """
+        spec = tuple((name, bool(desc)) for name, desc in spec)
+        if spec not in self._perms:
+            self._perms[spec] = sort_permutation([self.column(name) for name, _ in spec],
+                                                 [desc for _, desc in spec], len(self.records))
+        return self._perms[spec]
+
+    def sorted(self, spec: SortSpec) -> List[Any]:
+        records = self.records
+        return [records[i] for i in self.permutation(spec)]
@@ -0,0 +1,203 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+#фоновое выполнение запросов к базе и аналитики для GUI
+
+
+class TaskCancelled(Exception):
+    """
+    Задача отменена пользователем (бросается из Task.report при отмене)
+    """
+
+
+class Task:
+    """
+    Описание выполняемой задачи, передаётся в функцию при pass_task=True:
+    - `report(done, total, text)` сообщает прогресс и прерывает задачу исключением TaskCancelled после отмены;
+    - `cancelled` позволяет проверить отмену в длинных циклах.
+    """
+    def __init__(self, executor: "TaskExecutor", key: str, generation: int):
+        self.key = key
+        self.generation = generation
+        self._executor = executor
+        self._cancel = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def report(self, done: int, total: int = 0, text: str = "") -> None:
+        """
+        Прогресс задачи: done из total (total=0 — неизвестно сколько), text — подпись для строки состояния
+        """
+        if self.cancelled:
+            raise TaskCancelled()
+        self._executor._events.put(("progress", self.key, self.generation, (done, total, text)))
+
+
+#YES
+class TaskExecutor:
+    """
+    Исполнитель фоновых задач GUI: пул потоков для запросов к базе и файлового ввода-вывода,
+    необязательный пул процессов для тяжёлой аналитики. Результаты передаются в поток Tk через очередь,
+    которую опрашивает root.after().
+    Задачи группируются по ключу (например, "orders" или "chart"):
+    - повторный запуск с тем же ключом, пока задача выполняется, не создаёт вторую задачу —
+      запоминается только последний запуск и выполняется после текущего (объединение кликов);
+    - результат доставляется, только если это самый новый запуск по ключу, устаревшие результаты отбрасываются.
+    """
+    def __init__(self, root, io_workers: int = 4, cpu_workers: int = 0, poll_ms: int = 50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="gui-io")
+        self._cpu_workers = cpu_workers
+        self._cpu: Optional[ProcessPoolExecutor] = None
+        self._events: "queue.Queue[Tuple[str, str, int, Any]]" = queue.Queue()
+        self._generations: Dict[str, int] = {}
+        self._running: Dict[str, Task] = {}
+        self._pending: Dict[str, Tuple[int, tuple]] = {}
+        self._callbacks: Dict[Tuple[str, int], tuple] = {}
+        self._closed = False
+        # вызывается в потоке Tk при изменении состояния: (число активных задач, последний прогресс или None)
+        self.on_state: Optional[Callable[[int, Optional[Tuple[int, int, str]]], None]] = None
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, key: str, fn: Callable, *args, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_progress: Optional[Callable[[int, int, str], None]] = None,
+               process: bool = False, pass_task: bool = False, **kwargs) -> int:
+        """
+        Запуск fn(*args, **kwargs) в фоне
+        Args:
+            key: ключ задачи, см. описание класса
+            on_done: вызывается в потоке Tk с результатом
+            on_error: вызывается в потоке Tk с исключением (кроме отмены)
+            on_progress: вызывается в потоке Tk с (done, total, text) из Task.report
+            process: выполнить в пуле процессов (если он включён); fn и аргументы должны сериализоваться pickle
+            pass_task: передать в fn именованный аргумент task (только для пула потоков)
+        Returns:
+            номер запуска по ключу
+        """
+        if self._closed:
+            raise RuntimeError("Исполнитель остановлен")
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._callbacks[(key, generation)] = (on_done, on_error, on_progress)
+        spec = (fn, args, kwargs, process, pass_task)
+        if key in self._running:
+            # объединение повторных кликов: текущая задача досчитает, её результат устарел
+            old = self._pending.pop(key, None)
+            if old:
+                self._callbacks.pop((key, old[0]), None)
+            self._pending[key] = (generation, spec)
+        else:
+            self._start(key, generation, spec)
+        self._notify()
+        return generation
+
+    def _start(self, key: str, generation: int, spec: tuple) -> None:
+        fn, args, kwargs, process, pass_task = spec
+        task = Task(self, key, generation)
+        if process and self._cpu_workers:
+            if self._cpu is None:
+                self._cpu = ProcessPoolExecutor(max_workers=self._cpu_workers)
+            future = self._cpu.submit(fn, *args, **kwargs)
+        else:
+            if pass_task:
+                kwargs = dict(kwargs, task=task)
+            future = self._io.submit(fn, *args, **kwargs)
+        task.future = future
+        self._running[key] = task
+        future.add_done_callback(lambda f: self._events.put(("done", key, generation, f)))
+
+    def cancel(self, key: Optional[str] = None) -> None:
+        """
+        Отмена задачи по ключу (None — всех задач): результат не будет доставлен, отложенный запуск отбрасывается
+        """
+        keys = [key] if key is not None else list(set(self._running) | set(self._pending))
+        for k in keys:
+            self._generations[k] = self._generations.get(k, 0) + 1
+            pending = self._pending.pop(k, None)
+            if pending:
+                self._callbacks.pop((k, pending[0]), None)
+            task = self._running.get(k)
+            if task:
+                task.cancel()
+        self._notify()
+
+    def busy(self, key: Optional[str] = None) -> bool:
+        if key is None:
+            return bool(self._running or self._pending)
+        return key in self._running or key in self._pending
+
+    def shutdown(self) -> None:
+        """
+        Остановка при закрытии окна: задачи отменяются, пулы освобождаются без ожидания
+        """
+        self._closed = True
+        self.cancel()
+        try:
+            self.root.after_cancel(self._after_id)
+        except Exception:
+            pass
+        self._io.shutdown(wait=False, cancel_futures=True)
+        if self._cpu is not None:
+            self._cpu.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self) -> None:
+        last_progress = None
+        handled = False
+        try:
+            while True:
+                kind, key, generation, payload = self._events.get_nowait()
+                handled = True
+                current = generation == self._generations.get(key)
+                if kind == "progress":
+                    if current:
+                        last_progress = payload
+                        on_progress = self._callbacks.get((key, generation), (None, None, None))[2]
+                        if on_progress:
+                            self._dispatch(on_progress, *payload)
+                    continue
+                # задача завершена
+                if self._running.get(key) is not None and self._running[key].generation == generation:
+                    del self._running[key]
+                on_done, on_error, _ = self._callbacks.pop((key, generation), (None, None, None))
+                if current and not payload.cancelled():
+                    error = payload.exception()
+                    if error is None:
+                        if on_done:
+                            self._dispatch(on_done, payload.result())
+                    elif not isinstance(error, TaskCancelled) and on_error:
+                        self._dispatch(on_error, error)
+                pending = self._pending.pop(key, None)
+                if pending and not self._closed:
+                    self._start(key, *pending)
+        except queue.Empty:
+            pass
+        finally:
+            if not self._closed:
+                if handled:
+                    self._notify(last_progress)
+                self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _dispatch(self, callback: Callable, *args) -> None:
+        # ошибка обработчика не должна прерывать опрос: иначе отложенный запуск по ключу не стартует,
+        # а остальные события ждут следующего тика. Сообщение — как у любого обработчика Tk
+        try:
+            callback(*args)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+
+    def _notify(self, progress: Optional[Tuple[int, int, str]] = None) -> None:
+        if self.on_state:
+            self.on_state(len(self._running) + len(self._pending), progress)
@@ -0,0 +1,264 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+#проверка данных моделей: одиночных записей (validate моделей) и пакетов строк при импорте
+
+# шаблоны компилируются один раз при импорте модуля
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+PHONE_RE = re.compile(r"^\+?\d[\d\s\-()]{7,}$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Правило для одного поля:
+    - "required" — значение обязательно (не None и не пустая строка);
+    - "pattern" — непустое значение соответствует регулярному выражению arg;
+    - "number" — значение обязательно и это число;
+    - "min" / "gt" — число не меньше / больше arg (нечисловые значения проверяет правило "number")
+    """
+    field: str
+    kind: str
+    message: str
+    arg: Any = None
+
+
+RULES: Dict[str, Sequence[Rule]] = {
+    "customers": (
+        Rule("name", "required", "Имя клиента обязательно"),
+        Rule("email", "pattern", "Некорректный email", EMAIL_RE),
+        Rule("phone", "pattern", "Некорректный номер телефона", PHONE_RE),
+    ),
+    "products": (
+        Rule("name", "required", "Название товара обязательно"),
+        Rule("price", "number", "Цена должна быть числом"),
+        Rule("price", "min", "Цена не может быть отрицательной", 0),
+    ),
+    "orders": (
+        Rule("customer_id", "number", "customer_id обязателен"),
+        Rule("customer_id", "gt", "customer_id обязателен", 0),
+        Rule("date", "required", "Дата заказа обязательна"),
+    ),
+    "order_items": (
+        Rule("product_id", "number", "product_id обязателен"),
+        Rule("product_id", "gt", "product_id обязателен", 0),
+        Rule("quantity", "number", "Количество должно быть числом"),
+        Rule("quantity", "gt", "Количество должно быть > 0", 0),
+        Rule("price", "number", "Цена должна быть числом"),
+        Rule("price", "min", "Цена не может быть отрицательной", 0),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class RowError:
+    row: int  # номер строки в проверяемом наборе (с нуля, при импорте — от начала таблицы в файле)
+    field: str
+    message: str
+
+
+#YES
+@dataclass
+class ValidationReport:
+    """
+    Результат пакетной проверки: число проверенных строк и ошибки по строкам (все, а не только первая)
+    """
+    table: str
+    rows: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    @property
+    def invalid_rows(self) -> List[int]:
+        return sorted({e.row for e in self.errors})
+
+    def by_row(self) -> Dict[int, List[RowError]]:
+        result: Dict[int, List[RowError]] = {}
+        for e in sorted(self.errors, key=lambda e: e.row):
+            result.setdefault(e.row, []).append(e)
+        return result
+
+    def merge(self, other: "ValidationReport", offset: int = 0) -> None:
+        """
+        Добавление отчёта по следующей пачке строк: номера строк other сдвигаются на offset
+        """
+        self.rows += other.rows
+        self.errors.extend(RowError(e.row + offset, e.field, e.message) for e in other.errors)
+
+    def raise_first(self) -> None:
+        """
+        ValueError с первой ошибкой (для мест, где весь набор принимается или отклоняется целиком)
+        """
+        if self.errors:
+            first = min(self.errors, key=lambda e: e.row)
+            raise ValueError(first.message if self.rows == 1 else f"{self.table}, строка {first.row + 1}: {first.message}")
+
+    def summary(self) -> str:
+        if not self.errors:
+            return f"{self.table}: {self.rows} строк, ошибок нет"
+        counts: Dict[str, int] = {}
+        for e in self.errors:
+            counts[e.message] = counts.get(e.message, 0) + 1
+        details = ", ".join(f"{msg}: {n}" for msg, n in counts.items())
+        return f"{self.table}: {self.rows} строк, отклонено {len(self.invalid_rows)} ({details})"
+
+
+def _empty(value: Any) -> bool:
+    # NaN — пропуск в столбцах pandas
+    return value is None or value == "" or value != value
+
+
+def _number(value: Any) -> Optional[float]:
+    if _empty(value):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def _value_check(rule: Rule) -> Callable[[Any], bool]:
+    """
+    Проверка одного значения по правилу (для validate_record; столбцы проверяет _bad_rows).
+    Условия записаны в лямбдах целиком — одиночная проверка вызывается для каждой добавляемой записи
+    """
+    if rule.kind == "required":
+        return lambda v: not (v is None or v == "" or v != v)
+    if rule.kind == "pattern":
+        match = rule.arg.match
+        return lambda v: v is None or v == "" or v != v or match(str(v)) is not None
+    if rule.kind == "number":
+        return lambda v: _number(v) is not None
+    bound = rule.arg
+    if rule.kind == "min":
+        return lambda v: (n := _number(v)) is None or n >= bound
+    return lambda v: (n := _number(v)) is None or n > bound
+
+
+_CHECKS: Dict[str, List[Tuple[str, Callable[[Any], bool], str]]] = {
+    table: [(rule.field, _value_check(rule), rule.message) for rule in rules] for table, rules in RULES.items()
+}
+
+
+def _bad_rows(rule: Rule, column: Sequence[Any]) -> List[int]:
+    """
+    Номера строк столбца, не прошедших правило — один проход по списку значений
+    """
+    if rule.kind == "required":
+        return [i for i, v in enumerate(column) if _empty(v)]
+    if rule.kind == "pattern":
+        match = rule.arg.match
+        return [i for i, v in enumerate(column) if not _empty(v) and not match(str(v))]
+    numbers = map(_number, column)
+    if rule.kind == "number":
+        return [i for i, v in enumerate(numbers) if v is None]
+    bound = rule.arg
+    if rule.kind == "min":
+        return [i for i, v in enumerate(numbers) if v is not None and v < bound]
+    return [i for i, v in enumerate(numbers) if v is not None and v <= bound]
+
+
+def _string_dtype() -> Optional[str]:
+    # строки pyarrow проверяются регулярными выражениями в C, без pyarrow — обычные объекты Python
+    try:
+        import pyarrow  # noqa: F401
+        return "string[pyarrow]"
+    except ImportError:
+        return None
+
+
+def _bad_mask(rule: Rule, series):
+    """
+    То же для столбца pandas: булева маска строк с ошибкой
+    """
+    import pandas as pd
+    if rule.kind in ("required", "pattern"):
+        empty = series.isna() | (series.astype(object) == "")
+        if rule.kind == "required":
+            return empty
+        dtype = _string_dtype()
+        text = series.astype(dtype) if dtype else series.where(~empty, "").astype(str)
+        return ~empty & ~text.str.match(rule.arg.pattern).fillna(False).astype(bool)
+    numbers = pd.to_numeric(series, errors="coerce")
+    if rule.kind == "number":
+        return numbers.isna()
+    return (numbers < rule.arg if rule.kind == "min" else numbers <= rule.arg).fillna(False)
+
+
+def _columns(records: Sequence[Any], names: Sequence[str], columns: Optional[Sequence[str]]) -> Dict[str, List[Any]]:
+    """
+    Значения нужных полей по столбцам: из кортежей (с названиями столбцов columns), словарей или объектов моделей
+    """
+    result: Dict[str, List[Any]] = {}
+    for name in names:
+        if columns is not None:
+            if name in columns:
+                idx = columns.index(name)
+                result[name] = [r[idx] for r in records]
+            else:
+                result[name] = [None] * len(records)
+        elif records and isinstance(records[0], dict):
+            result[name] = [r.get(name) for r in records]
+        else:
+            result[name] = [getattr(r, name, None) for r in records]
+    return result
+
+
+#YES
+def validate_many(table: str, records: Any, columns: Optional[Sequence[str]] = None,
+                  use_pandas: Optional[bool] = None) -> ValidationReport:
+    """
+    Пакетная проверка записей по правилам RULES[table]: каждое правило проверяет весь столбец сразу,
+    проверка не останавливается на первой ошибке
+    Args:
+        table: таблица (customers, products, orders, order_items)
+        records: кортежи строк (с columns), словари, объекты моделей или pandas.DataFrame
+        columns: названия столбцов для кортежей; отсутствующие в них поля считаются пустыми
+        use_pandas: проверять строковыми операциями pandas; по умолчанию — только если records уже DataFrame
+            (без pyarrow строковые операции pandas не быстрее цикла Python, а преобразование в DataFrame стоит времени)
+    Returns:
+        ValidationReport с номерами строк от нуля
+    """
+    if table not in RULES:
+        raise ValueError(f"Неизвестная таблица: {table}")
+    rules = RULES[table]
+    is_frame = hasattr(records, "columns") and hasattr(records, "iloc")
+    report = ValidationReport(table, len(records))
+    if use_pandas is None:
+        use_pandas = is_frame
+    if use_pandas:
+        import pandas as pd
+        if is_frame:
+            frame = records
+        else:
+            frame = pd.DataFrame(_columns(records, [r.field for r in rules], columns))
+        for rule in rules:
+            series = frame[rule.field] if rule.field in frame else pd.Series([None] * len(frame), dtype=object)
+            mask = _bad_mask(rule, series).to_numpy(dtype=bool)
+            report.errors.extend(RowError(int(i), rule.field, rule.message) for i in mask.nonzero()[0])
+        return report
+    if is_frame:
+        columns = list(records.columns)
+        records = list(records.itertuples(index=False, name=None))
+    data = _columns(records, [r.field for r in rules], columns)
+    for rule in rules:
+        report.errors.extend(RowError(i, rule.field, rule.message) for i in _bad_rows(rule, data[rule.field]))
+    return report
+
+
+#YES
+def validate_record(table: str, record: Any) -> None:
+    """
+    Проверка одной записи (словаря или объекта модели) по тем же правилам
+    Raises:
+        ValueError: с сообщением первого нарушенного правила
+    """
+    is_dict = isinstance(record, dict)
+    for name, ok, message in _CHECKS[table]:
+        if not ok(record.get(name) if is_dict else getattr(record, name, None)):
+            raise ValueError(message)
@@ -0,0 +1,242 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from tasks import TaskExecutor
+
+#виртуальный список для больших таблиц: в Treeview находится только окно из нескольких страниц
+
+PageFetch = Callable[[int, Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]]
+
+
+def _fetch_pages(fetch: PageFetch, cursor: Optional[str], count: int,
+                 page_size: int) -> Tuple[List[List[Dict[str, Any]]], List[Optional[str]]]:
+    """
+    Выполняется в фоне: count страниц подряд начиная с cursor, возвращает страницы и курсоры следующих за ними
+    """
+    pages, cursors = [], []
+    for _ in range(count):
+        rows, cursor = fetch(page_size, cursor)
+        pages.append(rows)
+        cursors.append(cursor)
+        if cursor is None:
+            break
+    return pages, cursors
+
+
+#YES
+class VirtualTreeview:
+    """
+    Постраничное наполнение ttk.Treeview: строки запрашиваются страницами через функцию
+    fetch(limit, cursor) -> (строки, курсор следующей страницы) — например, db.get_orders_page.
+    В дереве держится не больше max_pages страниц: при прокрутке к краю окна подгружается соседняя страница,
+    а страница с противоположного края удаляется (её курсор запоминается, чтобы вернуться к ней).
+    Запросы выполняются через TaskExecutor под ключом key, обновление (refresh) сравнивает новые строки
+    с уже показанными и меняет только отличающиеся элементы, не очищая дерево.
+    """
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, executor: TaskExecutor, key: str,
+                 format_row: Callable[[Dict[str, Any]], tuple], id_field: str = "id",
+                 page_size: int = 200, max_pages: int = 5, margin: float = 0.15,
+                 on_error: Optional[Callable[[BaseException], None]] = None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.executor = executor
+        self.key = key
+        self.format_row = format_row
+        self.id_field = id_field
+        self.page_size = page_size
+        self.max_pages = max(2, max_pages)
+        self.margin = margin
+        self.on_error = on_error
+        self._fetch: Optional[PageFetch] = None
+        self._filters: Optional[Hashable] = None
+        self._first = 0  # номер первой загруженной страницы
+        self._pages: List[List[str]] = []  # iid строк каждой загруженной страницы
+        self._cursors: List[Optional[str]] = [None]  # курсор, с которого начинается страница i
+        self._end: Optional[int] = None  # номер последней страницы, если он уже известен
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[str, tuple] = {}
+        self._updating = False  # дерево меняется самим списком, события прокрутки не обрабатываются
+        scrollbar.configure(command=tree.yview)
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def row(self, iid: str) -> Optional[Dict[str, Any]]:
+        return self._rows.get(iid)
+
+    def load(self, fetch: PageFetch, filters: Hashable = None) -> None:
+        """
+        Показать выборку fetch. Если фильтры не изменились, обновляется текущее окно на месте,
+        иначе выборка начинается с первой страницы
+        """
+        reset = filters != self._filters or self._fetch is None
+        self._fetch = fetch
+        self._filters = filters
+        if reset:
+            self._first = 0
+            self._cursors = [None]
+            self._end = None
+        self.refresh(scroll_top=reset)
+
+    def refresh(self, scroll_top: bool = False) -> None:
+        """
+        Перезапрос загруженного окна страниц и точечное обновление дерева
+        Args:
+            scroll_top: новая выборка — запрашивается одна первая страница, прокрутка в начало
+        """
+        if self._fetch is None:
+            return
+        first = self._first
+        count = 1 if scroll_top else max(1, len(self._pages))
+        self.executor.submit(
+            self.key, _fetch_pages, self._fetch, self._cursors[first], count, self.page_size,
+            on_done=lambda res: self._apply_window(first, *res, scroll_top=scroll_top), on_error=self.on_error,
+        )
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        self.scrollbar.set(first, last)
+        if self._updating or self._fetch is None or not self._pages or self.executor.busy(self.key):
+            return
+        page = self._first + len(self._pages)
+        if float(last) >= 1.0 - self.margin and page < len(self._cursors) and (self._end is None or page <= self._end):
+            self._load_page(page)
+        elif float(first) <= self.margin and self._first > 0:
+            self._load_page(self._first - 1)
+
+    def _load_page(self, page: int) -> None:
+        self.executor.submit(
+            self.key, _fetch_pages, self._fetch, self._cursors[page], 1, self.page_size,
+            on_done=lambda res: self._apply_page(page, *res), on_error=self.on_error,
+        )
+
+    def _remember_cursors(self, first: int, cursors: List[Optional[str]]) -> None:
+        for i, cursor in enumerate(cursors, start=first + 1):
+            if i < len(self._cursors):
+                self._cursors[i] = cursor
+            else:
+                self._cursors.append(cursor)
+            if cursor is None:
+                self._end = i - 1
+                del self._cursors[i + 1:]
+                return
+        if self._end is not None and self._end < first + len(cursors):
+            self._end = None  # после последней известной страницы появились строки
+
+    def _anchor(self) -> Tuple[Optional[str], List[str]]:
+        """
+        Верхняя видимая строка, чтобы вернуть к ней прокрутку после изменения окна
+        """
+        children = self.tree.get_children()
+        if not children:
+            return None, []
+        index = min(len(children) - 1, int(round(float(self.tree.yview()[0]) * len(children))))
+        return children[index], list(children)
+
+    def _restore(self, anchor: Optional[str]) -> None:
+        children = self.tree.get_children()
+        if anchor is not None and children and self.tree.exists(anchor):
+            self.tree.yview_moveto(self.tree.index(anchor) / len(children))
+
+    def _store(self, row: Dict[str, Any]) -> Tuple[str, tuple]:
+        iid = str(row[self.id_field])
+        self._rows[iid] = row
+        values = self.format_row(row)
+        return iid, values
+
+    def _drop(self, iids: List[str]) -> None:
+        if iids:
+            self.tree.delete(*iids)
+        for iid in iids:
+            self._rows.pop(iid, None)
+            self._values.pop(iid, None)
+
+    def _apply_page(self, page: int, pages: List[List[Dict[str, Any]]], cursors: List[Optional[str]]) -> None:
+        """
+        Добавление соседней страницы к окну и удаление страницы с противоположного края
+        """
+        rows = pages[0] if pages else []
+        self._remember_cursors(page, cursors[:1])
+        if not rows:
+            return
+        self._updating = True
+        try:
+            self._insert_page(page, rows)
+        finally:
+            self._updating = False
+
+    def _insert_page(self, page: int, rows: List[Dict[str, Any]]) -> None:
+        anchor, _ = self._anchor()
+        iids = []
+        at_end = page >= self._first + len(self._pages)
+        position = tk.END if at_end else 0
+        for row in (rows if at_end else reversed(rows)):
+            iid, values = self._store(row)
+            if self.tree.exists(iid):
+                # строка могла переместиться между страницами после изменения данных
+                self.tree.item(iid, values=values)
+                self.tree.move(iid, "", position)
+                for ids in self._pages:
+                    if iid in ids:
+                        ids.remove(iid)
+            else:
+                self.tree.insert("", position, iid=iid, values=values)
+            self._values[iid] = values
+            iids.append(iid)
+        if at_end:
+            self._pages.append(iids)
+            if len(self._pages) > self.max_pages:
+                self._drop(self._pages.pop(0))
+                self._first += 1
+        else:
+            iids.reverse()
+            self._pages.insert(0, iids)
+            self._first = page
+            if len(self._pages) > self.max_pages:
+                self._drop(self._pages.pop())
+        self._restore(anchor)
+
+    def _apply_window(self, first: int, pages: List[List[Dict[str, Any]]], cursors: List[Optional[str]],
+                      scroll_top: bool = False) -> None:
+        """
+        Обновление окна по сравнению со старым содержимым: удаляются исчезнувшие строки,
+        у изменившихся меняются значения, новые вставляются на свои места
+        """
+        self._updating = True
+        try:
+            self._replace_window(first, pages, cursors, scroll_top)
+        finally:
+            self._updating = False
+
+    def _replace_window(self, first: int, pages: List[List[Dict[str, Any]]], cursors: List[Optional[str]],
+                        scroll_top: bool) -> None:
+        anchor, old_order = self._anchor()
+        self._first = first
+        self._remember_cursors(first, cursors)
+        new_pages: List[List[str]] = []
+        new_values: Dict[str, tuple] = {}
+        for rows in pages:
+            ids = []
+            for row in rows:
+                iid, values = self._store(row)
+                new_values[iid] = values
+                ids.append(iid)
+            new_pages.append(ids)
+        new_order = [iid for ids in new_pages for iid in ids]
+        self._drop([iid for iid in old_order if iid not in new_values])
+        kept = [iid for iid in old_order if iid in new_values]
+        kept_set = set(kept)
+        in_place = kept == [iid for iid in new_order if iid in kept_set]
+        for index, iid in enumerate(new_order):
+            values = new_values[iid]
+            if iid in kept_set:
+                if self._values.get(iid) != values:
+                    self.tree.item(iid, values=values)
+                if not in_place:
+                    self.tree.move(iid, "", index)
+            else:
+                self.tree.insert("", index, iid=iid, values=values)
+            self._values[iid] = values
+        self._pages = new_pages
+        if scroll_top:
+            self.tree.yview_moveto(0)
+        else:
+            self._restore(anchor)